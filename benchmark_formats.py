@@ -0,0 +1,83 @@
+"""
+Compares the JSON mission file with the compact binary format: file size
+and the time to write and read back a generated path.
+
+    python benchmark_formats.py [number of commands ...]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from mission_core import PathModel, export_mission, load_mission
+from mission_core.binary_format import read_binary, write_binary
+
+
+def make_path(count, seed=0):
+    """A survey-like path: moves with actions, altitude changes and waits."""
+    rng = random.Random(seed)
+    commands = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.7:
+            commands.append(
+                {
+                    "type": "SCHEDULE_MOVE_XYZ",
+                    "arguments": {
+                        "action": rng.choice(["NO_ACTION", "START_BURST", "STOP_BURST"]),
+                        "delay": 0.0,
+                        "velocity": 1.0,
+                        "x": round(rng.uniform(-200, 200), 2),
+                        "y": round(rng.uniform(-200, 200), 2),
+                        "yaw": 90.0,
+                        "z": float(rng.randint(2, 20)),
+                    },
+                }
+            )
+        elif kind < 0.85:
+            commands.append(
+                {
+                    "type": "SCHEDULE_FLY_TO_XY",
+                    "arguments": {"x": rng.uniform(-200, 200), "y": rng.uniform(-200, 200)},
+                }
+            )
+        elif kind < 0.95:
+            commands.append(
+                {"type": "SCHEDULE_FLY_TO_Z", "arguments": {"z": float(rng.randint(2, 20))}}
+            )
+        else:
+            commands.append({"type": "SCHEDULE_WAIT_FOR_PERIOD", "arguments": {"period": 1.0}})
+    path = PathModel()
+    path.extend(commands)
+    return path
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main(counts):
+    print(f"{'commands':>9} {'json size':>11} {'binary size':>12} {'ratio':>6}"
+          f" {'json write':>11} {'json read':>10} {'bin write':>10} {'bin read':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        json_file = os.path.join(directory, "mission.json")
+        binary_file = os.path.join(directory, "mission.bin")
+        for count in counts:
+            path = make_path(count)
+            _, json_write = timed(export_mission, path, json_file)
+            _, json_read = timed(load_mission, json_file)
+            _, binary_write = timed(write_binary, path, binary_file)
+            loaded, binary_read = timed(read_binary, binary_file)
+            assert list(loaded.commands()) == list(path.commands())
+            json_size = os.path.getsize(json_file)
+            binary_size = os.path.getsize(binary_file)
+            print(f"{count:>9} {json_size:>11} {binary_size:>12} {json_size / binary_size:>6.1f}"
+                  f" {json_write:>10.3f}s {json_read:>9.3f}s {binary_write:>9.3f}s {binary_read:>8.3f}s")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,624 @@
+"""
+Sending mission files to the drones over SSH/SFTP.
+
+Opening an SSH connection costs a key exchange and a password login, which
+takes seconds on the field Wi-Fi. SessionPool keeps the authenticated
+connection of every user@host open between exports, with keepalives so the
+link is not dropped while idle, a health check before each reuse and
+eviction of connections that were not used for a while.
+
+A mission is written to a hidden temporary file next to its final name and
+renamed into place only once its content is verified, so the drone never
+sees a truncated file. When the link drops, the transfer is retried with
+exponential backoff and continues from what already reached the drone.
+
+A mission the drone already holds is not sent again: a remote file of the
+same size is compared by its SHA-256 (computed on the drone with
+sha256sum, or by reading the file back when the drone lacks it). Sizes
+and modification times alone are not trusted, the exporter often writes
+a changed mission of the same size within the same second.
+
+upload_fleet sends missions to many drones through a bounded thread pool,
+and UploadQueue runs such uploads one job after another on a background
+thread so a GUI never waits on the network. Running this module as a
+script sends to a fleet from the command line:
+
+    python drone_upload.py mission.json [more missions ...] inventory.txt
+"""
+
+import hashlib
+import itertools
+import os
+import queue
+import shlex
+import socket
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import paramiko
+
+REMOTE_ROOT = "/home/root/paths"  # missions live in REMOTE_ROOT/<name>/<name>.json
+SSH_PORT = 22
+FLEET_WORKERS = 8  # drones uploaded to at the same time
+HASH_CHUNK = 1 << 16  # bytes hashed at a time
+TRANSFER_CHUNK = 32768  # bytes per SFTP write, the largest size all servers accept
+REMOTE_COMMAND_TIMEOUT = 30  # seconds to wait for sha256sum on the drone
+RETRIES = 5  # attempts per drone when the link drops
+RETRY_DELAY = 1.0  # seconds before the first retry, doubled after each one
+
+# Errors of a dropped or unreachable link, worth another attempt. Other
+# OSErrors (a missing or unreadable mission file) fail at once.
+LINK_ERRORS = (paramiko.SSHException, EOFError, socket.timeout, ConnectionError)
+
+
+def parse_target(target):
+    """Splits "username@IP_ADDRESS" into (username, ip_address)."""
+    username, _, host = target.strip().partition("@")
+    if not username or not host:
+        raise ValueError(f"Expected username@IP_ADDRESS, got {target!r}")
+    return username, host
+
+
+def parse_targets(text):
+    """
+    Targets in text, separated by commas, spaces or new lines. Lines of an
+    inventory file may hold comments after "#". Duplicates are dropped.
+    """
+    targets = []
+    for line in text.splitlines():
+        for target in line.split("#", 1)[0].replace(",", " ").split():
+            parse_target(target)  # raises on a malformed target
+            if target not in targets:
+                targets.append(target)
+    return targets
+
+
+def read_inventory(file):
+    """Targets listed in an inventory file, see parse_targets."""
+    with open(file) as f:
+        return parse_targets(f.read())
+
+
+def remote_mission_path(filepath):
+    """Remote directory and file a local mission file is uploaded to."""
+    filename = filepath.replace("\\", "/").split("/")[-1]
+    base_filename = filename.rsplit(".", 1)[0]
+    remote_dir_path = f"{REMOTE_ROOT}/{base_filename}"
+    return remote_dir_path, f"{remote_dir_path}/{filename}"
+
+
+class Session:
+    """An authenticated transport and its SFTP channel."""
+
+    def __init__(self, transport, sftp):
+        self.transport = transport
+        self.sftp = sftp
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()  # an SFTP channel serves one caller at a time
+
+    def is_healthy(self):
+        if not (self.transport.is_active() and self.transport.is_authenticated()):
+            return False
+        try:
+            self.transport.send_ignore()  # fails at once if the socket is gone
+        except (paramiko.SSHException, OSError, EOFError):
+            return False
+        return True
+
+    def close(self):
+        for closeable in (self.sftp, self.transport):
+            try:
+                closeable.close()
+            except Exception:
+                pass
+
+
+class SessionPool:
+    """
+    Authenticated SFTP sessions keyed by "user@host".
+
+    Use session() around the transfers to one drone:
+
+        with pool.session("root", "192.168.0.227", password) as sftp:
+            sftp.put(...)
+
+    The password is only needed when no live session exists for the target
+    yet (see has_session). A session that fails inside the block is closed
+    and dropped, so the next call connects again, with the password kept
+    from the first login until the target is evicted.
+    """
+
+    def __init__(self, keepalive=15, idle_timeout=600, connect_timeout=10, port=SSH_PORT):
+        self.keepalive = keepalive  # seconds between keepalive packets
+        self.idle_timeout = idle_timeout  # seconds unused before a session is closed
+        self.connect_timeout = connect_timeout  # seconds for the TCP connect and the login
+        self.port = port
+        self.sessions = {}
+        self.passwords = {}  # kept to log in again after a dropped link
+        self.lock = threading.Lock()
+
+    def _connect(self, username, host, password):
+        # Transport((host, port)) would connect without a timeout, and a
+        # drone that is switched off would hold the caller for minutes
+        sock = socket.create_connection((host, self.port), self.connect_timeout)
+        try:
+            transport = paramiko.Transport(sock)
+        except Exception:
+            sock.close()
+            raise
+        try:
+            transport.banner_timeout = self.connect_timeout
+            transport.start_client(timeout=self.connect_timeout)
+            transport.auth_password(username, password)
+            transport.set_keepalive(self.keepalive)
+            sftp = paramiko.SFTPClient.from_transport(transport)
+        except Exception:
+            transport.close()
+            raise
+        return Session(transport, sftp)
+
+    def has_session(self, username, host):
+        """True if a healthy session to username@host is open."""
+        with self.lock:
+            session = self.sessions.get(f"{username}@{host}")
+        return session is not None and session.is_healthy()
+
+    def _acquire(self, username, host, password):
+        key = f"{username}@{host}"
+        self.evict_idle()
+        with self.lock:
+            session = self.sessions.get(key)
+        if session is not None and not session.is_healthy():
+            self.discard(key, session)
+            session = None
+        if session is None:
+            if password is None:
+                with self.lock:
+                    password = self.passwords.get(key)
+            if password is None:
+                raise paramiko.AuthenticationException(f"No open session to {key}")
+            session = self._connect(username, host, password)
+            with self.lock:
+                previous = self.sessions.get(key)
+                self.sessions[key] = session
+                self.passwords[key] = password
+            if previous is not None:
+                previous.close()
+        return key, session
+
+    @contextmanager
+    def session(self, username, host, password=None):
+        """Yields the SFTP client of a pooled session to username@host."""
+        key, session = self._acquire(username, host, password)
+        with session.lock:
+            try:
+                yield session.sftp
+            except (paramiko.SSHException, OSError, EOFError):
+                if not session.is_healthy():
+                    self.discard(key, session)
+                raise
+            finally:
+                session.last_used = time.monotonic()
+
+    def discard(self, key, session=None):
+        """Closes the session of key (only if it is still session, when given)."""
+        with self.lock:
+            current = self.sessions.get(key)
+            if current is None or (session is not None and current is not session):
+                return
+            del self.sessions[key]
+        current.close()
+
+    def evict_idle(self):
+        """Closes the sessions not used for idle_timeout seconds."""
+        now = time.monotonic()
+        with self.lock:
+            idle = [
+                (key, session)
+                for key, session in self.sessions.items()
+                if now - session.last_used > self.idle_timeout and not session.lock.locked()
+            ]
+        for key, session in idle:
+            self.discard(key, session)
+            with self.lock:
+                if key not in self.sessions:
+                    self.passwords.pop(key, None)
+
+    def close_all(self):
+        with self.lock:
+            sessions, self.sessions = list(self.sessions.values()), {}
+            self.passwords = {}
+        for session in sessions:
+            session.close()
+
+
+def file_sha256(f):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def remote_sha256(sftp, remote_path, read_back=True):
+    """
+    SHA-256 of a remote file, from sha256sum on the drone if it has one.
+    Otherwise the file is read back, or None is returned if read_back is False.
+    """
+    transport = sftp.get_channel().get_transport()
+    try:
+        channel = transport.open_session(timeout=REMOTE_COMMAND_TIMEOUT)
+        try:
+            channel.settimeout(REMOTE_COMMAND_TIMEOUT)
+            channel.exec_command(f"sha256sum {shlex.quote(remote_path)}")
+            output = channel.makefile("rb").read()
+            status = channel.recv_exit_status()
+        finally:
+            channel.close()
+        if status == 0 and output.split():
+            return output.split()[0].decode()
+    except (paramiko.SSHException, OSError, EOFError):
+        pass
+    if not read_back:
+        return None
+    # No remote command available, stream the file back instead
+    with sftp.open(remote_path, "rb") as f:
+        f.prefetch()
+        return file_sha256(f)
+
+
+def is_unchanged(sftp, filepath, remote_file_path):
+    """True if the remote file already has the content of the local one."""
+    try:
+        remote = sftp.stat(remote_file_path)
+    except IOError:
+        return False
+    local = os.stat(filepath)
+    if stat.S_ISDIR(remote.st_mode or 0) or remote.st_size != local.st_size:
+        return False
+    with open(filepath, "rb") as f:
+        local_hash = file_sha256(f)
+    return remote_sha256(sftp, remote_file_path) == local_hash
+
+
+def _copy_mtime(sftp, local, remote_file_path):
+    try:
+        sftp.utime(remote_file_path, (local.st_atime, local.st_mtime))
+    except IOError:
+        pass  # not allowed on this drone, the time only informs the operator
+
+
+def partial_path(remote_file_path):
+    """Hidden name a mission is written to before it is renamed into place."""
+    remote_dir_path, _, filename = remote_file_path.rpartition("/")
+    return f"{remote_dir_path}/.{filename}.part"
+
+
+def source_path(temporary_path):
+    """File next to a partial upload holding the SHA-256 of the file being sent."""
+    return f"{temporary_path}.sha256"
+
+
+def _read_source(sftp, temporary_path):
+    try:
+        with sftp.open(source_path(temporary_path), "rb") as f:
+            return f.read().decode().strip()
+    except (IOError, UnicodeDecodeError):
+        return None
+
+
+def _write_source(sftp, temporary_path, local_hash):
+    with sftp.open(source_path(temporary_path), "wb") as f:
+        f.write(local_hash.encode())
+
+
+def _remove_quietly(sftp, remote_path):
+    try:
+        sftp.remove(remote_path)
+    except IOError:
+        pass
+
+
+def _send_from(sftp, filepath, remote_path, offset, callback):
+    """Writes the local file from offset on into the remote file."""
+    total = os.path.getsize(filepath)
+    with open(filepath, "rb") as local, sftp.open(remote_path, "r+b" if offset else "wb") as remote:
+        remote.set_pipelined(True)
+        local.seek(offset)
+        remote.seek(offset)
+        sent = offset
+        if callback:
+            callback(sent, total)
+        for chunk in iter(lambda: local.read(TRANSFER_CHUNK), b""):
+            remote.write(chunk)
+            sent += len(chunk)
+            if callback:
+                callback(sent, total)
+
+
+def _rename_into_place(sftp, temporary_path, remote_file_path):
+    try:
+        sftp.posix_rename(temporary_path, remote_file_path)  # atomic replace
+    except IOError:
+        # Server without the posix-rename extension: plain rename cannot replace
+        try:
+            sftp.remove(remote_file_path)
+        except IOError:
+            pass
+        sftp.rename(temporary_path, remote_file_path)
+
+
+def upload_mission(sftp, filepath, callback=None):
+    """
+    Uploads a mission file to REMOTE_ROOT/<name>/ unless the drone already has
+    it. Returns True if the file was sent, False if it was unchanged.
+    callback(bytes sent, total bytes) is called as the file goes out.
+
+    The file is written to partial_path() first, with the SHA-256 of the
+    local file in source_path() next to it. If a partial file from an
+    interrupted upload of the same content is there, sending continues at
+    its end; a partial file of any other content is started over. The
+    result is checked against the local SHA-256 (computed on the drone, or
+    by reading the file back when it has no sha256sum) before it is renamed
+    to its final name; on a mismatch the partial file is removed and
+    IOError is raised.
+    """
+    remote_dir_path, remote_file_path = remote_mission_path(filepath)
+    if is_unchanged(sftp, filepath, remote_file_path):
+        return False
+    try:
+        sftp.mkdir(remote_dir_path)
+    except IOError:
+        pass  # the directory already exists
+
+    local = os.stat(filepath)
+    with open(filepath, "rb") as f:
+        local_hash = file_sha256(f)
+    temporary_path = partial_path(remote_file_path)
+    try:
+        offset = sftp.stat(temporary_path).st_size or 0
+    except IOError:
+        offset = 0
+    if offset > local.st_size or _read_source(sftp, temporary_path) != local_hash:
+        offset = 0  # left over from another version of the file
+    if offset == 0:
+        _write_source(sftp, temporary_path, local_hash)
+    _send_from(sftp, filepath, temporary_path, offset, callback)
+
+    remote_size = sftp.stat(temporary_path).st_size
+    if remote_size != local.st_size or remote_sha256(sftp, temporary_path) != local_hash:
+        sftp.remove(temporary_path)
+        _remove_quietly(sftp, source_path(temporary_path))
+        raise IOError(f"{remote_file_path} did not arrive intact")
+
+    _rename_into_place(sftp, temporary_path, remote_file_path)
+    _remove_quietly(sftp, source_path(temporary_path))
+    _copy_mtime(sftp, local, remote_file_path)
+    return True
+
+
+class UploadCancelled(Exception):
+    def __str__(self):
+        return "cancelled"
+
+
+class UploadResult:
+    def __init__(self, target, error=None, seconds=0.0, sent=0):
+        self.target = target
+        self.error = error  # None when the upload succeeded
+        self.seconds = seconds
+        self.sent = sent  # missions sent, the others were already on the drone
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def upload_fleet(
+    pool,
+    targets,
+    filepaths,
+    password=None,
+    workers=FLEET_WORKERS,
+    on_progress=None,
+    cancelled=None,
+):
+    """
+    Uploads the mission files in filepaths to every "user@host" in targets,
+    at most workers drones at a time, and returns an UploadResult per target
+    in the same order. on_progress(target, status, sent, total) is called
+    from the worker threads with status "connecting", "checking", "sending",
+    "retry <n> in <seconds>s", "done", "failed" or "cancelled" (sent and
+    total are byte counts of the file being sent, 0 otherwise). A drone whose
+    link drops (LINK_ERRORS) is retried up to RETRIES times, waiting
+    RETRY_DELAY seconds and twice as long after each retry; the retry picks
+    up where the last attempt stopped. Other errors fail the drone at once.
+    Setting the cancelled event stops the transfers at the next block.
+    """
+
+    def report(target, status, sent=0, total=0):
+        if on_progress:
+            on_progress(target, status, sent, total)
+
+    def check_cancelled():
+        if cancelled is not None and cancelled.is_set():
+            raise UploadCancelled()
+
+    def sending(target, done, total):
+        check_cancelled()
+        report(target, "sending", done, total)
+
+    def upload(target):
+        start = time.monotonic()
+        sent = 0
+        delay = RETRY_DELAY
+        pending = list(filepaths)
+        for attempt in range(1, RETRIES + 1):
+            try:
+                check_cancelled()
+                report(target, "connecting")
+                username, host = parse_target(target)
+                with pool.session(username, host, password) as sftp:
+                    while pending:
+                        check_cancelled()
+                        report(target, "checking")
+                        sent += upload_mission(
+                            sftp, pending[0], lambda done, total: sending(target, done, total)
+                        )
+                        del pending[0]
+                break
+            except LINK_ERRORS as e:
+                # A dropped link is retried, a refused login is not
+                if isinstance(e, paramiko.AuthenticationException) or attempt == RETRIES:
+                    report(target, "failed")
+                    return UploadResult(target, e, time.monotonic() - start, sent)
+                report(target, f"retry {attempt} in {delay:g}s")
+                if cancelled is not None and cancelled.wait(delay):
+                    report(target, "cancelled")
+                    return UploadResult(target, UploadCancelled(), time.monotonic() - start, sent)
+                if cancelled is None:
+                    time.sleep(delay)
+                delay *= 2
+            except Exception as e:
+                report(target, "cancelled" if isinstance(e, UploadCancelled) else "failed")
+                return UploadResult(target, e, time.monotonic() - start, sent)
+        report(target, "done")
+        return UploadResult(target, None, time.monotonic() - start, sent)
+
+    if not targets:
+        return []
+    with ThreadPoolExecutor(max_workers=min(workers, len(targets))) as executor:
+        return list(executor.map(upload, targets))
+
+
+def summarize(results):
+    """One line per failed drone after a count of the successful ones."""
+    failed = [result for result in results if not result.ok]
+    lines = [f"{len(results) - len(failed)} of {len(results)} drones received the mission."]
+    up_to_date = sum(1 for result in results if result.ok and result.sent == 0)
+    if up_to_date:
+        lines.append(f"{up_to_date} of them already had it, nothing was sent to those.")
+    lines += [f"{result.target}: {result.error}" for result in failed]
+    return "\n".join(lines)
+
+
+class UploadJob:
+    """Mission files to send to a list of targets, see UploadQueue."""
+
+    def __init__(self, job_id, targets, filepaths, password):
+        self.id = job_id
+        self.targets = targets
+        self.filepaths = filepaths
+        self.password = password
+        self.cancelled = threading.Event()
+        self.results = None  # UploadResult per target once the job finished
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class UploadQueue:
+    """
+    Runs upload jobs in order on a background thread.
+
+    Nothing here touches the GUI: the worker only puts events in a queue,
+    which the GUI thread drains with poll(), e.g. from Tk's after(). Events
+    are ("progress", job, target, status, sent, total) tuples and a final
+    ("finished", job) once job.results is set.
+    """
+
+    def __init__(self, pool, workers=FLEET_WORKERS):
+        self.pool = pool
+        self.workers = workers
+        self.jobs = queue.Queue()
+        self.events = queue.Queue()
+        self.job_ids = itertools.count(1)
+        self.thread = None
+        self.current = None  # job being uploaded
+
+    def submit(self, targets, filepaths, password=None):
+        job = UploadJob(next(self.job_ids), list(targets), list(filepaths), password)
+        self.jobs.put(job)
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        return job
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            self.current = job
+            try:
+                job.results = upload_fleet(
+                    self.pool,
+                    job.targets,
+                    job.filepaths,
+                    job.password,
+                    self.workers,
+                    lambda *update, job=job: self.events.put(("progress", job) + update),
+                    job.cancelled,
+                )
+            except Exception as e:  # keep the worker alive whatever happens
+                job.results = [UploadResult(target, e) for target in job.targets]
+            job.password = None
+            self.current = None
+            self.events.put(("finished", job))
+
+    def poll(self):
+        """Events that arrived since the last call."""
+        events = []
+        try:
+            while True:
+                events.append(self.events.get_nowait())
+        except queue.Empty:
+            return events
+
+    def shutdown(self):
+        """Cancels the running and queued jobs and stops the worker."""
+        current = self.current
+        if current is not None:
+            current.cancel()
+        try:
+            while True:
+                job = self.jobs.get_nowait()
+                if job is not None:
+                    job.cancel()
+                    job.results = [UploadResult(target, UploadCancelled()) for target in job.targets]
+                    self.events.put(("finished", job))
+        except queue.Empty:
+            pass
+        self.jobs.put(None)
+
+
+if __name__ == "__main__":
+    import argparse
+    import getpass
+
+    parser = argparse.ArgumentParser(description="Send mission files to a fleet of drones.")
+    parser.add_argument("missions", nargs="+", help="mission files to send")
+    parser.add_argument("inventory", help="file with one username@IP_ADDRESS per line")
+    parser.add_argument("--workers", type=int, default=FLEET_WORKERS)
+    args = parser.parse_args()
+
+    def print_progress(target, status, sent, total):
+        if status != "sending":
+            print(f"{target}: {status}", flush=True)
+
+    pool = SessionPool()
+    try:
+        results = upload_fleet(
+            pool,
+            read_inventory(args.inventory),
+            args.missions,
+            getpass.getpass("SSH password: "),
+            args.workers,
+            print_progress,
+        )
+    finally:
+        pool.close_all()
+    print(summarize(results))
+    raise SystemExit(0 if all(result.ok for result in results) else 1)
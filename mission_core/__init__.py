@@ -0,0 +1,39 @@
+"""
+Mission core: path model, command schema, import, export (JSON, binary
+and CSV/Parquet tables), validation, flight estimates and simulation.
+
+Nothing in this package depends on Tk, so missions can be built, checked
+and written on machines without a display.
+"""
+
+from .commands import (
+    ACTION_TYPES,
+    ARGUMENTS_ORDER,
+    CODECS,
+    COMMAND_TYPES,
+    COMMANDS,
+    CommandCodec,
+    CommandSpec,
+    Field,
+    get_command_arguments,
+    order_arguments,
+)
+from .estimate import FlightEstimator, FlightProfile, estimate_path
+from .export import (
+    FINAL_BLOCK,
+    INITIAL_BLOCK,
+    build_mission,
+    export_mission,
+    write_mission,
+)
+from .grid import parse_grid, read_arguments
+from .history import EditHistory
+from .importer import load_mission
+from .path_model import PathModel
+from .peephole import Savings, optimize_mission
+from .route_order import optimize_path, optimized_order, reorder_path
+from .simulate import Timeline, simulate
+from .survey import add_survey
+from .table_format import read_table, write_table
+from .validation import Diagnostic, check_path, validate_path
+from .waypoint_store import WaypointStore
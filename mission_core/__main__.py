@@ -0,0 +1,11 @@
+"""
+Checks stored mission files: python -m mission_core FILE [FILE ...]
+"""
+
+import sys
+
+from .validation import check_files
+
+if len(sys.argv) < 2:
+    sys.exit("usage: python -m mission_core FILE [FILE ...]")
+sys.exit(check_files(sys.argv[1:]))
@@ -0,0 +1,97 @@
+"""
+Incrementally maintained altitude of every command in a path.
+
+A command flies at the Z of the closest command at or before it that sets
+a Z value (0 before the first one). The index stores that effective Z per
+command so looking it up is O(1); inserting or deleting a command that
+sets Z only rewrites the commands up to the next one that sets Z.
+"""
+
+import numpy as np
+
+SEARCH_CHUNK = 1024  # rows scanned at a time when looking for the next Z
+
+
+class AltitudeIndex:
+    def __init__(self, capacity=16):
+        self.size = 0
+        self.effective_z = np.zeros(capacity, dtype=np.float64)
+        self.has_z = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, needed):
+        capacity = len(self.has_z)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self.effective_z = np.resize(self.effective_z, capacity)
+        self.has_z = np.resize(self.has_z, capacity)
+
+    def _before(self, index):
+        return float(self.effective_z[index - 1]) if index > 0 else 0.0
+
+    def _next_z(self, start):
+        """First index >= start that sets Z, len(self) if there is none."""
+        while start < self.size:
+            stop = min(start + SEARCH_CHUNK, self.size)
+            hits = np.flatnonzero(self.has_z[start:stop])
+            if len(hits):
+                return start + int(hits[0])
+            start = stop
+        return self.size
+
+    def _propagate(self, start, value):
+        self.effective_z[start : self._next_z(start)] = value
+
+    def append(self, z=None):
+        """z is the Z set by the new command, None if it sets none."""
+        return self.insert(self.size, z)
+
+    def insert(self, index, z=None):
+        self._reserve(self.size + 1)
+        self.effective_z[index + 1 : self.size + 1] = self.effective_z[index : self.size]
+        self.has_z[index + 1 : self.size + 1] = self.has_z[index : self.size]
+        self.size += 1
+        sets_z = z is not None and z == z  # NaN is an empty value
+        self.has_z[index] = sets_z
+        if sets_z:
+            self.effective_z[index] = z
+            self._propagate(index + 1, z)
+        else:
+            self.effective_z[index] = self._before(index)
+        return index
+
+    def extend(self, zs):
+        """Appends many commands at once, zs holds the Z each one sets (NaN for none)."""
+        zs = np.asarray(zs, dtype=np.float64)
+        start, count = self.size, len(zs)
+        self._reserve(start + count)
+        sets_z = ~np.isnan(zs)
+        # Index of the last command setting Z at or before every new command
+        last_set = np.maximum.accumulate(np.where(sets_z, np.arange(count), -1))
+        self.effective_z[start : start + count] = np.where(
+            last_set >= 0, zs[np.maximum(last_set, 0)], self._before(start)
+        )
+        self.has_z[start : start + count] = sets_z
+        self.size += count
+
+    def delete(self, index):
+        sets_z = self.has_z[index]
+        self.effective_z[index : self.size - 1] = self.effective_z[index + 1 : self.size]
+        self.has_z[index : self.size - 1] = self.has_z[index + 1 : self.size]
+        self.size -= 1
+        if sets_z:
+            self._propagate(index, self._before(index))
+
+    def clear(self):
+        self.size = 0
+
+    def altitude(self, index):
+        return float(self.effective_z[index])
+
+    def altitudes(self):
+        """Effective Z of every command as an array."""
+        return self.effective_z[: self.size]
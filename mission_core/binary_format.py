@@ -0,0 +1,209 @@
+"""
+Compact binary encoding of a mission, as an alternative to the JSON file
+for slow links.
+
+Instead of repeating key names for every command, the file holds the
+command and action names once and then the path as packed columns:
+
+    header       magic b"WDSM", format version, flags, command count
+    name tables  command types, action types and float arguments, each as
+                 a count followed by length-prefixed UTF-8 names
+    codes        int8 per command, index into the command table
+    present      uint16 per command, bit i set if the command carries
+                 argument i of the float table, bit len(float table) for
+                 the action
+    actions      int8 per command carrying an action, -1 for empty
+    floats       for every float argument, a float64 per command carrying
+                 it (NaN for empty)
+
+All numbers are little endian. Because the names are in the file, codes
+keep their meaning if the command list of the program changes. The flags
+record which entries of the fixed initial block the JSON had (an
+optimized export leaves some out) and whether it had the final block, so
+converting JSON -> binary -> JSON gives back the same bytes (numbers are
+kept as float64, which is what export_mission writes). Version 1 files
+had a single flag for the whole initial block.
+"""
+
+import struct
+
+import numpy as np
+
+from .commands import ACTION_CODES, ACTION_TYPES, COMMAND_CODES, COMMAND_TYPES, FLOAT_ARGUMENTS
+from .export import FINAL_BLOCK, INITIAL_BLOCK, write_mission
+from .importer import load_mission
+from .path_model import PathModel
+from .waypoint_store import ARGUMENT_BITS, NO_ACTION_CODE
+
+MAGIC = b"WDSM"
+VERSION = 2
+HEADER = struct.Struct("<4sBBI")
+
+HAS_FINAL_BLOCK = 2
+# Flag of every entry of INITIAL_BLOCK, in order (bit 0 was the whole block in version 1)
+INITIAL_FLAGS = [1, 4, 8]
+HAS_INITIAL_BLOCK = sum(INITIAL_FLAGS)
+
+
+def _pack_names(names):
+    parts = [struct.pack("<B", len(names))]
+    for name in names:
+        data = name.encode()
+        parts.append(struct.pack("<B", len(data)) + data)
+    return b"".join(parts)
+
+
+def _unpack_names(data, offset):
+    (count,) = struct.unpack_from("<B", data, offset)
+    offset += 1
+    names = []
+    for _ in range(count):
+        (length,) = struct.unpack_from("<B", data, offset)
+        names.append(bytes(data[offset + 1 : offset + 1 + length]).decode())
+        offset += 1 + length
+    return names, offset
+
+
+def encode_path(path, flags=HAS_INITIAL_BLOCK | HAS_FINAL_BLOCK):
+    """Returns a PathModel encoded as bytes."""
+    store = path.store
+    count = len(store)
+    present = store.present[:count]
+    # Bits in the file follow FLOAT_ARGUMENTS, then the action
+    file_present = np.zeros(count, dtype="<u2")
+    for bit, name in enumerate(FLOAT_ARGUMENTS + ["action"]):
+        file_present |= ((present >> ARGUMENT_BITS[name]) & 1).astype("<u2") << bit
+
+    parts = [
+        HEADER.pack(MAGIC, VERSION, flags, count),
+        _pack_names(COMMAND_TYPES),
+        _pack_names(ACTION_TYPES),
+        _pack_names(FLOAT_ARGUMENTS),
+        store.codes[:count].astype("<i1").tobytes(),
+        file_present.tobytes(),
+        store.actions[:count][store.has_argument("action")].astype("<i1").tobytes(),
+    ]
+    for name in FLOAT_ARGUMENTS:
+        parts.append(store.column(name)[store.has_argument(name)].astype("<f8").tobytes())
+    return b"".join(parts)
+
+
+def decode_path(data, path=None):
+    """
+    Reads bytes written by encode_path into path (a new PathModel by
+    default). Returns (path, flags).
+    """
+    data = memoryview(data)
+    if len(data) < HEADER.size:
+        raise ValueError("Not a binary mission file")
+    magic, version, flags, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a binary mission file")
+    if version not in (1, VERSION):
+        raise ValueError(f"Unsupported binary mission version: {version}")
+    if version == 1 and flags & INITIAL_FLAGS[0]:
+        flags |= HAS_INITIAL_BLOCK
+    try:
+        command_names, offset = _unpack_names(data, HEADER.size)
+        action_names, offset = _unpack_names(data, offset)
+        float_names, offset = _unpack_names(data, offset)
+    except (struct.error, UnicodeDecodeError):
+        raise ValueError("Binary mission file is truncated") from None
+    for name in command_names:
+        if name not in COMMAND_CODES:
+            raise ValueError(f"Unknown command type: {name}")
+    for name in action_names:
+        if name not in ACTION_CODES:
+            raise ValueError(f"Unknown action type: {name}")
+    for name in float_names:
+        if name not in FLOAT_ARGUMENTS:
+            raise ValueError(f"Unknown argument: {name}")
+
+    def take(dtype, length):
+        nonlocal offset
+        size = np.dtype(dtype).itemsize * length
+        if offset + size > len(data):
+            raise ValueError("Binary mission file is truncated")
+        array = np.frombuffer(data, dtype=dtype, count=length, offset=offset)
+        offset += size
+        return array
+
+    file_codes = take("<i1", count)
+    file_present = take("<u2", count)
+    action_bit = len(float_names)
+    carries_action = (file_present >> action_bit) & 1 == 1
+    file_actions = take("<i1", int(carries_action.sum()))
+
+    # Map the codes of the file onto the current command and argument lists
+    command_map = np.array([COMMAND_CODES[name] for name in command_names], dtype=np.int8)
+    action_map = np.array([ACTION_CODES[name] for name in action_names] + [NO_ACTION_CODE])
+    if count and (file_codes.min() < 0 or file_codes.max() >= len(command_names)):
+        raise ValueError("Invalid command code in binary mission file")
+    if len(file_actions) and (
+        file_actions.min() < NO_ACTION_CODE or file_actions.max() >= len(action_names)
+    ):
+        raise ValueError("Invalid action code in binary mission file")
+    codes = command_map[file_codes]
+    actions = np.full(count, NO_ACTION_CODE, dtype=np.int8)
+    actions[carries_action] = action_map[file_actions]
+    present = np.zeros(count, dtype=np.uint16)
+    present |= carries_action.astype(np.uint16) << ARGUMENT_BITS["action"]
+    values = {}
+    for bit, name in enumerate(float_names):
+        carries = (file_present >> bit) & 1 == 1
+        present |= carries.astype(np.uint16) << ARGUMENT_BITS[name]
+        column = np.full(count, np.nan)
+        column[carries] = take("<f8", int(carries.sum()))
+        values[name] = column
+
+    if path is None:
+        path = PathModel()
+    path.extend_columns(codes, present, actions, values)
+    return path, flags
+
+
+def write_binary(path, file):
+    with open(file, "wb") as f:
+        f.write(encode_path(path))
+
+
+def read_binary(file, path=None):
+    """Reads a binary mission file into path (a new PathModel by default)."""
+    with open(file, "rb") as f:
+        return decode_path(f.read(), path)[0]
+
+
+def json_to_binary(json_file, binary_file):
+    stripped = set()
+    path = load_mission(json_file, stripped=stripped)
+    flags = sum(INITIAL_FLAGS[index] for index in stripped if index != "final")
+    if "final" in stripped:
+        flags |= HAS_FINAL_BLOCK
+    with open(binary_file, "wb") as f:
+        f.write(encode_path(path, flags))
+
+
+def binary_to_json(binary_file, json_file):
+    with open(binary_file, "rb") as f:
+        path, flags = decode_path(f.read())
+    with open(json_file, "w") as f:
+        write_mission(
+            path,
+            f,
+            [command for command, flag in zip(INITIAL_BLOCK, INITIAL_FLAGS) if flags & flag],
+            FINAL_BLOCK if flags & HAS_FINAL_BLOCK else [],
+        )
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m mission_core.binary_format INPUT OUTPUT")
+    source, target = sys.argv[1:]
+    with open(source, "rb") as f:
+        is_binary = f.read(len(MAGIC)) == MAGIC
+    if is_binary:
+        binary_to_json(source, target)
+    else:
+        json_to_binary(source, target)
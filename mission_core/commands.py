@@ -0,0 +1,324 @@
+"""
+Command schema shared by the GUI and the headless tools.
+
+Every command type is described once in COMMANDS: its arguments with
+their prompts and allowed values, its button in the planner, the shape
+drawn for it and the role it plays in a path. The lists the rest of the
+code works with (command codes, commands that move in XY, buttons...)
+are derived from it, and so is a CommandCodec per command that asks for,
+checks, parses and writes its arguments. The codecs are built once at
+import, so handling a command is one dict lookup followed by work that
+only involves its own fields.
+"""
+
+import json
+from collections import namedtuple
+
+# An argument asked for a command. minimum and maximum bound the value
+# (strict excludes the minimum itself), choices lists the only values
+# allowed, None for no limit. default fills the value in when it is not
+# entered, None when it must be.
+Field = namedtuple(
+    "Field",
+    "name prompt minimum maximum strict choices unit default",
+    defaults=(None, None, False, None, "", None),
+)
+
+# label and button: text and (row, column) of its button in the planner,
+# None for no button. glyph: shapes drawn at its point on the XY canvas,
+# as (item kind, coordinates relative to the point, options). starts_path:
+# may open a path (a path always starts with a height). moves_xy, sets_z:
+# flies to an XY position / sets the altitude. is_move: counts as the move
+# a path needs before it can be exported. fixed: arguments set without
+# asking for them.
+CommandSpec = namedtuple(
+    "CommandSpec",
+    "name fields label button glyph starts_path moves_xy sets_z is_move fixed",
+    defaults=(None, None, None, False, False, False, False, None),
+)
+
+ACTION_TYPES = [
+    "NO_ACTION",
+    "STOP_BURST",
+    "START_BURST",
+]
+
+ALTITUDE = dict(minimum=0.0, maximum=20.0, unit="m")  # the Z plot
+XY_SPEEDS = [0.5, 1.0, 1.5]  # m/s, the speeds the drone supports
+
+ACTION = Field("action", "Select Action Type", default="NO_ACTION")
+DOT = [("oval", (-5, -5, 5, 5), {"fill": "black", "outline": "black"})]
+
+# In the order of the command selection dialog
+COMMANDS = [
+    CommandSpec(
+        "SCHEDULE_MOVE_XYZ",
+        fields=[
+            ACTION,
+            Field("delay", "Enter delay:", minimum=0.0, default=0.0),
+            Field("velocity", "Enter velocity:", minimum=0.0, strict=True, default=1.0),
+            Field("x", "Enter x coordinate:"),
+            Field("y", "Enter y coordinate:"),
+            Field("yaw", "Enter yaw:"),
+            Field("z", "Enter z:", **ALTITUDE),
+        ],
+        label="Fly to XYZ",
+        button=(1, 4),
+        glyph=DOT,
+        starts_path=True,
+        moves_xy=True,
+        sets_z=True,
+        is_move=True,
+    ),
+    CommandSpec(
+        "SCHEDULE_FLY_TO_XY",
+        fields=[Field("x", "Enter x:"), Field("y", "Enter y:")],
+        label="Fly to XY",
+        button=(1, 3),
+        glyph=DOT,
+        moves_xy=True,
+        is_move=True,
+    ),
+    CommandSpec(
+        "SCHEDULE_FLY_TO_Z",
+        fields=[Field("z", "Enter z:", **ALTITUDE)],
+        label="Fly to Z",
+        button=(1, 1),
+        # Arrow pointing up
+        glyph=[("line", (0, -5, 0, 5), {"fill": "black"})],
+        starts_path=True,
+        sets_z=True,
+    ),
+    CommandSpec(
+        "SCHEDULE_FLY_TO_YAW",
+        fields=[Field("yaw", "Enter yaw:")],
+        label="Set Yaw",
+        button=(2, 3),
+        # Ring
+        glyph=[("oval", (-5, -5, 5, 5), {"fill": "white", "outline": "black"})],
+    ),
+    CommandSpec(
+        "SCHEDULE_SET_XY_SPEED",
+        fields=[Field("speed", "Enter speed:", choices=XY_SPEEDS, unit="m/s")],
+        label="Set XY Speed",
+        button=(2, 2),
+        # Triangle pointing to side
+        glyph=[("polygon", (5, 0, -5, 5, -5, -5), {"fill": "black"})],
+    ),
+    CommandSpec(
+        "SCHEDULE_SET_PAYLOAD_RECORDING",
+        fields=[],
+        label="Start Recording",
+        button=(2, 5),
+        glyph=DOT,
+    ),
+    CommandSpec(
+        "SCHEDULE_WAIT_FOR_PERIOD",
+        fields=[Field("period", "Enter period :", minimum=0.0)],
+        label="Delay",
+        button=(2, 1),
+        # Small X
+        glyph=[
+            ("line", (-3, -3, 3, 3), {"fill": "black"}),
+            ("line", (3, -3, -3, 3), {"fill": "black"}),
+        ],
+    ),
+    CommandSpec(
+        "SCHEDULE_TAKE_PICTURE",
+        fields=[],
+        label="Take Picture",
+        button=(2, 4),
+        glyph=DOT,
+    ),
+    CommandSpec(
+        "SCHEDULE_RETURN_TO_TAKEOFF_POSITION",
+        fields=[],
+        label="Return to Start",
+        button=(1, 2),
+        glyph=DOT,
+        moves_xy=True,
+        fixed={"x": 0.0, "y": 0.0},
+    ),
+]
+
+# Custom order for the arguments in the exported file
+ARGUMENTS_ORDER = [
+    "action",
+    "delay",
+    "velocity",
+    "x",
+    "y",
+    "yaw",
+    "z",
+    "speed",
+    "period",
+]
+
+# Numeric arguments, one storage column each
+FLOAT_ARGUMENTS = ["x", "y", "z", "yaw", "speed", "period", "delay", "velocity"]
+
+# Bit of every argument in the presence bitmap of a stored command
+ARGUMENT_BITS = {name: bit for bit, name in enumerate(FLOAT_ARGUMENTS + ["action"])}
+
+NO_ACTION_CODE = -1  # action argument present but empty
+
+SPECS = {spec.name: spec for spec in COMMANDS}
+
+# Order used by the command selection dialog
+COMMAND_TYPES = [spec.name for spec in COMMANDS]
+
+# Compact codes used by the array-backed path storage
+COMMAND_CODES = {command: code for code, command in enumerate(COMMAND_TYPES)}
+ACTION_CODES = {action: code for code, action in enumerate(ACTION_TYPES)}
+
+# Commands that may open a new path (a path always starts with a height)
+START_COMMANDS = [spec.name for spec in COMMANDS if spec.starts_path]
+
+# Commands that move the drone in the XY plane
+XY_COMMANDS = [spec.name for spec in COMMANDS if spec.moves_xy]
+
+# Commands that carry an explicit altitude
+Z_COMMANDS = [spec.name for spec in COMMANDS if spec.sets_z]
+
+# At least one of these is required before a path can be exported
+MOVE_COMMANDS = [spec.name for spec in COMMANDS if spec.is_move]
+
+# Buttons of the planner: {label: command} for row 1 and row 2, left to right
+COMMAND_BUTTONS = [
+    {
+        spec.label: spec.name
+        for spec in sorted(COMMANDS, key=lambda spec: spec.button or (0, 0))
+        if spec.button and spec.button[0] == row
+    }
+    for row in (1, 2)
+]
+
+
+class CommandCodec:
+    """
+    Everything done with the arguments of one command type, prepared from
+    its CommandSpec once: the fields it asks for, the checks of their
+    values, and the bitmap and JSON templates used to store and write it.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.name = spec.name
+        self.code = COMMAND_CODES[spec.name]
+        self.fields = spec.fields
+        self.floats = [field for field in spec.fields if field is not ACTION]
+        self.asks_action = ACTION in spec.fields
+        self.arguments = {field.name for field in spec.fields} | set(spec.fixed or {})
+        self.required_bits = 0
+        for field in spec.fields:
+            self.required_bits |= 1 << ARGUMENT_BITS[field.name]
+        checks = [(field, _value_check(field)) for field in self.floats]
+        self.checks = [(field, check) for field, check in checks if check]
+        self.type_json = json.dumps(spec.name)
+        self.templates = {}  # argument names as given -> (names in file order, template)
+
+    def ask(self, ask_float, ask_action=None):
+        """
+        Collects the arguments: ask_float(prompt) and ask_action() are
+        called for every value the command needs, so the GUI can pass its
+        dialogs and batch tools can pass plain functions.
+        """
+        if self.spec.fixed is not None:
+            return dict(self.spec.fixed)
+        arguments = {}
+        if self.asks_action:
+            arguments["action"] = ask_action() if ask_action else "NO_ACTION"
+        for field in self.floats:
+            arguments[field.name] = ask_float(field.prompt)
+        return arguments
+
+    def check(self, arguments):
+        """Problems with the arguments of one command, as (argument, message) pairs."""
+        problems = [
+            (field.name, f"{field.name} is missing.")
+            for field in self.fields
+            if field.name not in arguments
+        ]
+        for field, check in self.checks:
+            value = arguments.get(field.name)
+            if value is not None:
+                message = check(value)
+                if message:
+                    problems.append((field.name, message))
+        return problems
+
+    def parse(self, arguments):
+        """
+        The stored form of the arguments: (presence bitmap, action code,
+        [(float argument, value)]) with None values as NaN. Raises
+        ValueError for an argument the command does not take.
+        """
+        bitmap = 0
+        action = NO_ACTION_CODE
+        values = []
+        for name, value in arguments.items():
+            if name not in self.arguments:
+                raise ValueError(f"Unknown argument for {self.name}: {name}")
+            bit = ARGUMENT_BITS[name]
+            bitmap |= 1 << bit
+            if name == "action":
+                if value is not None:
+                    action = ACTION_CODES.get(value)
+                    if action is None:
+                        raise ValueError(f"Unknown action type: {value}")
+            else:
+                values.append((name, float("nan") if value is None else value))
+        return bitmap, action, values
+
+    def to_json(self, arguments):
+        """The command as written to the mission file, arguments in ARGUMENTS_ORDER."""
+        key = tuple(arguments)
+        template = self.templates.get(key)
+        if template is None:
+            names = [name for name in ARGUMENTS_ORDER if name in arguments]
+            fields = ", ".join(f'"{name}": {{}}' for name in names)
+            layout = f'{{{{"arguments": {{{{{fields}}}}}, "type": {self.type_json}}}}}'
+            template = self.templates[key] = (names, layout)
+        names, layout = template
+        return layout.format(*[json.dumps(arguments[name]) for name in names])
+
+
+def _value_check(field):
+    """A function returning the problem with a value of field, None without limits."""
+    name, unit = field.name, f" {field.unit}" if field.unit else ""
+    if field.choices is not None:
+        allowed = ", ".join(f"{choice:g}" for choice in field.choices)
+        return lambda value: (
+            None if value in field.choices else f"{name} {value:g} is not one of {allowed}{unit}."
+        )
+    if field.minimum is not None and field.maximum is not None:
+        low, high = field.minimum, field.maximum
+        return lambda value: (
+            None if low <= value <= high else f"{name} {value:g} is outside {low:g}..{high:g}{unit}."
+        )
+    if field.minimum is not None:
+        low = field.minimum
+        if field.strict:
+            limit = "positive" if low == 0 else f"more than {low:g}{unit}"
+            return lambda value: None if value > low else f"{name} {value:g} must be {limit}."
+        limit = "zero or more" if low == 0 else f"{low:g}{unit} or more"
+        return lambda value: None if value >= low else f"{name} {value:g} must be {limit}."
+    return None
+
+
+CODECS = {spec.name: CommandCodec(spec) for spec in COMMANDS}
+CODECS_BY_CODE = [CODECS[command] for command in COMMAND_TYPES]
+
+
+def get_command_arguments(command, ask_float, ask_action=None):
+    """
+    Collects the arguments of a command (see CommandCodec.ask). Returns
+    None for an unknown command.
+    """
+    codec = CODECS.get(command)
+    return codec.ask(ask_float, ask_action) if codec else None
+
+
+def order_arguments(arguments):
+    """Returns a copy of the arguments following ARGUMENTS_ORDER."""
+    return {k: arguments[k] for k in ARGUMENTS_ORDER if k in arguments}
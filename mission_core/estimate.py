@@ -0,0 +1,237 @@
+"""
+Flight time and battery use of a path, estimated before it is flown.
+
+Every command gets a duration from the state the drone is in when it
+starts (position, altitude, yaw and XY speed, all carried forward from
+the commands before it with array fills) and an energy from that
+duration plus the work of climbing. Running sums of both give the time
+and charge spent up to every point.
+
+Rows of a path never change in place (an edit inserts or deletes rows,
+each with a new id), so the estimator finds the first row whose id
+differs from what it computed last time and only redoes the rows from
+there on; the arrays grow by doubling like the path columns, so
+appending a command only computes that command.
+"""
+
+import numpy as np
+
+from .commands import COMMAND_CODES, XY_COMMANDS
+from .export import INITIAL_BLOCK
+
+# State of the drone when the path starts, set by the initial block
+START_SPEED = INITIAL_BLOCK[1]["arguments"]["speed"]
+START_YAW = INITIAL_BLOCK[2]["arguments"]["yaw"]
+
+FLY_TO_XY = COMMAND_CODES["SCHEDULE_FLY_TO_XY"]
+MOVE_XYZ = COMMAND_CODES["SCHEDULE_MOVE_XYZ"]
+FLY_TO_Z = COMMAND_CODES["SCHEDULE_FLY_TO_Z"]
+FLY_TO_YAW = COMMAND_CODES["SCHEDULE_FLY_TO_YAW"]
+SET_XY_SPEED = COMMAND_CODES["SCHEDULE_SET_XY_SPEED"]
+WAIT = COMMAND_CODES["SCHEDULE_WAIT_FOR_PERIOD"]
+TAKE_PICTURE = COMMAND_CODES["SCHEDULE_TAKE_PICTURE"]
+RETURN = COMMAND_CODES["SCHEDULE_RETURN_TO_TAKEOFF_POSITION"]
+XY_CODES = [COMMAND_CODES[command] for command in XY_COMMANDS]
+YAW_CODES = [FLY_TO_YAW, MOVE_XYZ]
+
+# Per-command arrays of FlightEstimator, all of the same length
+COLUMNS = ["x", "y", "yaw", "speed", "durations", "energies", "elapsed", "used"]
+
+
+class FlightProfile:
+    """Performance of the drone, the estimate is only as good as these numbers."""
+
+    def __init__(
+        self,
+        climb_speed=1.0,  # m/s
+        descent_speed=0.7,  # m/s
+        yaw_rate=45.0,  # degrees/s
+        picture_time=1.0,  # s
+        hover_power=180.0,  # W, drawn the whole flight
+        mass=1.5,  # kg
+        climb_efficiency=0.5,  # share of the extra power that ends up as height
+        battery=80.0,  # Wh
+        xy_acceleration=1.0,  # m/s², used by the simulator
+        z_acceleration=0.5,  # m/s²
+        yaw_acceleration=90.0,  # degrees/s²
+    ):
+        self.climb_speed = climb_speed
+        self.descent_speed = descent_speed
+        self.yaw_rate = yaw_rate
+        self.picture_time = picture_time
+        self.hover_power = hover_power
+        self.mass = mass
+        self.climb_efficiency = climb_efficiency
+        self.battery = battery
+        self.xy_acceleration = xy_acceleration
+        self.z_acceleration = z_acceleration
+        self.yaw_acceleration = yaw_acceleration
+
+
+def carry(values, sets, start):
+    """values where sets is True, else the last set value before (start before any)."""
+    last = np.maximum.accumulate(np.where(sets, np.arange(len(sets)), -1))
+    return np.where(last >= 0, values[np.maximum(last, 0)], start)
+
+
+class FlightEstimator:
+    """
+    Time and energy of every command of a PathModel. The totals call
+    update() themselves; the per-command arrays are current after it.
+    """
+
+    def __init__(self, path, profile=None, capacity=16):
+        self.path = path
+        self.profile = profile or FlightProfile()
+        self.size = 0
+        self.ids = np.empty(capacity, dtype=np.int64)  # rows the arrays below were computed for
+        self.columns = {name: np.empty(capacity) for name in COLUMNS}
+
+    # x, y, yaw, speed: state after every command; durations (s) and
+    # energies (Wh) of every command; elapsed and used: the same summed
+    # from the start to the end of every command
+
+    def __getattr__(self, name):
+        if name in COLUMNS:
+            return self.columns[name][: self.size]
+        raise AttributeError(name)
+
+    def _reserve(self, needed):
+        capacity = len(self.ids)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self.ids = np.resize(self.ids, capacity)
+        for name in COLUMNS:
+            self.columns[name] = np.resize(self.columns[name], capacity)
+
+    def _first_changed(self):
+        ids = self.path.store.ids[: len(self.path)]
+        common = min(len(ids), self.size)
+        changed = np.flatnonzero(ids[:common] != self.ids[:common])
+        return int(changed[0]) if len(changed) else common
+
+    def update(self):
+        """Recomputes the commands from the first one that changed on."""
+        store = self.path.store
+        size = len(store)
+        start = self._first_changed()
+        if start == size:  # unchanged, or rows only removed from the end
+            self.size = size
+            return self
+        profile = self.profile
+        rows = slice(start, size)
+        codes = store.command_codes()[rows]
+
+        # State before the first recomputed command
+        if start:
+            x0, y0 = self.x[start - 1], self.y[start - 1]
+            yaw0, speed0 = self.yaw[start - 1], self.speed[start - 1]
+            z0 = self.path.altitudes.altitude(start - 1)
+        else:
+            x0, y0, yaw0, speed0, z0 = 0.0, 0.0, START_YAW, START_SPEED, 0.0
+
+        moves_xy = np.isin(codes, XY_CODES)
+        x = carry(np.nan_to_num(store.column("x")[rows]), moves_xy, x0)
+        y = carry(np.nan_to_num(store.column("y")[rows]), moves_xy, y0)
+        sets_yaw = np.isin(codes, YAW_CODES) & store.has_value("yaw")[rows]
+        yaw = carry(store.column("yaw")[rows], sets_yaw, yaw0)
+        sets_speed = (codes == SET_XY_SPEED) & store.has_value("speed")[rows]
+        speed = carry(store.column("speed")[rows], sets_speed, speed0)
+        z = self.path.altitudes.altitudes()[rows]
+
+        x_before = np.concatenate(([x0], x[:-1]))
+        y_before = np.concatenate(([y0], y[:-1]))
+        z_before = np.concatenate(([z0], z[:-1]))
+        yaw_before = np.concatenate(([yaw0], yaw[:-1]))
+        speed_before = np.concatenate(([speed0], speed[:-1]))
+
+        horizontal = np.hypot(x - x_before, y - y_before)
+        climb = z - z_before
+        turn = np.abs((yaw - yaw_before + 180.0) % 360.0 - 180.0)
+
+        def value(name):
+            return np.nan_to_num(store.column(name)[rows])
+
+        velocity = value("velocity")
+        velocity = np.where(velocity > 0, velocity, speed_before)
+        vertical_time = np.where(
+            climb > 0, climb / profile.climb_speed, -climb / profile.descent_speed
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            durations = np.select(
+                [
+                    codes == MOVE_XYZ,
+                    np.isin(codes, [FLY_TO_XY, RETURN]),
+                    codes == FLY_TO_Z,
+                    codes == FLY_TO_YAW,
+                    codes == WAIT,
+                    codes == TAKE_PICTURE,
+                ],
+                [
+                    np.maximum(value("delay"), 0) + np.hypot(horizontal, climb) / velocity,
+                    horizontal / speed_before,
+                    vertical_time,
+                    turn / profile.yaw_rate,
+                    np.maximum(value("period"), 0),
+                    profile.picture_time,
+                ],
+                0.0,
+            )
+        durations = np.nan_to_num(durations, nan=0.0, posinf=0.0)
+        # Hover power the whole time plus the work of lifting the drone
+        climb_joules = profile.mass * 9.81 * np.maximum(climb, 0) / profile.climb_efficiency
+        energies = (profile.hover_power * durations + climb_joules) / 3600.0
+
+        elapsed0 = self.elapsed[start - 1] if start else 0.0
+        used0 = self.used[start - 1] if start else 0.0
+        self._reserve(size)
+        self.ids[rows] = store.ids[rows]
+        computed = {
+            "x": x,
+            "y": y,
+            "yaw": yaw,
+            "speed": speed,
+            "durations": durations,
+            "energies": energies,
+            "elapsed": elapsed0 + np.cumsum(durations),
+            "used": used0 + np.cumsum(energies),
+        }
+        for name in COLUMNS:
+            self.columns[name][rows] = computed[name]
+        self.size = size
+        return self
+
+    def return_leg(self):
+        """(time, energy) of the return to the take off position added on export."""
+        self.update()
+        if self.size == 0:
+            return 0.0, 0.0
+        profile = self.profile
+        horizontal = float(np.hypot(self.x[-1], self.y[-1]))
+        speed = float(self.speed[-1])
+        duration = horizontal / speed if speed > 0 else 0.0
+        return duration, profile.hover_power * duration / 3600.0
+
+    def total_time(self, include_return=True):
+        """Seconds from take off to the end of the path (and the return leg)."""
+        self.update()
+        total = float(self.elapsed[-1]) if len(self.elapsed) else 0.0
+        return total + (self.return_leg()[0] if include_return else 0.0)
+
+    def total_energy(self, include_return=True):
+        """Wh drawn from the battery."""
+        self.update()
+        total = float(self.used[-1]) if len(self.used) else 0.0
+        return total + (self.return_leg()[1] if include_return else 0.0)
+
+    def battery_used(self, include_return=True):
+        """Share of the battery the flight takes, above 1 if it does not last."""
+        return self.total_energy(include_return) / self.profile.battery
+
+
+def estimate_path(path, profile=None):
+    """(seconds, Wh, battery share) of a whole flight, return leg included."""
+    estimator = FlightEstimator(path, profile)
+    return estimator.total_time(), estimator.total_energy(), estimator.battery_used()
@@ -0,0 +1,148 @@
+"""
+Builds the mission file sent to the drone.
+
+The file is a JSON list: a fixed initial block, the commands of the path
+with ordered arguments, and a fixed final block.
+
+The file is written as a stream. For a PathModel the commands are read
+straight from the store columns a block at a time; every combination of
+command type and carried arguments gets a format string, built once, that
+lays the fields out in ARGUMENTS_ORDER. Memory use stays flat however long
+the path is, and the output is byte for byte what json.dump would write.
+"""
+
+import json
+import math
+
+from .commands import (
+    ACTION_TYPES,
+    ARGUMENT_BITS,
+    ARGUMENTS_ORDER,
+    CODECS,
+    COMMAND_TYPES,
+    order_arguments,
+)
+
+INITIAL_BLOCK = [
+    {"arguments": {"version": "2.0.0"}, "type": "SCHEDULE_PLANNER_VERSION"},
+    {"arguments": {"speed": 1.5}, "type": "SCHEDULE_SET_XY_SPEED"},
+    {"arguments": {"yaw": 90}, "type": "SCHEDULE_FLY_TO_YAW"},
+]
+
+FINAL_BLOCK = [
+    {"type": "SCHEDULE_RETURN_TO_TAKEOFF_POSITION"},
+    {
+        "type": "START_TASK",
+        "arguments": {
+            "task": {
+                "description": "",
+                "id": "JsNis48JmatqrH8id68b",
+                "name": "42L C-G",
+            }
+        },
+    },
+]
+
+BLOCK_SIZE = 4096  # commands formatted per write
+
+# Action codes to their JSON text, -1 (empty) wraps around to the last item
+ACTION_JSON = [json.dumps(action) for action in ACTION_TYPES] + ["null"]
+
+
+def build_mission(commands):
+    """Returns the full command list written to the mission file."""
+    export_points = [
+        {"arguments": order_arguments(command["arguments"]), "type": command["type"]}
+        for command in commands
+    ]
+    return INITIAL_BLOCK + export_points + FINAL_BLOCK
+
+
+def _float_json(value):
+    if value != value:  # NaN is an empty value
+        return "null"
+    if math.isinf(value):
+        return json.dumps(value)
+    return float.__repr__(value)
+
+
+def _projection(code, bitmap):
+    """Format string and argument names of one command type / argument set."""
+    names = [name for name in ARGUMENTS_ORDER if bitmap >> ARGUMENT_BITS[name] & 1]
+    fields = ", ".join(f'"{name}": {{}}' for name in names)
+    command = json.dumps(COMMAND_TYPES[code])
+    return f'{{{{"arguments": {{{{{fields}}}}}, "type": {command}}}}}', names
+
+
+def _store_items(store):
+    """Yields the JSON text of the commands in a WaypointStore, a block at a time."""
+    projections = {}
+    for start in range(0, len(store), BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, len(store))
+        codes = store.codes[start:stop].tolist()
+        present = store.present[start:stop].tolist()
+        columns = {name: store.values[name][start:stop].tolist() for name in store.values}
+        columns["action"] = store.actions[start:stop].tolist()
+        items = []
+        for row, key in enumerate(zip(codes, present)):
+            projection = projections.get(key)
+            if projection is None:
+                projection = projections[key] = _projection(*key)
+            template, names = projection
+            items.append(
+                template.format(
+                    *[
+                        ACTION_JSON[columns[name][row]]
+                        if name == "action"
+                        else _float_json(columns[name][row])
+                        for name in names
+                    ]
+                )
+            )
+        yield items
+
+
+def _command_items(commands):
+    """Same as _store_items for any iterable of {"type", "arguments"} dicts."""
+    items = []
+    for command in commands:
+        codec = CODECS.get(command["type"])
+        if codec is not None:
+            items.append(codec.to_json(command["arguments"]))
+        else:
+            arguments = order_arguments(command["arguments"])
+            items.append(json.dumps({"arguments": arguments, "type": command["type"]}))
+        if len(items) == BLOCK_SIZE:
+            yield items
+            items = []
+    if items:
+        yield items
+
+
+def write_mission(path, f, initial=INITIAL_BLOCK, final=FINAL_BLOCK):
+    """
+    Writes the path (a PathModel or any iterable of commands) to an open
+    text file, between the initial and final blocks.
+    """
+    store = getattr(path, "store", None)
+    blocks = _store_items(store) if store is not None else _command_items(path)
+    separator = "["
+    initial = [json.dumps(command) for command in initial]
+    final = [json.dumps(command) for command in final]
+    for items in _chain(initial, blocks, final):
+        if items:
+            f.write(separator + ", ".join(items))
+            separator = ", "
+    f.write("[]" if separator == "[" else "]")
+
+
+def _chain(first, blocks, last):
+    yield first
+    yield from blocks
+    yield last
+
+
+def export_mission(path, file, initial=INITIAL_BLOCK, final=FINAL_BLOCK):
+    """Writes the path (a PathModel or any iterable of commands) to file."""
+    with open(file, "w") as f:
+        write_mission(path, f, initial, final)
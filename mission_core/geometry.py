@@ -0,0 +1,75 @@
+"""
+Polyline helpers shared by the drawing code and the path tools.
+"""
+
+import numpy as np
+
+
+def segment_distances(xs, ys, x0, y0, x1, y1):
+    """Distances of the points (xs, ys) to the segment (x0, y0)-(x1, y1)."""
+    dx, dy = x1 - x0, y1 - y0
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return np.hypot(xs - x0, ys - y0)
+    t = np.clip(((xs - x0) * dx + (ys - y0) * dy) / length_sq, 0, 1)
+    return np.hypot(xs - (x0 + t * dx), ys - (y0 + t * dy))
+
+
+def simplify_polyline(xs, ys, tolerance):
+    """
+    Douglas-Peucker simplification.
+
+    Returns the indices of the points to keep so that no dropped point is
+    further than tolerance from the simplified line. The first and last
+    points are always kept.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    count = len(xs)
+    if count < 3:
+        return np.arange(count)
+
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        distances = segment_distances(
+            xs[start + 1 : end], ys[start + 1 : end], xs[start], ys[start], xs[end], ys[end]
+        )
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            middle = start + 1 + farthest
+            keep[middle] = True
+            stack.append((start, middle))
+            stack.append((middle, end))
+    return np.flatnonzero(keep)
+
+
+def decimate_polyline(xs, ys, tolerance, block=256):
+    """
+    Indices of a simplified polyline: consecutive points falling in the same
+    tolerance-sized cell are merged first, then Douglas-Peucker runs on what
+    is left, one block of points at a time so long dense lines stay linear.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    count = len(xs)
+    if count < 3:
+        return np.arange(count)
+
+    cells_x = np.floor(xs / tolerance)
+    cells_y = np.floor(ys / tolerance)
+    changed = np.ones(count, dtype=bool)
+    changed[1:] = (cells_x[1:] != cells_x[:-1]) | (cells_y[1:] != cells_y[:-1])
+    changed[-1] = True
+    candidates = np.flatnonzero(changed)
+
+    kept = []
+    for start in range(0, max(len(candidates) - 1, 1), block):
+        part = candidates[start : start + block + 1]
+        indices = part[simplify_polyline(xs[part], ys[part], tolerance)]
+        kept.append(indices if start == 0 else indices[1:])
+    return np.concatenate(kept)
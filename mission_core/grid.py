@@ -0,0 +1,201 @@
+"""
+Commands entered as text: the fields of one form, or rows pasted as a table.
+
+A table is what a spreadsheet or a text file gives when copied: one row
+per command, cells separated by tabs, semicolons, commas or spaces. The
+first row may name the columns (x, y, z, yaw, speed, type, action...);
+without it the columns are those of GRID_COLUMNS the command has,
+followed by its other fields. Empty cells take the default of their
+field. A "type" column sets the command of a row, the other rows use the
+one entered.
+
+Columns that are not arguments of the command of a row are settings
+flown before it: a z, yaw or speed value adds the SETTING_COMMANDS
+command whenever it changes, so rows of x, y, z fly a path of
+SCHEDULE_FLY_TO_XY at the given altitudes. Every row is checked against
+the command schema and all the problems are reported at once, as
+Diagnostic tuples whose index is the line of the text:
+
+    commands, diagnostics = parse_grid("x y z yaw\\n0 0 5 90\\n10 0 5 90")
+    if not diagnostics:
+        history.extend(commands)
+"""
+
+import math
+import re
+
+from .commands import ACTION_TYPES, ARGUMENTS_ORDER, CODECS, SPECS
+from .validation import ERROR, RANGE_RULES, Diagnostic
+
+# Columns pasted first when the table has no header, as far as the command has them
+GRID_COLUMNS = ["x", "y", "z", "yaw"]
+
+# Commands added before a row by a column its own command does not take
+SETTING_COMMANDS = {
+    "z": "SCHEDULE_FLY_TO_Z",
+    "yaw": "SCHEDULE_FLY_TO_YAW",
+    "speed": "SCHEDULE_SET_XY_SPEED",
+}
+
+TYPE_COLUMNS = ["type", "command"]
+
+KNOWN_COLUMNS = set(ARGUMENTS_ORDER + TYPE_COLUMNS)
+
+DEFAULT_COMMAND = "SCHEDULE_MOVE_XYZ"
+
+
+def default_columns(command):
+    """Columns of a table of command without a header row."""
+    names = [field.name for field in CODECS[command].floats]
+    return [name for name in GRID_COLUMNS if name in names] + [
+        name for name in names if name not in GRID_COLUMNS
+    ]
+
+
+def read_arguments(command, cells):
+    """
+    Reads the arguments of command from text cells ({argument: text}).
+    Returns the arguments and the problems with them as (argument,
+    message) pairs; empty cells take the default of their field.
+    """
+    codec = CODECS[command]
+    arguments, problems = {}, []
+    for field in codec.fields:
+        text = cells.get(field.name, "").strip()
+        if not text:
+            if field.default is not None:
+                arguments[field.name] = field.default
+        elif field.name == "action":
+            if text.upper() in ACTION_TYPES:
+                arguments["action"] = text.upper()
+            else:
+                problems.append(
+                    ("action", f"action {text} is not one of {', '.join(ACTION_TYPES)}.")
+                )
+        else:
+            try:
+                value = float(text.replace(",", "."))
+            except ValueError:
+                problems.append((field.name, f"{field.name} {text} is not a number."))
+                continue
+            if not math.isfinite(value):  # inf or nan, which JSON cannot carry
+                problems.append((field.name, f"{field.name} {text} is not a finite number."))
+                continue
+            arguments[field.name] = value
+    read = {name for name, _ in problems}
+    problems += [(name, message) for name, message in codec.check(arguments) if name not in read]
+    return arguments, problems
+
+
+def _rule(name, arguments, cells):
+    """Rule of a problem found by read_arguments, as the path checks name it."""
+    if name in arguments:
+        return RANGE_RULES.get(name, f"{name}_range")
+    return "grid_value" if cells.get(name, "").strip() else "missing_argument"
+
+
+def _split(text):
+    """The non empty lines of text as (line number, cells)."""
+    lines = text.splitlines()
+    if "\t" in text:
+        separator = "\t"
+    elif ";" in text:
+        separator = ";"
+    elif "," in text:
+        separator = ","
+    else:
+        separator = None
+    rows = []
+    for number, line in enumerate(lines):
+        if not line.strip():
+            continue
+        if separator is None:
+            cells = line.split()
+        else:
+            cells = [cell.strip() for cell in line.split(separator)]
+        rows.append((number, cells))
+    return rows
+
+
+def _is_header(cells):
+    for cell in cells:
+        try:
+            float(cell.replace(",", "."))
+        except ValueError:
+            if cell and cell.upper() not in CODECS:
+                return True
+    return False
+
+
+def parse_grid(text, command=DEFAULT_COMMAND, starts_path=False):
+    """
+    Reads the commands of a table (see the module docstring). Returns the
+    {"type", "arguments"} commands and the Diagnostic list; the commands
+    are only meant to be added when the list is empty. With starts_path
+    the rows open a new path, so the first command must be one that may.
+    """
+    rows = _split(text)
+    if not rows:
+        return [], []
+    columns = default_columns(command)
+    if _is_header(rows[0][1]):
+        number, header = rows.pop(0)
+        columns = [re.sub(r"\W+", "_", name.strip().lower()).strip("_") for name in header]
+        unknown = [name for name in columns if name not in KNOWN_COLUMNS]
+        if unknown:
+            return [], [
+                Diagnostic(
+                    ERROR,
+                    "grid_column",
+                    number,
+                    name,
+                    f"Line {number + 1}: there is no argument called {name}.",
+                )
+                for name in unknown
+            ]
+
+    commands, diagnostics = [], []
+    settings = {}
+
+    def report(number, name, rule, message):
+        diagnostics.append(Diagnostic(ERROR, rule, number, name, f"Line {number + 1}: {message}"))
+
+    for number, cells in rows:
+        if len(cells) > len(columns):
+            report(number, None, "grid_value", f"{len(cells)} cells for {len(columns)} columns.")
+            continue
+        row = dict(zip(columns, cells))
+        row_command = command
+        for name in TYPE_COLUMNS:
+            if row.get(name):
+                row_command = row[name].upper()
+        if row_command not in CODECS:
+            report(number, "type", "grid_value", f"{row_command} is not a command.")
+            continue
+        fields = {field.name for field in CODECS[row_command].fields}
+        for name, setting in SETTING_COMMANDS.items():
+            if name in fields or not row.get(name):
+                continue
+            arguments, problems = read_arguments(setting, row)
+            for argument, message in problems:
+                report(number, argument, _rule(argument, arguments, row), message)
+            if not problems and settings.get(name) != arguments[name]:
+                settings[name] = arguments[name]
+                commands.append({"type": setting, "arguments": arguments})
+        arguments, problems = read_arguments(row_command, row)
+        for argument, message in problems:
+            report(number, argument, _rule(argument, arguments, row), message)
+        for name in SETTING_COMMANDS:
+            if name in arguments:
+                settings[name] = arguments[name]
+        commands.append({"type": row_command, "arguments": arguments})
+
+    if starts_path and commands and not SPECS[commands[0]["type"]].starts_path:
+        report(
+            rows[0][0],
+            None,
+            "first_command",
+            f"a path must start with a height, not {commands[0]['type']}.",
+        )
+    diagnostics.sort(key=lambda diagnostic: diagnostic.index)
+    return commands, diagnostics
@@ -0,0 +1,129 @@
+"""
+Undo/redo journal for path edits.
+
+Every edit made through EditHistory is recorded with what is needed to
+reverse it: an inserted command is undone by deleting its index, a deleted
+command by inserting the removed command back. A journal entry only holds
+the one command involved, never a copy of the path, so stepping through
+thousands of edits costs the same as doing them.
+"""
+
+from contextlib import contextmanager
+
+
+class EditHistory:
+    def __init__(self, path, limit=None):
+        self.path = path
+        self.limit = limit  # maximum number of undo steps kept, None for no limit
+        self.undo_steps = []  # every step is a list of (kind, index, point)
+        self.redo_steps = []
+        self.open_step = None
+
+    def _record(self, kind, index, point):
+        if self.open_step is not None:
+            self.open_step.append((kind, index, point))
+            return
+        self.undo_steps.append([(kind, index, point)])
+        if self.limit is not None and len(self.undo_steps) > self.limit:
+            del self.undo_steps[0]
+        self.redo_steps = []
+
+    @contextmanager
+    def group(self):
+        """Edits made inside the block are undone and redone as a single step."""
+        if self.open_step is not None:  # already inside a group
+            yield
+            return
+        self.open_step = []
+        try:
+            yield
+        finally:
+            step, self.open_step = self.open_step, None
+            if step:
+                self.undo_steps.append(step)
+                if self.limit is not None and len(self.undo_steps) > self.limit:
+                    del self.undo_steps[0]
+                self.redo_steps = []
+
+    def append(self, command, arguments, position=(0.0, 0.0)):
+        return self.insert(len(self.path), command, arguments, position)
+
+    def insert(self, index, command, arguments, position=(0.0, 0.0)):
+        index = self.path.insert(index, command, arguments, position)
+        self._record("insert", index, self.path[index])
+        return index
+
+    def extend(self, commands, positions=None):
+        """Appends {"type", "arguments"} commands (see PathModel.extend) as one step."""
+        start = len(self.path)
+        self.path.extend(commands, positions)
+        with self.group():
+            for index in range(start, len(self.path)):
+                self._record("insert", index, self.path[index])
+
+    def extend_columns(self, codes, present, actions, values, positions=None):
+        """Appends rows given as columns (see PathModel.extend_columns) as one step."""
+        start = len(self.path)
+        self.path.extend_columns(codes, present, actions, values, positions)
+        with self.group():
+            for index in range(start, len(self.path)):
+                self._record("insert", index, self.path[index])
+
+    def delete(self, index):
+        if index < 0:
+            index += len(self.path)
+        point = self.path.delete(index)
+        self._record("delete", index, point)
+        return point
+
+    def clear(self):
+        self.undo_steps = []
+        self.redo_steps = []
+
+    def can_undo(self):
+        return bool(self.undo_steps)
+
+    def can_redo(self):
+        return bool(self.redo_steps)
+
+    def undo_size(self):
+        """Number of commands touched by the next undo."""
+        return len(self.undo_steps[-1]) if self.undo_steps else 0
+
+    def redo_size(self):
+        return len(self.redo_steps[-1]) if self.redo_steps else 0
+
+    def _apply(self, kind, index, point):
+        if kind == "insert":
+            self.path.insert(index, point["type"], point["arguments"], point["position"])
+        else:
+            self.path.delete(index)
+
+    def undo(self, on_edit=None):
+        """
+        Reverts the last step. on_edit(kind, index, point) is called after each
+        command is put back ("insert") or taken out ("delete") of the path.
+        Returns False when there is nothing to undo.
+        """
+        if not self.undo_steps:
+            return False
+        step = self.undo_steps.pop()
+        for kind, index, point in reversed(step):
+            inverse = "delete" if kind == "insert" else "insert"
+            self._apply(inverse, index, point)
+            if on_edit:
+                on_edit(inverse, index, point)
+        self.redo_steps.append(step)
+        return True
+
+    def redo(self, on_edit=None):
+        """Applies the last undone step again, see undo()."""
+        if not self.redo_steps:
+            return False
+        step = self.redo_steps.pop()
+        for kind, index, point in step:
+            self._apply(kind, index, point)
+            if on_edit:
+                on_edit(kind, index, point)
+        self.undo_steps.append(step)
+        return True
@@ -0,0 +1,166 @@
+"""
+Reads mission files written by export_mission back into a PathModel.
+
+The file is parsed as a stream, one command at a time, so big missions
+never have to sit in memory as one JSON document. The fixed initial and
+final blocks added on export are dropped and the remaining commands are
+loaded into the path in batches. An entry that is not a command (not an
+object with a type, arguments that are not an object, values that are
+not numbers) is reported as a ValueError naming the entry.
+"""
+
+import json
+import re
+from collections import deque
+
+from .commands import CODECS
+from .export import FINAL_BLOCK, INITIAL_BLOCK
+from .path_model import PathModel
+
+CHUNK_SIZE = 1 << 16  # characters read from the file at a time
+BATCH_SIZE = 10000  # commands loaded into the path at a time
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def iter_mission_file(f, chunk_size=CHUNK_SIZE):
+    """Yields the commands of an open mission file (a JSON list) one by one."""
+    decode = json.JSONDecoder().raw_decode
+    buffer = f.read(chunk_size)
+    position = WHITESPACE.match(buffer).end()
+    expected = "["  # "[" first, then a command, then "," or "]" after each one
+
+    while True:
+        if position >= len(buffer):
+            more = f.read(chunk_size)
+            if more:
+                buffer = buffer[position:] + more
+                position = WHITESPACE.match(buffer).end()
+                continue
+        if expected is None:
+            # A command may span reads, read on until it decodes
+            try:
+                command, end = decode(buffer, position)
+            except json.JSONDecodeError:
+                more = f.read(chunk_size)
+                if not more:
+                    raise
+                buffer = buffer[position:] + more
+                position = 0
+                continue
+            yield command
+            position = WHITESPACE.match(buffer, end).end()
+            expected = ","
+            continue
+
+        char = buffer[position : position + 1]
+        if expected == "[":
+            if char != "[":
+                raise ValueError("A mission file must contain a list of commands")
+            position = WHITESPACE.match(buffer, position + 1).end()
+            if buffer[position : position + 1] == "]":
+                return
+            expected = None
+        elif char == ",":
+            position = WHITESPACE.match(buffer, position + 1).end()
+            expected = None
+        elif char == "]":
+            return
+        else:
+            raise ValueError(f"Unexpected character in mission file: {char!r}")
+
+
+def strip_fixed_blocks(commands, stripped=None):
+    """
+    Yields the commands of the path, without the initial block in front and
+    the final block at the end when they match what export_mission writes.
+    The initial block may be any of the INITIAL_BLOCK entries in their
+    order, as long as it opens with the first one (an optimized export
+    leaves out the settings the path makes itself). The index in
+    INITIAL_BLOCK of every initial entry found, and "final" for the final
+    block, are added to the stripped set.
+    """
+    commands = iter(commands)
+    head = []
+    command = next(commands, None)
+    if command is not None and command == INITIAL_BLOCK[0]:
+        found = [0]
+        command = next(commands, None)
+        for index in range(1, len(INITIAL_BLOCK)):
+            if command is not None and command == INITIAL_BLOCK[index]:
+                found.append(index)
+                command = next(commands, None)
+        if stripped is not None:
+            stripped.update(found)
+    if command is not None:
+        head.append(command)
+
+    # Hold back as many commands as the final block has, they may be it
+    tail = deque()
+    for command in _chain(head, commands):
+        tail.append(command)
+        if len(tail) > len(FINAL_BLOCK):
+            yield tail.popleft()
+    if list(tail) != FINAL_BLOCK:
+        yield from tail
+    elif stripped is not None:
+        stripped.add("final")
+
+
+def check_command(command, number):
+    """Raises ValueError when entry number (counted from 1) of a mission file is not a command."""
+    if not isinstance(command, dict) or not isinstance(command.get("type"), str):
+        raise ValueError(f"Entry {number} of the mission file is not a command with a type")
+    if command["type"] not in CODECS:
+        raise ValueError(f"Entry {number}: unknown command type {command['type']}")
+    arguments = command.get("arguments")
+    if arguments is None:
+        return
+    if not isinstance(arguments, dict):
+        raise ValueError(f"Entry {number} ({command['type']}): arguments must be an object")
+    for name, value in arguments.items():
+        if value is None:
+            continue
+        if name == "action":
+            valid = isinstance(value, str)
+        else:
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+        if not valid:
+            raise ValueError(f"Entry {number} ({command['type']}): {name} {value!r} is not valid")
+
+
+def _checked(commands, stripped):
+    """Checks the commands left by strip_fixed_blocks, numbered as in the file."""
+    skipped = None
+    for row, command in enumerate(commands):
+        if skipped is None:  # the initial block is stripped before the first command
+            skipped = sum(1 for index in stripped if index != "final")
+        check_command(command, skipped + row + 1)
+        yield command
+
+
+def _chain(first, rest):
+    yield from first
+    yield from rest
+
+
+def load_mission(file, path=None, batch_size=BATCH_SIZE, stripped=None):
+    """
+    Reads a mission file into path (a new PathModel by default) and returns
+    the path. Commands are added in batches through PathModel.extend.
+    stripped is passed on to strip_fixed_blocks.
+    """
+    if path is None:
+        path = PathModel()
+    if stripped is None:
+        stripped = set()
+    with open(file) as f:
+        batch = []
+        commands = strip_fixed_blocks(iter_mission_file(f), stripped)
+        for command in _checked(commands, stripped):
+            batch.append(command)
+            if len(batch) >= batch_size:
+                path.extend(batch)
+                batch = []
+        path.extend(batch)
+    return path
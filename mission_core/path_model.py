@@ -0,0 +1,153 @@
+"""
+GUI-free model of a flight path.
+
+Every point holds the command type, its arguments and the position where
+the point is plotted on the XY grid (in meters, independent of the canvas
+scale - the plotted position is only a visual aid and can differ from the
+command coordinates). The points are kept in a columnar WaypointStore;
+indexing the model returns a freshly built dict for a single point, while
+whole-path queries run over the arrays. The altitude every command
+flies at is kept up to date in an AltitudeIndex and the plotted positions
+in a SpatialIndex used to pick points.
+"""
+
+import numpy as np
+
+from .altitude_index import AltitudeIndex
+from .commands import MOVE_COMMANDS, XY_COMMANDS
+from .spatial_index import SpatialIndex
+from .waypoint_store import WaypointStore
+
+
+class PathModel:
+    def __init__(self):
+        self.store = WaypointStore()
+        self.altitudes = AltitudeIndex()
+        self.spatial = SpatialIndex()
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, index):
+        command, arguments, position = self.store.row(self._index(index))
+        return {"type": command, "arguments": arguments, "position": position}
+
+    def __iter__(self):
+        for index in range(len(self.store)):
+            yield self[index]
+
+    def _index(self, index):
+        if index < 0:
+            index += len(self.store)
+        if not 0 <= index < len(self.store):
+            raise IndexError("path index out of range")
+        return index
+
+    def append(self, command, arguments, position=(0.0, 0.0)):
+        """Adds a command at the end of the path and returns its index."""
+        index = self.store.append(command, arguments, position)
+        self.altitudes.append(arguments.get("z"))
+        self.spatial.insert(int(self.store.ids[index]), *position)
+        return index
+
+    def insert(self, index, command, arguments, position=(0.0, 0.0)):
+        """Inserts a command before index and returns the index it ended up at."""
+        index = max(0, min(index, len(self.store)))
+        index = self.store.insert(index, command, arguments, position)
+        self.altitudes.insert(index, arguments.get("z"))
+        self.spatial.insert(int(self.store.ids[index]), *position)
+        return index
+
+    def extend(self, commands, positions=None):
+        """
+        Appends many {"type", "arguments"} commands in one batch. Without
+        positions, commands that move in XY are plotted at their x, y and
+        the others at the position of the command before them.
+        """
+        start = len(self.store)
+        if len(commands) == 0:
+            return
+        self.store.extend(commands, np.zeros((len(commands), 2)))
+        self._index_new(start, positions)
+
+    def extend_columns(self, codes, present, actions, values, positions=None):
+        """Same as extend with the commands given as WaypointStore columns."""
+        start = len(self.store)
+        if len(codes) == 0:
+            return
+        self.store.extend_columns(codes, present, actions, values, np.zeros((len(codes), 2)))
+        self._index_new(start, positions)
+
+    def _index_new(self, start, positions):
+        """Plots the rows from start on and adds them to the altitude and spatial indexes."""
+        store = self.store
+        stop = len(store)
+        if positions is None:
+            positions = self._default_positions(start)
+        positions = np.asarray(positions, dtype=np.float64).reshape(stop - start, 2)
+        store.plot_x[start:stop] = positions[:, 0]
+        store.plot_y[start:stop] = positions[:, 1]
+        self.altitudes.extend(store.column("z")[start:])
+        self.spatial.insert_many(store.ids[start:stop], positions[:, 0], positions[:, 1])
+
+    def _default_positions(self, start):
+        store = self.store
+        moves = store.is_command(XY_COMMANDS)[start:]
+        xs = np.nan_to_num(store.column("x")[start:])
+        ys = np.nan_to_num(store.column("y")[start:])
+        # Index of the last XY command at or before every new command
+        last_move = np.maximum.accumulate(np.where(moves, np.arange(len(moves)), -1))
+        x_before, y_before = self.position(start - 1) if start else (0.0, 0.0)
+        found = last_move >= 0
+        safe = np.maximum(last_move, 0)
+        return np.column_stack(
+            (np.where(found, xs[safe], x_before), np.where(found, ys[safe], y_before))
+        )
+
+    def delete(self, index):
+        """Removes the command at index and returns it."""
+        index = self._index(index)
+        self.spatial.remove(int(self.store.ids[index]))
+        command, arguments, position = self.store.delete(index)
+        self.altitudes.delete(index)
+        return {"type": command, "arguments": arguments, "position": position}
+
+    def clear(self):
+        self.store.clear()
+        self.altitudes.clear()
+        self.spatial.clear()
+
+    def position(self, index):
+        index = self._index(index)
+        return (float(self.store.plot_x[index]), float(self.store.plot_y[index]))
+
+    def last_position(self):
+        """Plot position of the last point, the origin for an empty path."""
+        if len(self.store) == 0:
+            return (0.0, 0.0)
+        return self.position(-1)
+
+    def last_known_z(self, index=None):
+        """
+        Z value of the closest point at or before index (the whole path by
+        default) that includes a Z value, 0 if no Z value was ever set.
+        """
+        if len(self.store) == 0:
+            return 0
+        return self.altitudes.altitude(self._index(-1 if index is None else index))
+
+    def find_point(self, x, y, radius):
+        """Index of the plotted point closest to (x, y) within radius, None if there is none."""
+        point_id = self.spatial.nearest(x, y, radius)
+        if point_id is None:
+            return None
+        return self.store.index_of(point_id)
+
+    def has_move_command(self):
+        return bool(self.store.is_command(MOVE_COMMANDS).any())
+
+    def commands(self):
+        """Yields the path as {"type", "arguments"} dicts."""
+        for index in range(len(self.store)):
+            command, arguments, _ = self.store.row(index)
+            yield {"type": command, "arguments": arguments}
@@ -0,0 +1,216 @@
+"""
+Removes commands that do not change how a path is flown.
+
+Run before export, the pass works on the store columns and repeats its
+rules until none of them finds anything more to remove:
+
+- consecutive SCHEDULE_WAIT_FOR_PERIOD commands become one wait, and
+  waits of zero seconds go;
+- XY speed, yaw and Z commands go when they set the value the drone
+  already has, or when another one overrides them before anything uses
+  them (an XY move for the speed, the next command for yaw and Z);
+- SCHEDULE_FLY_TO_XY commands go when they do not move the drone, or
+  when the waypoint lies on the straight line between the one before and
+  the one after it (within COLLINEAR_TOLERANCE) with nothing done there.
+
+The initial block sets the XY speed and yaw every mission starts with;
+the speed entry is left out of the exported file when the path sets its
+own before an XY move, the yaw entry when the first command of the path
+sets the yaw (every command is flown at the yaw set last, as in
+_settings). Commands with missing or empty arguments are
+never touched, the checks in mission_core.validation report them.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from .commands import COMMAND_CODES, MOVE_COMMANDS
+from .estimate import START_SPEED, START_YAW, FlightEstimator, carry
+from .export import INITIAL_BLOCK
+from .path_model import PathModel
+from .waypoint_store import FLOAT_ARGUMENTS
+
+FLY_TO_XY = COMMAND_CODES["SCHEDULE_FLY_TO_XY"]
+MOVE_XYZ = COMMAND_CODES["SCHEDULE_MOVE_XYZ"]
+FLY_TO_Z = COMMAND_CODES["SCHEDULE_FLY_TO_Z"]
+FLY_TO_YAW = COMMAND_CODES["SCHEDULE_FLY_TO_YAW"]
+SET_XY_SPEED = COMMAND_CODES["SCHEDULE_SET_XY_SPEED"]
+WAIT = COMMAND_CODES["SCHEDULE_WAIT_FOR_PERIOD"]
+RETURN = COMMAND_CODES["SCHEDULE_RETURN_TO_TAKEOFF_POSITION"]
+MOVE_CODES = [COMMAND_CODES[command] for command in MOVE_COMMANDS]
+
+COLLINEAR_TOLERANCE = 0.01  # m, off the line a dropped waypoint may be
+SAME_VALUE = 1e-9  # values closer than this are the same
+
+# Commands that fly at the XY speed set last
+SPEED_USERS = [FLY_TO_XY, MOVE_XYZ, RETURN]
+
+# What the pass removed: number of commands (initial block included) and
+# seconds of flight, as estimated by FlightEstimator
+Savings = namedtuple("Savings", "commands seconds")
+
+
+def _before(after, start):
+    """The state before every row given the state after it."""
+    return np.concatenate(([start], after[:-1]))
+
+
+def _next(rows, mask):
+    """Index of the first row at or after every row where mask is set, len(rows) for none."""
+    return np.minimum.accumulate(np.where(mask, rows, len(rows))[::-1])[::-1]
+
+
+def _overridden(rows, sets, users):
+    """Rows of sets whose value is set again before any row of users (a mask) reads it."""
+    next_set = np.append(_next(rows, sets)[1:], len(rows))
+    next_user = np.append(_next(rows, users)[1:], len(rows))
+    return sets & (next_set < next_user)
+
+
+class _Columns:
+    """The store columns of a path, cut down as commands are removed."""
+
+    def __init__(self, store):
+        size = len(store)
+        self.codes = store.codes[:size].copy()
+        self.present = store.present[:size].copy()
+        self.actions = store.actions[:size].copy()
+        self.values = {name: store.column(name).copy() for name in FLOAT_ARGUMENTS}
+        self.positions = store.positions().copy()
+
+    def __len__(self):
+        return len(self.codes)
+
+    def keep(self, rows):
+        self.codes = self.codes[rows]
+        self.present = self.present[rows]
+        self.actions = self.actions[rows]
+        self.values = {name: column[rows] for name, column in self.values.items()}
+        self.positions = self.positions[rows]
+
+    def has(self, name):
+        return ~np.isnan(self.values[name])
+
+
+def _waits(columns, drop):
+    """Merges runs of waits into their first one, drops waits of no time."""
+    period = columns.values["period"]
+    waits = (columns.codes == WAIT) & columns.has("period")
+    follows = waits & _before(waits, False)
+    first = waits & ~follows
+    run = np.cumsum(first) - 1
+    totals = np.bincount(run[waits], weights=period[waits], minlength=int(first.sum()))
+    period[first] = totals[run[first]]
+    drop |= follows | (first & (period == 0))
+
+
+def _settings(columns, drop, code, name, start, users=None, angle=False):
+    """
+    Drops settings that are overridden before use or repeat the current
+    value. users are the codes reading the setting, None for every other
+    command (the setting is then only overridden by the next command).
+    """
+    rows = np.arange(len(columns))
+    values = columns.values[name]
+    sets = (columns.codes == code) & columns.has(name)
+    reads = ~sets if users is None else np.isin(columns.codes, users)
+    overridden = _overridden(rows, sets, reads)
+    # The value in effect, from the settings that are used
+    live = (np.isin(columns.codes, [code, MOVE_XYZ]) & columns.has(name)) & ~overridden
+    before = _before(carry(values, live, start), start)
+    difference = values - before
+    if angle:
+        difference = (difference + 180.0) % 360.0 - 180.0
+    drop |= overridden | (sets & live & (np.abs(difference) < SAME_VALUE))
+
+
+def _moves(columns, drop):
+    """Drops XY moves that go nowhere and waypoints on a straight line."""
+    codes = columns.codes
+    x, y = columns.values["x"], columns.values["y"]
+    moves = (codes == FLY_TO_XY) & columns.has("x") & columns.has("y")
+    sets_xy = moves | (codes == MOVE_XYZ) & columns.has("x") & columns.has("y")
+    returns = codes == RETURN
+    # Position of the drone before every row, from the origin
+    x_after = carry(np.where(returns, 0.0, x), sets_xy | returns, 0.0)
+    y_after = carry(np.where(returns, 0.0, y), sets_xy | returns, 0.0)
+    x_before, y_before = _before(x_after, 0.0), _before(y_after, 0.0)
+    to_x, to_y = x - x_before, y - y_before
+    length = np.hypot(to_x, to_y)
+    drop |= moves & (length < SAME_VALUE)
+
+    # A waypoint B followed straight away by the next one C, flown from P
+    next_move = np.append(moves[1:], False)
+    next_x, next_y = np.append(x[1:], np.nan), np.append(y[1:], np.nan)
+    across_x, across_y = next_x - x_before, next_y - y_before
+    span = np.hypot(across_x, across_y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        off_line = np.abs(to_x * across_y - to_y * across_x) / span
+        along = (to_x * across_x + to_y * across_y) / span**2
+    on_line = (
+        moves
+        & next_move
+        & (length >= SAME_VALUE)
+        & (np.hypot(next_x - x, next_y - y) >= SAME_VALUE)
+        & (off_line <= COLLINEAR_TOLERANCE)
+        & (along > 0)
+        & (along < 1)
+    )
+    # Of consecutive candidates only every other one goes in a round, so the
+    # waypoints around a dropped one are still there
+    rows = np.arange(len(codes))
+    run_start = np.maximum.accumulate(np.where(on_line & ~_before(on_line, False), rows, 0))
+    drop |= on_line & ((rows - run_start) % 2 == 0)
+
+
+def _first(mask):
+    return int(np.argmax(mask)) if mask.any() else len(mask)
+
+
+def _initial_block(columns):
+    """The initial block without the settings the path overrides before use."""
+    codes = columns.codes
+    sets_speed = (codes == SET_XY_SPEED) & columns.has("speed")
+    sets_yaw = np.isin(codes, [FLY_TO_YAW, MOVE_XYZ]) & columns.has("yaw")
+    skipped = set()
+    if _first(sets_speed) < _first(np.isin(codes, SPEED_USERS)):
+        skipped.add("SCHEDULE_SET_XY_SPEED")
+    if _first(sets_yaw) == 0:
+        skipped.add("SCHEDULE_FLY_TO_YAW")
+    return [command for command in INITIAL_BLOCK if command["type"] not in skipped]
+
+
+def optimize_mission(path, profile=None):
+    """
+    Returns a copy of the path (a PathModel) without the commands that do not
+    change the flight, the initial block to export it with and the Savings.
+    """
+    columns = _Columns(path.store)
+    while True:
+        drop = np.zeros(len(columns), dtype=bool)
+        _waits(columns, drop)
+        _settings(columns, drop, SET_XY_SPEED, "speed", START_SPEED, SPEED_USERS)
+        _settings(columns, drop, FLY_TO_YAW, "yaw", START_YAW, angle=True)
+        _settings(columns, drop, FLY_TO_Z, "z", 0.0)
+        if len(drop):
+            drop[0] &= columns.codes[0] != FLY_TO_Z  # the path starts with its altitude
+        _moves(columns, drop)
+        moves = np.isin(columns.codes, MOVE_CODES)
+        if moves.any() and not (moves & ~drop).any():
+            drop[np.argmax(moves)] = False  # a path needs a move to be exported
+        if not drop.any():
+            break
+        columns.keep(~drop)
+
+    optimized = PathModel()
+    optimized.extend_columns(
+        columns.codes, columns.present, columns.actions, columns.values, columns.positions
+    )
+    initial = _initial_block(columns)
+    removed = len(path) - len(optimized) + len(INITIAL_BLOCK) - len(initial)
+    seconds = (
+        FlightEstimator(path, profile).total_time()
+        - FlightEstimator(optimized, profile).total_time()
+    )
+    return optimized, initial, Savings(removed, seconds)
@@ -0,0 +1,230 @@
+"""
+Reorders the waypoints of a path so it is flown in less time.
+
+A path is cut into stops: a SCHEDULE_FLY_TO_XY together with the actions
+that follow it (pictures, waits, yaw turns, recording), which always move
+with their waypoint. Only runs of consecutive stops are reordered. The
+commands that change what the drone does for the rest of the flight
+(altitude, XY speed, MOVE_XYZ and returns to the take off position) stay
+where they are and split the path into independent runs, and so does the
+first SCHEDULE_FLY_TO_XY, which is where the operator chose to start.
+
+Every run is an open route from where the drone is when the run starts
+to the next fixed position it flies to (or anywhere, when another run
+follows). It is solved on a precomputed distance matrix: a nearest
+neighbour route improved with 2-opt (reversing a stretch of the route)
+and Or-opt (moving one to three consecutive stops elsewhere) until
+neither finds a shorter route or the time limit is reached. The moves
+are evaluated for all positions at once with array operations, so a run
+of a few thousand stops is solved in seconds.
+"""
+
+import time
+from contextlib import nullcontext
+
+import numpy as np
+
+from .commands import COMMAND_CODES, XY_COMMANDS
+from .estimate import FlightEstimator
+
+FLY_TO_XY = COMMAND_CODES["SCHEDULE_FLY_TO_XY"]
+RETURN = COMMAND_CODES["SCHEDULE_RETURN_TO_TAKEOFF_POSITION"]
+XY_CODES = [COMMAND_CODES[command] for command in XY_COMMANDS]
+
+# Commands that belong to the waypoint before them
+ATTACHED_COMMANDS = [
+    "SCHEDULE_TAKE_PICTURE",
+    "SCHEDULE_WAIT_FOR_PERIOD",
+    "SCHEDULE_FLY_TO_YAW",
+    "SCHEDULE_SET_PAYLOAD_RECORDING",
+]
+
+TIME_LIMIT = 10.0  # s, spent improving the routes of one path
+MIN_GAIN = 1e-9  # m, shorter routes than this are not worth a change
+SEGMENT_LENGTHS = (1, 2, 3)  # stops moved at once by Or-opt
+
+
+def _distances(points, start, end):
+    """Distance matrix of start, the points and end (None for an open end)."""
+    nodes = np.vstack((start, points, end if end is not None else start))
+    distances = np.hypot(
+        nodes[:, None, 0] - nodes[None, :, 0], nodes[:, None, 1] - nodes[None, :, 1]
+    )
+    if end is None:  # reaching the end is free, the route can stop anywhere
+        distances[-1, :] = 0.0
+        distances[:, -1] = 0.0
+    return distances
+
+
+def _nearest_neighbour(distances):
+    """Route from the first node through all others, always to the closest one."""
+    count = len(distances) - 2
+    unvisited = np.ones(len(distances), dtype=bool)
+    unvisited[[0, -1]] = False
+    route = [0]
+    for _ in range(count):
+        row = np.where(unvisited, distances[route[-1]], np.inf)
+        node = int(np.argmin(row))
+        unvisited[node] = False
+        route.append(node)
+    route.append(len(distances) - 1)
+    return np.array(route)
+
+
+def _two_opt(route, distances):
+    """One pass of 2-opt, returns True if the route got shorter."""
+    last = len(route) - 2  # position of the last stop
+    improved = False
+    for i in range(1, last):
+        a, b = route[i - 1], route[i]
+        # Reversing route[i..j] for every j > i at once
+        c, d = route[i + 1 : last + 1], route[i + 2 : last + 2]
+        gain = distances[a, b] + distances[c, d] - distances[a, c] - distances[b, d]
+        best = int(np.argmax(gain))
+        if gain[best] > MIN_GAIN:
+            j = i + 1 + best
+            route[i : j + 1] = route[i : j + 1][::-1]
+            improved = True
+    return improved
+
+
+def _or_opt(route, distances, length):
+    """One pass of Or-opt moving length stops, returns the route and whether it got shorter."""
+    improved = False
+    i = 1
+    while i + length <= len(route) - 1:
+        segment = route[i : i + length]
+        first, last = segment[0], segment[-1]
+        before, after = route[i - 1], route[i + length]
+        removed = distances[before, first] + distances[last, after] - distances[before, after]
+        rest = np.concatenate((route[:i], route[i + length :]))
+        u, v = rest[:-1], rest[1:]
+        # Inserting the segment (as it is or reversed) between every u and v
+        forward = distances[u, first] + distances[last, v] - distances[u, v]
+        backward = distances[u, last] + distances[first, v] - distances[u, v]
+        j = int(np.argmin(np.minimum(forward, backward)))
+        if removed - min(forward[j], backward[j]) > MIN_GAIN:
+            moved = segment if forward[j] <= backward[j] else segment[::-1]
+            route = np.concatenate((rest[: j + 1], moved, rest[j + 1 :]))
+            improved = True
+        i += 1
+    return route, improved
+
+
+def solve_route(points, start, end=None, deadline=None):
+    """
+    Order in which to visit points (an N x 2 array) flying from start to
+    end (None to stop at the last point), as indexes into points.
+    """
+    if len(points) < 2:
+        return np.arange(len(points))
+    distances = _distances(np.asarray(points, dtype=float), start, end)
+    route = _nearest_neighbour(distances)
+    improved = True
+    while improved and (deadline is None or time.monotonic() < deadline):
+        improved = _two_opt(route, distances)
+        for length in SEGMENT_LENGTHS:
+            route, moved = _or_opt(route, distances, length)
+            improved |= moved
+    return route[1:-1] - 1
+
+
+def _stops(path):
+    """
+    Splits the path into (first row, end row, is free) items: a free item
+    is a stop that may be reordered, the others stay in place.
+    """
+    store = path.store
+    codes = store.command_codes()
+    attached = store.is_command(ATTACHED_COMMANDS)
+    located = store.has_value("x") & store.has_value("y")
+    free = (codes == FLY_TO_XY) & located
+    first_xy = np.flatnonzero(codes == FLY_TO_XY)
+    if len(first_xy):
+        free[first_xy[0]] = False  # where the operator chose to start
+    starts = np.flatnonzero(~attached)
+    if len(codes) and attached[0]:
+        starts = np.concatenate(([0], starts))
+    ends = np.append(starts[1:], len(codes))
+    return starts, ends, free[starts]
+
+
+def _position(path, index, current):
+    """Where the drone is after the command at index, starting from current."""
+    store = path.store
+    code = store.codes[index]
+    if code == RETURN:
+        return np.zeros(2)
+    if code in XY_CODES:
+        x, y = store.column("x")[index], store.column("y")[index]
+        return np.array([current[0] if x != x else x, current[1] if y != y else y])
+    return current
+
+
+def optimized_order(path, time_limit=TIME_LIMIT):
+    """
+    New order of the commands of the path as an array of row indexes,
+    with the runs of free waypoints reordered for the shortest flight.
+    """
+    store = path.store
+    starts, ends, free = _stops(path)
+    deadline = time.monotonic() + time_limit
+    x, y = store.column("x"), store.column("y")
+    # Row of the first XY move at or after every row, len(store) for none
+    rows = np.arange(len(store))
+    next_xy = np.minimum.accumulate(
+        np.where(store.is_command(XY_COMMANDS), rows, len(store))[::-1]
+    )[::-1]
+    order = []
+    current = np.zeros(2)
+    item = 0
+    while item < len(starts):
+        if not free[item]:
+            for index in range(starts[item], ends[item]):
+                current = _position(path, index, current)
+            order.append(np.arange(starts[item], ends[item]))
+            item += 1
+            continue
+        run_end = item
+        while run_end < len(starts) and free[run_end]:
+            run_end += 1
+        heads = starts[item:run_end]
+        # The next fixed place the drone flies to, the take off position
+        # when none follows (the exported mission returns there)
+        end = np.zeros(2)
+        index = next_xy[ends[run_end - 1]] if ends[run_end - 1] < len(store) else len(store)
+        if index < len(store):
+            end = None if store.codes[index] == FLY_TO_XY else _position(path, index, current)
+        visit = solve_route(np.column_stack((x[heads], y[heads])), current, end, deadline)
+        for stop in item + visit:
+            order.append(np.arange(starts[stop], ends[stop]))
+        current = np.array([x[heads[visit[-1]]], y[heads[visit[-1]]]])
+        item = run_end
+    return np.concatenate(order) if order else np.zeros(0, dtype=np.int64)
+
+
+def reorder_path(path, order, history=None):
+    """
+    Puts the commands of the path in the given order (see optimized_order).
+    With an EditHistory the change is one step that can be undone.
+    """
+    changed = np.flatnonzero(order != np.arange(len(order)))
+    if len(changed) == 0:
+        return
+    first = int(changed[0])
+    editor = history if history is not None else path
+    with history.group() if history is not None else nullcontext():
+        points = {}
+        for index in range(len(path) - 1, first - 1, -1):
+            points[index] = editor.delete(index)
+        for index in order[first:].tolist():
+            point = points[index]
+            editor.append(point["type"], point["arguments"], point["position"])
+
+
+def optimize_path(path, history=None, profile=None, time_limit=TIME_LIMIT):
+    """Reorders the path for the shortest flight and returns the seconds saved."""
+    estimator = FlightEstimator(path, profile)
+    before = estimator.total_time()
+    reorder_path(path, optimized_order(path, time_limit), history)
+    return before - estimator.total_time()
@@ -0,0 +1,170 @@
+"""
+Time-stepped simulation of a mission as the drone flies it.
+
+The simulator runs the exported command stream (initial block, path and
+final block with its return to the take off position) against a drone
+whose speed and acceleration are limited by a FlightProfile. Every move
+follows a trapezoidal speed profile: accelerate, cruise, brake to a stop
+at the target (or a triangle when the move is too short to reach the
+cruise speed).
+
+Walking the commands only works out where each move starts and ends;
+the positions at the sample times are then computed for all samples at
+once from the closed form of the profiles, so an hour of flight at 10 Hz
+takes well under a tenth of a second:
+
+    timeline = simulate(build_mission(path.commands()), rate=10)
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from .estimate import START_SPEED, START_YAW, FlightProfile
+from .export import build_mission
+
+# Samples of the flight: seconds since the start, position (m), yaw
+# (degrees, 0..360) and the index in the command stream being flown
+Timeline = namedtuple("Timeline", "time x y z yaw command")
+
+# Fields of one move: where it starts and ends, how far it goes along its
+# profile, the cruise speed and acceleration of that profile, the time it
+# holds before moving, and the index of its command in the stream
+MOVE_FIELDS = [
+    "x0", "y0", "z0", "yaw0",
+    "x1", "y1", "z1", "yaw1",
+    "distance", "speed", "acceleration", "delay", "command",
+]
+
+
+def _value(arguments, name, default):
+    value = arguments.get(name)
+    return default if value is None else float(value)
+
+
+def _turn(yaw, target):
+    """The yaw reached by turning the short way from yaw to target."""
+    return yaw + (target - yaw + 180.0) % 360.0 - 180.0
+
+
+def plan_moves(commands, profile=None, start_yaw=START_YAW):
+    """
+    Walks the command stream and returns one move per command as a dict of
+    arrays (see MOVE_FIELDS). Commands that take no time, and the ones the
+    drone does not fly (planner version, task), are zero length moves.
+    """
+    profile = profile or FlightProfile()
+    x = y = z = 0.0
+    yaw = start_yaw
+    xy_speed = START_SPEED
+    rows = []
+    for index, command in enumerate(commands):
+        kind = command.get("type")
+        arguments = command.get("arguments") or {}
+        x1, y1, z1, yaw1 = x, y, z, yaw
+        speed, acceleration, delay = 1.0, 1.0, 0.0
+        if kind == "SCHEDULE_FLY_TO_XY":
+            x1, y1 = _value(arguments, "x", x), _value(arguments, "y", y)
+            speed, acceleration = xy_speed, profile.xy_acceleration
+        elif kind == "SCHEDULE_RETURN_TO_TAKEOFF_POSITION":
+            x1, y1 = 0.0, 0.0
+            speed, acceleration = xy_speed, profile.xy_acceleration
+        elif kind == "SCHEDULE_MOVE_XYZ":
+            x1, y1 = _value(arguments, "x", x), _value(arguments, "y", y)
+            z1 = _value(arguments, "z", z)
+            yaw1 = _turn(yaw, _value(arguments, "yaw", yaw))
+            velocity = _value(arguments, "velocity", 0.0)
+            speed = velocity if velocity > 0 else xy_speed
+            acceleration = profile.xy_acceleration
+            delay = max(_value(arguments, "delay", 0.0), 0.0)
+        elif kind == "SCHEDULE_FLY_TO_Z":
+            z1 = _value(arguments, "z", z)
+            speed = profile.climb_speed if z1 > z else profile.descent_speed
+            acceleration = profile.z_acceleration
+        elif kind == "SCHEDULE_FLY_TO_YAW":
+            yaw1 = _turn(yaw, _value(arguments, "yaw", yaw))
+            speed, acceleration = profile.yaw_rate, profile.yaw_acceleration
+        elif kind == "SCHEDULE_SET_XY_SPEED":
+            xy_speed = _value(arguments, "speed", xy_speed)
+        elif kind == "SCHEDULE_WAIT_FOR_PERIOD":
+            delay = max(_value(arguments, "period", 0.0), 0.0)
+        elif kind == "SCHEDULE_TAKE_PICTURE":
+            delay = profile.picture_time
+
+        if kind == "SCHEDULE_FLY_TO_YAW":
+            distance = abs(yaw1 - yaw)
+        else:
+            distance = float(np.sqrt((x1 - x) ** 2 + (y1 - y) ** 2 + (z1 - z) ** 2))
+        if speed <= 0:  # the drone does not move at a zero speed
+            x1, y1, z1, yaw1, distance = x, y, z, yaw, 0.0
+        rows.append((x, y, z, yaw, x1, y1, z1, yaw1, distance, speed, acceleration, delay, index))
+        x, y, z, yaw = x1, y1, z1, yaw1
+
+    columns = np.array(rows, dtype=float).reshape(-1, len(MOVE_FIELDS))
+    moves = {name: columns[:, i] for i, name in enumerate(MOVE_FIELDS)}
+    moves["command"] = moves["command"].astype(np.int64)
+    return moves
+
+
+def _profile_times(moves):
+    """Peak speed and acceleration time of every move, and its total duration."""
+    distance, acceleration = moves["distance"], moves["acceleration"]
+    # The peak speed is lower than the cruise speed when the move is too short
+    peak = np.minimum(moves["speed"], np.sqrt(acceleration * distance))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        accelerating = np.where(peak > 0, peak / acceleration, 0.0)
+        cruising = np.where(peak > 0, distance / peak - accelerating, 0.0)
+    durations = moves["delay"] + 2 * accelerating + cruising
+    return peak, accelerating, durations
+
+
+def simulate(commands, rate=10.0, profile=None, start_yaw=START_YAW):
+    """
+    Simulates the command stream (a list as written to the mission file,
+    or a PathModel, which is flown between the initial and final blocks)
+    and returns its Timeline sampled rate times a second, the last sample
+    being the end of the flight.
+    """
+    if hasattr(commands, "store"):
+        commands = build_mission(commands.commands())
+    moves = plan_moves(commands, profile, start_yaw)
+    if len(moves["command"]) == 0:
+        return Timeline(*(np.zeros(1) for _ in range(5)), np.zeros(1, dtype=np.int64))
+
+    peak, accelerating, durations = _profile_times(moves)
+    ends = np.cumsum(durations)
+    starts = ends - durations
+    total = ends[-1]
+    time = np.append(np.arange(0.0, total, 1.0 / rate), total)
+
+    # The move flown at every sample, moves that take no time are never picked
+    move = np.minimum(np.searchsorted(ends, time, side="right"), len(ends) - 1)
+    moving = time - starts[move] - moves["delay"][move]
+    moving = np.clip(moving, 0.0, durations[move] - moves["delay"][move])
+    acceleration = moves["acceleration"][move]
+    distance = moves["distance"][move]
+    ramp = accelerating[move]
+    braking = durations[move] - moves["delay"][move] - moving
+    covered = np.select(
+        [moving < ramp, braking < ramp],
+        [
+            0.5 * acceleration * moving**2,
+            distance - 0.5 * acceleration * braking**2,
+        ],
+        0.5 * acceleration * ramp**2 + peak[move] * (moving - ramp),
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(distance > 0, covered / distance, 1.0)
+
+    def along(name):
+        start, end = moves[name + "0"][move], moves[name + "1"][move]
+        return start + share * (end - start)
+
+    return Timeline(
+        time,
+        along("x"),
+        along("y"),
+        along("z"),
+        along("yaw") % 360.0,
+        moves["command"][move],
+    )
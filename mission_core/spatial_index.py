@@ -0,0 +1,91 @@
+"""
+Uniform grid over the plotted positions of a path, used to find the point
+under the mouse without looking at every point.
+
+Points are stored by a stable id rather than by their index in the path,
+so inserting or deleting a command does not renumber the grid.
+"""
+
+import math
+
+import numpy as np
+
+
+class SpatialIndex:
+    def __init__(self, cell_size=5.0):
+        self.cell_size = cell_size  # meters
+        self.cells = {}  # (column, row) -> list of ids
+        self.points = {}  # id -> (x, y)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def insert(self, point_id, x, y):
+        self.points[point_id] = (x, y)
+        self.cells.setdefault(self._cell(x, y), []).append(point_id)
+
+    def insert_many(self, point_ids, xs, ys):
+        """Inserts arrays of ids and positions, with the cells computed in one pass."""
+        xs, ys = np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+        scaled_x, scaled_y = xs / self.cell_size, ys / self.cell_size
+        # Coordinates too large for int64 go through _cell like insert does
+        fits = (np.abs(scaled_x) < 2**62) & (np.abs(scaled_y) < 2**62)
+        columns = np.floor(np.where(fits, scaled_x, 0)).astype(np.int64)
+        rows = np.floor(np.where(fits, scaled_y, 0)).astype(np.int64)
+        for point_id, x, y, column, row, fit in zip(
+            point_ids.tolist(),
+            xs.tolist(),
+            ys.tolist(),
+            columns.tolist(),
+            rows.tolist(),
+            fits.tolist(),
+        ):
+            self.points[point_id] = (x, y)
+            cell = (column, row) if fit else self._cell(x, y)
+            self.cells.setdefault(cell, []).append(point_id)
+
+    def remove(self, point_id):
+        x, y = self.points.pop(point_id)
+        cell = self._cell(x, y)
+        ids = self.cells[cell]
+        ids.remove(point_id)
+        if not ids:
+            del self.cells[cell]
+
+    def clear(self):
+        self.cells = {}
+        self.points = {}
+
+    def nearest(self, x, y, radius):
+        """Id of the point closest to (x, y) within radius, None if there is none."""
+        column_min, row_min = self._cell(x - radius, y - radius)
+        column_max, row_max = self._cell(x + radius, y + radius)
+        scanned = (column_max - column_min + 1) * (row_max - row_min + 1)
+        if scanned > len(self.cells):
+            # Zoomed far out: walking the occupied cells is cheaper than the range
+            cells = [
+                cell
+                for cell in self.cells
+                if column_min <= cell[0] <= column_max and row_min <= cell[1] <= row_max
+            ]
+        else:
+            cells = [
+                (column, row)
+                for column in range(column_min, column_max + 1)
+                for row in range(row_min, row_max + 1)
+            ]
+
+        best_id, best_distance = None, radius
+        for cell in cells:
+            for point_id in self.cells.get(cell, ()):
+                px, py = self.points[point_id]
+                distance = math.hypot(px - x, py - y)
+                # On a tie prefer the newest point, it is drawn on top
+                if distance < best_distance or (
+                    distance == best_distance and (best_id is None or point_id > best_id)
+                ):
+                    best_id, best_distance = point_id, distance
+        return best_id
@@ -0,0 +1,144 @@
+"""
+Lawnmower survey patterns over a polygon.
+
+The area is covered with parallel lines spacing meters apart, flown at
+one altitude and back and forth in alternate directions. The polygon is
+turned so the lines run along the X axis, every line is intersected with
+every edge at once, and the crossings of a line, sorted, pair up into the
+legs that lie inside the polygon (a concave polygon can give a line more
+than one leg). Waypoints along the legs are spread the same way, so a
+survey of thousands of legs is built as whole columns and added to the
+path in one batch:
+
+    add_survey(path, [(0, 0), (40, 0), (40, 30), (0, 30)], altitude=10, spacing=5)
+"""
+
+import numpy as np
+
+from .commands import COMMAND_CODES
+from .waypoint_store import ARGUMENT_BITS, NO_ACTION_CODE
+
+FLY_TO_Z = COMMAND_CODES["SCHEDULE_FLY_TO_Z"]
+FLY_TO_XY = COMMAND_CODES["SCHEDULE_FLY_TO_XY"]
+TAKE_PICTURE = COMMAND_CODES["SCHEDULE_TAKE_PICTURE"]
+
+
+def survey_legs(polygon, spacing, heading=0.0):
+    """
+    Start and end points (two N x 2 arrays) of the legs covering the polygon,
+    in flying order. heading is the direction of the lines in degrees,
+    counterclockwise from the X axis.
+    """
+    polygon = np.asarray(polygon, dtype=float)
+    if polygon.ndim != 2 or polygon.shape[1] != 2:
+        raise ValueError("The corners of a survey area must be x, y pairs.")
+    if len(polygon) < 3:
+        raise ValueError("A survey area needs at least 3 corners.")
+    if not spacing > 0:
+        raise ValueError("The line spacing must be positive.")
+    angle = np.radians(heading)
+    cos, sin = np.cos(angle), np.sin(angle)
+    # Along the lines (u) and across them (v)
+    u = polygon[:, 0] * cos + polygon[:, 1] * sin
+    v = -polygon[:, 0] * sin + polygon[:, 1] * cos
+
+    # As many lines as strips of one spacing it takes to cover the polygon,
+    # centred across it: half a spacing inside on either side when the width
+    # is a multiple of spacing, never on an edge
+    width = v.max() - v.min()
+    count = max(int(np.ceil(width / spacing - 1e-9)), 1)
+    margin = (width - (count - 1) * spacing) / 2
+    lines = v.min() + margin + spacing * np.arange(count)
+
+    # Where every line crosses every edge, NaN where it does not
+    u0, v0 = u, v
+    u1, v1 = np.roll(u, -1), np.roll(v, -1)
+    line = lines[:, None]
+    crosses = ((v0 <= line) & (line < v1)) | ((v1 <= line) & (line < v0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        at = u0 + (line - v0) * (u1 - u0) / (v1 - v0)
+    crossings = np.sort(np.where(crosses, at, np.nan), axis=1)  # NaN sorts last
+    if crossings.shape[1] % 2:
+        crossings = np.column_stack((crossings, np.full(len(lines), np.nan)))
+    starts, ends = crossings[:, 0::2], crossings[:, 1::2]
+
+    # Every other line is flown backwards, its legs in reverse order
+    backwards = np.arange(len(lines)) % 2 == 1
+    reversed_starts = ends[backwards, ::-1]
+    ends[backwards] = starts[backwards, ::-1]
+    starts[backwards] = reversed_starts
+
+    valid = ~np.isnan(starts) & ~np.isnan(ends)
+    leg_v = np.broadcast_to(line, starts.shape)[valid]
+    starts, ends = starts[valid], ends[valid]
+
+    def to_xy(along):
+        return np.column_stack((along * cos - leg_v * sin, along * sin + leg_v * cos))
+
+    return to_xy(starts), to_xy(ends)
+
+
+def survey_waypoints(starts, ends, picture_spacing=None):
+    """
+    Waypoints along the legs: both ends of every leg, and with
+    picture_spacing points in between at most that far apart.
+    """
+    if picture_spacing:
+        lengths = np.hypot(*(ends - starts).T)
+        steps = np.maximum(np.ceil(lengths / picture_spacing), 1).astype(np.int64)
+    else:
+        steps = np.ones(len(starts), dtype=np.int64)
+    counts = steps + 1
+    leg = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.cumsum(counts) - counts
+    share = (np.arange(counts.sum()) - np.repeat(offsets, counts)) / steps[leg]
+    return starts[leg] + share[:, None] * (ends[leg] - starts[leg])
+
+
+def survey_columns(waypoints, altitude, pictures=True):
+    """
+    The commands flying the waypoints as WaypointStore columns (codes,
+    present, actions, values): SCHEDULE_FLY_TO_Z to the altitude, then a
+    SCHEDULE_FLY_TO_XY to every waypoint followed by a picture.
+    """
+    per_waypoint = [FLY_TO_XY, TAKE_PICTURE] if pictures else [FLY_TO_XY]
+    width = len(per_waypoint)
+    count = 1 + width * len(waypoints)
+    codes = np.empty(count, dtype=np.int8)
+    codes[0] = FLY_TO_Z
+    codes[1:] = np.tile(per_waypoint, len(waypoints))
+
+    xy_bits = 1 << ARGUMENT_BITS["x"] | 1 << ARGUMENT_BITS["y"]
+    present = np.zeros(count, dtype=np.uint16)
+    present[0] = 1 << ARGUMENT_BITS["z"]
+    present[1::width] = xy_bits
+
+    values = {name: np.full(count, np.nan) for name in ("x", "y", "z")}
+    values["z"][0] = altitude
+    values["x"][1::width] = waypoints[:, 0]
+    values["y"][1::width] = waypoints[:, 1]
+    actions = np.full(count, NO_ACTION_CODE, dtype=np.int8)
+    return codes, present, actions, values
+
+
+def add_survey(
+    path,
+    polygon,
+    altitude,
+    spacing,
+    heading=0.0,
+    picture_spacing=None,
+    pictures=True,
+    history=None,
+):
+    """
+    Appends a survey of the polygon to the path (through the EditHistory
+    when given, as one undo step) and returns the number of commands added.
+    """
+    starts, ends = survey_legs(polygon, spacing, heading)
+    if len(starts) == 0:
+        return 0
+    waypoints = survey_waypoints(starts, ends, picture_spacing)
+    columns = survey_columns(waypoints, altitude, pictures)
+    (history if history is not None else path).extend_columns(*columns)
+    return len(columns[0])
@@ -0,0 +1,266 @@
+"""
+Missions as tables of commands: CSV, and Parquet when pyarrow is installed.
+
+One row per command: a type column, a column per argument in
+ARGUMENTS_ORDER and the plotted position (plot_x, plot_y). Spreadsheets
+of coordinates load as they are:
+
+    read_table("survey.csv", columns={"Easting": "x", "Northing": "y"}, defaults={"yaw": 0})
+
+Column names are matched without regard to case, columns that are not
+arguments are ignored, and without a type column (or in its empty cells)
+every row is the command given. A row carries the arguments its command
+asks for (see mission_core.commands): a column the table does not have
+takes the default of the field, or the one in defaults, and empty cells
+are empty values, which mission_core.validation reports. The plotted
+positions are used when both columns are there and complete, otherwise
+they are worked out as for a mission file.
+
+The table is converted a column at a time: every column becomes one
+NumPy array, the command and action names are looked up once per
+distinct name, and the rows go into a PathModel through a single
+extend_columns, so hundreds of thousands of rows load in a few seconds.
+"""
+
+import csv
+import itertools
+import os
+
+import numpy as np
+
+from .commands import (
+    ACTION_CODES,
+    ACTION_TYPES,
+    ARGUMENT_BITS,
+    ARGUMENTS_ORDER,
+    CODECS_BY_CODE,
+    COMMAND_CODES,
+    COMMAND_TYPES,
+    NO_ACTION_CODE,
+)
+from .path_model import PathModel
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet files are optional, CSV always works
+    pa = pq = None
+
+TYPE_COLUMN = "type"
+POSITION_COLUMNS = ["plot_x", "plot_y"]
+TABLE_COLUMNS = [TYPE_COLUMN] + ARGUMENTS_ORDER + POSITION_COLUMNS
+
+DEFAULT_COMMAND = "SCHEDULE_MOVE_XYZ"
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+
+
+def _carried(codec):
+    """{argument: default} of the arguments a command carries, None for no default."""
+    carried = {field.name: field.default for field in codec.fields}
+    carried.update(codec.spec.fixed or {})
+    return carried
+
+
+CARRIED = [_carried(codec) for codec in CODECS_BY_CODE]
+CARRIED_BITS = np.array(
+    [sum(1 << ARGUMENT_BITS[name] for name in carried) for carried in CARRIED], dtype=np.uint16
+)
+
+
+def is_parquet(file):
+    return os.path.splitext(str(file))[1].lower() in PARQUET_EXTENSIONS
+
+
+def _require_parquet():
+    if pq is None:
+        raise ImportError("Parquet files need pyarrow: pip install pyarrow")
+
+
+def _read_csv(file):
+    """{column name: cell strings} of a CSV file with a header row."""
+    with open(file, newline="") as f:
+        rows = [row for row in csv.reader(f) if row]
+    if not rows:
+        return {}
+    header, rows = rows[0], rows[1:]
+    cells = list(itertools.zip_longest(*rows, fillvalue=""))
+    blank = ("",) * len(rows)
+    return {name: cells[i] if i < len(cells) else blank for i, name in enumerate(header)}
+
+
+def _read_parquet(file):
+    """{column name: NumPy array} of a Parquet file."""
+    _require_parquet()
+    table = pq.read_table(file)
+    return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+def _cells(column):
+    """A column as a list of stripped strings, "" for empty cells."""
+    if isinstance(column, np.ndarray):
+        column = column.tolist()
+    return ["" if value is None else str(value).strip() for value in column]
+
+
+def _floats(name, column):
+    """A column as float64, NaN for empty cells."""
+    if isinstance(column, np.ndarray) and column.dtype.kind in "biuf":
+        return column.astype(np.float64)
+    try:
+        # float() skips surrounding spaces itself
+        return np.array([float(value) if value else np.nan for value in column], dtype=np.float64)
+    except (TypeError, ValueError):
+        pass
+    cells = _cells(column)
+    for row, value in enumerate(cells):
+        try:
+            float(value or "nan")
+        except ValueError:
+            raise ValueError(f"Row {row + 1}: {name} {value} is not a number") from None
+    return np.array([float(value or "nan") for value in cells], dtype=np.float64)
+
+
+def _codes(name, column, codes, empty):
+    """
+    Names in a column as codes from the codes dict, empty for empty cells.
+    Every distinct name is looked up once.
+    """
+    cells = _cells(column)
+    lookup = {}
+    for value in set(cells):
+        key = value.upper()
+        if not key:
+            lookup[value] = empty
+        elif key in codes:
+            lookup[value] = codes[key]
+        else:
+            row = cells.index(value)
+            raise ValueError(f"Row {row + 1}: unknown {name} {value}")
+    return np.array([lookup[value] for value in cells], dtype=np.int8)
+
+
+def table_to_columns(table, command=DEFAULT_COMMAND, defaults=None):
+    """
+    Converts a table ({column name: array}, names already mapped) to the
+    columns taken by PathModel.extend_columns: (codes, present, actions,
+    values, positions), positions None when the table has none.
+    """
+    count = len(next(iter(table.values()))) if table else 0
+    defaults = defaults or {}
+    if TYPE_COLUMN in table:
+        codes = _codes("command", table[TYPE_COLUMN], COMMAND_CODES, COMMAND_CODES[command])
+    else:
+        codes = np.full(count, COMMAND_CODES[command], dtype=np.int8)
+    present = CARRIED_BITS[codes]
+
+    actions = np.full(count, NO_ACTION_CODE, dtype=np.int8)
+    values = {}
+    for name in ARGUMENTS_ORDER:
+        carries = (present >> ARGUMENT_BITS[name]) & 1 == 1
+        if name == "action":
+            if name in table:
+                column = _codes("action", table[name], ACTION_CODES, NO_ACTION_CODE)
+                filled = column != NO_ACTION_CODE
+            else:
+                column, filled = actions.copy(), np.zeros(count, dtype=bool)
+        else:
+            column = _floats(name, table[name]) if name in table else np.full(count, np.nan)
+            filled = ~np.isnan(column)
+        stray = filled & ~carries
+        if stray.any():
+            row = int(np.argmax(stray))
+            raise ValueError(f"Row {row + 1}: {COMMAND_TYPES[codes[row]]} takes no {name}")
+
+        # Fixed arguments always, defaults where the table has no column
+        for code, carried in enumerate(CARRIED):
+            if name not in carried:
+                continue
+            fixed = CODECS_BY_CODE[code].spec.fixed or {}
+            if name in fixed:
+                default = fixed[name]
+            elif name not in table:
+                default = defaults.get(name, carried[name])
+            else:
+                continue
+            if default is None:
+                continue
+            rows = (codes == code) & ~filled
+            column[rows] = ACTION_CODES[default] if name == "action" else default
+
+        if name == "action":
+            actions = column
+        else:
+            values[name] = column
+
+    positions = None
+    if all(name in table for name in POSITION_COLUMNS):
+        positions = np.column_stack([_floats(name, table[name]) for name in POSITION_COLUMNS])
+        if np.isnan(positions).any():
+            positions = None
+    return codes, present, actions, values, positions
+
+
+def read_table(file, path=None, columns=None, command=DEFAULT_COMMAND, defaults=None):
+    """
+    Reads a CSV or Parquet table of commands into path (a new PathModel by
+    default) and returns the path. columns renames columns of the file
+    ({name in the file: argument}), see the module docstring for the rest.
+    """
+    table = _read_parquet(file) if is_parquet(file) else _read_csv(file)
+    renames = {name.strip().lower(): target for name, target in (columns or {}).items()}
+    table = {
+        renames.get(name.strip().lower(), name.strip().lower()): column
+        for name, column in table.items()
+    }
+    table = {name: column for name, column in table.items() if name in TABLE_COLUMNS}
+    if path is None:
+        path = PathModel()
+    path.extend_columns(*table_to_columns(table, command, defaults))
+    return path
+
+
+def path_to_table(path):
+    """The commands of a PathModel as {column name: array}, in TABLE_COLUMNS order."""
+    store = path.store
+    count = len(store)
+    table = {TYPE_COLUMN: np.array(COMMAND_TYPES, dtype=object)[store.command_codes()]}
+    for name in ARGUMENTS_ORDER:
+        if name == "action":
+            # NO_ACTION_CODE (-1) wraps around to the None at the end
+            names = np.array(ACTION_TYPES + [None], dtype=object)
+            column = names[store.actions[:count]]
+            column[~store.has_argument(name)] = None
+        else:
+            column = np.where(store.has_argument(name), store.column(name), np.nan)
+        table[name] = column
+    table["plot_x"] = store.plot_x[:count].copy()
+    table["plot_y"] = store.plot_y[:count].copy()
+    return table
+
+
+def _write_csv(table, file):
+    cells = []
+    for column in table.values():
+        if column.dtype == object:
+            cells.append(["" if value is None else value for value in column.tolist()])
+        else:
+            cells.append(["" if value != value else repr(value) for value in column.tolist()])
+    with open(file, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(table)
+        writer.writerows(zip(*cells))
+
+
+def _write_parquet(table, file):
+    _require_parquet()
+    arrays = {name: pa.array(column, from_pandas=True) for name, column in table.items()}
+    pq.write_table(pa.table(arrays), file)
+
+
+def write_table(path, file):
+    """Writes the commands of a PathModel to a CSV or Parquet file (by extension)."""
+    table = path_to_table(path)
+    if is_parquet(file):
+        _write_parquet(table, file)
+    else:
+        _write_csv(table, file)
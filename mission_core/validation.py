@@ -0,0 +1,201 @@
+"""
+Checks run on a path before it is exported.
+
+Every rule looks at whole columns of the WaypointStore at once and reports
+the commands it flags as Diagnostic tuples, so checking a path costs a few
+array operations however long it is. That is cheap enough to run after
+every edit, and over a whole directory of stored missions:
+
+    python -m mission_core missions/*.json
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from .commands import (
+    ARGUMENT_BITS,
+    CODECS_BY_CODE,
+    COMMAND_TYPES,
+    FLOAT_ARGUMENTS,
+    START_COMMANDS,
+)
+from .importer import load_mission
+from .path_model import PathModel
+
+ERROR = "error"  # the path must not be exported
+
+# Arguments every command type needs before it can be flown
+REQUIRED_ARGUMENTS = {
+    codec.name: [field.name for field in codec.fields] for codec in CODECS_BY_CODE
+}
+REQUIRED_BITS = np.array([codec.required_bits for codec in CODECS_BY_CODE], dtype=np.uint16)
+
+# (command code, field, check) of every argument whose values are limited
+LIMITED_FIELDS = [
+    (codec.code, field, check) for codec in CODECS_BY_CODE for field, check in codec.checks
+]
+
+# Rule reported for values out of range, "<argument>_range" by default
+RANGE_RULES = {"z": "altitude_range"}
+
+# index is None for a diagnostic about the whole path, argument is None
+# when it is not about one argument
+Diagnostic = namedtuple("Diagnostic", "severity rule index argument message")
+
+
+def _point(path, index):
+    return f"Point {index + 1} ({COMMAND_TYPES[path.store.codes[index]]})"
+
+
+def check_empty_path(path):
+    if len(path) == 0:
+        yield Diagnostic(ERROR, "empty_path", None, None, "The path has no commands.")
+
+
+def check_move_command(path):
+    if len(path) and not path.has_move_command():
+        yield Diagnostic(
+            ERROR,
+            "no_move_command",
+            None,
+            None,
+            "At least one SCHEDULE_MOVE_XYZ or SCHEDULE_FLY_TO_XY command is required before exporting.",
+        )
+
+
+def check_first_command(path):
+    if len(path) and not path.store.is_command(START_COMMANDS)[0]:
+        yield Diagnostic(
+            ERROR,
+            "first_command",
+            0,
+            None,
+            f"{_point(path, 0)}: the path must start with SCHEDULE_FLY_TO_Z"
+            " (or SCHEDULE_MOVE_XYZ) so the drone knows its altitude.",
+        )
+
+
+def check_missing_arguments(path):
+    store = path.store
+    required = REQUIRED_BITS[store.command_codes()]
+    missing_rows = np.flatnonzero(store.present[: len(store)] & required != required)
+    for index in missing_rows.tolist():
+        present = int(store.present[index])
+        for name in REQUIRED_ARGUMENTS[COMMAND_TYPES[store.codes[index]]]:
+            if not present >> ARGUMENT_BITS[name] & 1:
+                yield Diagnostic(
+                    ERROR,
+                    "missing_argument",
+                    index,
+                    name,
+                    f"{_point(path, index)}: {name} is missing.",
+                )
+
+
+def check_empty_values(path):
+    store = path.store
+    for name in ARGUMENT_BITS:
+        empty = store.has_argument(name) & ~store.has_value(name)
+        for index in np.flatnonzero(empty).tolist():
+            yield Diagnostic(
+                ERROR,
+                "empty_value",
+                index,
+                name,
+                f"{_point(path, index)}: {name} has no value (the prompt was cancelled).",
+            )
+
+
+def check_infinite_values(path):
+    """Infinite values, which the mission file (JSON) cannot carry."""
+    store = path.store
+    for name in FLOAT_ARGUMENTS:
+        values = store.column(name)
+        for index in np.flatnonzero(store.has_argument(name) & np.isinf(values)).tolist():
+            yield Diagnostic(
+                ERROR,
+                "infinite_value",
+                index,
+                name,
+                f"{_point(path, index)}: {name} {values[index]:g} is not a finite number.",
+            )
+
+
+def _outside(field, values):
+    """Mask of the values the field does not allow (NaN is allowed, see check_empty_values)."""
+    with np.errstate(invalid="ignore"):
+        if field.choices is not None:
+            return ~np.isin(values, field.choices) & ~np.isnan(values)
+        outside = np.zeros(len(values), dtype=bool)
+        if field.minimum is not None:
+            outside |= values <= field.minimum if field.strict else values < field.minimum
+        if field.maximum is not None:
+            outside |= values > field.maximum
+        return outside
+
+
+def check_ranges(path):
+    """Values outside the limits the command schema sets for every argument."""
+    store = path.store
+    codes = store.command_codes()
+    for code, field, check in LIMITED_FIELDS:
+        values = store.column(field.name)
+        rows = (codes == code) & np.isfinite(values) & _outside(field, values)
+        for index in np.flatnonzero(rows).tolist():
+            yield Diagnostic(
+                ERROR,
+                RANGE_RULES.get(field.name, f"{field.name}_range"),
+                index,
+                field.name,
+                f"{_point(path, index)}: {check(values[index])}",
+            )
+
+
+RULES = [
+    check_empty_path,
+    check_move_command,
+    check_first_command,
+    check_missing_arguments,
+    check_empty_values,
+    check_infinite_values,
+    check_ranges,
+]
+
+
+def check_path(path, rules=RULES):
+    """
+    Runs the rules over the path (a PathModel or any iterable of commands)
+    and returns their diagnostics, path-wide ones first and then by command.
+    """
+    if not hasattr(path, "store"):
+        commands = list(path)
+        path = PathModel()
+        path.extend(commands)
+    diagnostics = [diagnostic for rule in rules for diagnostic in rule(path)]
+    diagnostics.sort(key=lambda d: -1 if d.index is None else d.index)
+    return diagnostics
+
+
+def validate_path(path):
+    """
+    Returns a list of error messages for the path (a PathModel or any
+    iterable of commands), empty when the path can be exported.
+    """
+    return [d.message for d in check_path(path) if d.severity == ERROR]
+
+
+def check_files(files):
+    """Checks stored mission files, prints their diagnostics and returns the exit status."""
+    failed = 0
+    for file in files:
+        try:
+            diagnostics = check_path(load_mission(file))
+        except (OSError, ValueError) as e:
+            diagnostics = [Diagnostic(ERROR, "unreadable", None, None, str(e))]
+        for diagnostic in diagnostics:
+            print(f"{file}: {diagnostic.severity}: {diagnostic.message}")
+        failed += any(d.severity == ERROR for d in diagnostics)
+    print(f"{len(files) - failed} of {len(files)} missions passed.")
+    return 1 if failed else 0
+
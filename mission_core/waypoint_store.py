@@ -0,0 +1,211 @@
+"""
+Array-backed storage for the commands of a path.
+
+Instead of one dict per command, every value lives in a NumPy column
+(command code, one float column per numeric argument, action code and
+the plotted position). A per-row bitmap records which arguments a
+command carries; a carried argument without a value (a cancelled dialog)
+is NaN. Every row also gets a stable id that survives inserts and deletes
+around it. Columns grow by doubling, so appending is amortized O(1), and
+inserting or deleting shifts the tail with a single slice copy per column.
+"""
+
+import numpy as np
+
+from .commands import (
+    ACTION_TYPES,
+    ARGUMENT_BITS,
+    ARGUMENTS_ORDER,
+    CODECS,
+    COMMAND_CODES,
+    COMMAND_TYPES,
+    FLOAT_ARGUMENTS,
+    NO_ACTION_CODE,
+)
+
+
+class WaypointStore:
+    def __init__(self, capacity=16):
+        self.size = 0
+        self.next_id = 0
+        self.ids = np.empty(capacity, dtype=np.int64)
+        self.codes = np.empty(capacity, dtype=np.int8)
+        self.present = np.zeros(capacity, dtype=np.uint16)
+        self.actions = np.empty(capacity, dtype=np.int8)
+        self.values = {
+            name: np.empty(capacity, dtype=np.float64) for name in FLOAT_ARGUMENTS
+        }
+        self.plot_x = np.empty(capacity, dtype=np.float64)
+        self.plot_y = np.empty(capacity, dtype=np.float64)
+
+    def __len__(self):
+        return self.size
+
+    def _arrays(self):
+        return [
+            self.ids,
+            self.codes,
+            self.present,
+            self.actions,
+            self.plot_x,
+            self.plot_y,
+        ] + list(self.values.values())
+
+    def _reserve(self, needed):
+        capacity = len(self.codes)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self.ids = np.resize(self.ids, capacity)
+        self.codes = np.resize(self.codes, capacity)
+        self.present = np.resize(self.present, capacity)
+        self.actions = np.resize(self.actions, capacity)
+        self.plot_x = np.resize(self.plot_x, capacity)
+        self.plot_y = np.resize(self.plot_y, capacity)
+        for name in FLOAT_ARGUMENTS:
+            self.values[name] = np.resize(self.values[name], capacity)
+
+    def _write(self, index, command, arguments, position):
+        codec = CODECS.get(command)
+        if codec is None:
+            raise ValueError(f"Unknown command type: {command}")
+        bitmap, action, values = codec.parse(arguments)
+        for name in FLOAT_ARGUMENTS:
+            self.values[name][index] = np.nan
+        for name, value in values:
+            self.values[name][index] = value
+        self.actions[index] = action
+        self.ids[index] = self.next_id
+        self.next_id += 1
+        self.codes[index] = codec.code
+        self.present[index] = bitmap
+        self.plot_x[index], self.plot_y[index] = position
+
+    def append(self, command, arguments, position=(0.0, 0.0)):
+        self._reserve(self.size + 1)
+        self._write(self.size, command, arguments, position)
+        self.size += 1
+        return self.size - 1
+
+    def insert(self, index, command, arguments, position=(0.0, 0.0)):
+        if index >= self.size:
+            return self.append(command, arguments, position)
+        self._reserve(self.size + 1)
+        for array in self._arrays():
+            array[index + 1 : self.size + 1] = array[index : self.size]
+        try:
+            self._write(index, command, arguments, position)
+        except ValueError:
+            for array in self._arrays():
+                array[index : self.size] = array[index + 1 : self.size + 1]
+            raise
+        self.size += 1
+        return index
+
+    def extend(self, commands, positions):
+        """
+        Appends many {"type", "arguments"} commands at once, positions is an
+        (n, 2) array of plotted positions. The columns are filled in one slice
+        assignment each instead of row by row.
+        """
+        count = len(commands)
+        codes = [0] * count
+        present = [0] * count
+        actions = [NO_ACTION_CODE] * count
+        columns = {name: [np.nan] * count for name in FLOAT_ARGUMENTS}
+        for row, command in enumerate(commands):
+            codec = CODECS.get(command["type"])
+            if codec is None:
+                raise ValueError(f"Unknown command type: {command['type']}")
+            codes[row] = codec.code
+            present[row], actions[row], values = codec.parse(command.get("arguments") or {})
+            for name, value in values:
+                columns[name][row] = value
+
+        self.extend_columns(codes, present, actions, columns, positions)
+
+    def extend_columns(self, codes, present, actions, values, positions):
+        """
+        Appends rows given as whole columns: command codes, presence bitmaps,
+        action codes, a {name: column} dict of float arguments (missing
+        names are all NaN) and an (n, 2) array of plotted positions.
+        """
+        count = len(codes)
+        start, end = self.size, self.size + count
+        self._reserve(end)
+        self.ids[start:end] = np.arange(self.next_id, self.next_id + count)
+        self.next_id += count
+        self.codes[start:end] = codes
+        self.present[start:end] = present
+        self.actions[start:end] = actions
+        for name in FLOAT_ARGUMENTS:
+            self.values[name][start:end] = values[name] if name in values else np.nan
+        positions = np.asarray(positions, dtype=np.float64).reshape(count, 2)
+        self.plot_x[start:end] = positions[:, 0]
+        self.plot_y[start:end] = positions[:, 1]
+        self.size = end
+
+    def delete(self, index):
+        """Removes row index and returns it as (command, arguments, position)."""
+        row = self.row(index)
+        for array in self._arrays():
+            array[index : self.size - 1] = array[index + 1 : self.size]
+        self.size -= 1
+        return row
+
+    def clear(self):
+        self.size = 0
+
+    def row(self, index):
+        """Returns (command, arguments, position) of a single row."""
+        if not 0 <= index < self.size:
+            raise IndexError("path index out of range")
+        bitmap = int(self.present[index])
+        arguments = {}
+        for name in ARGUMENTS_ORDER:
+            if bitmap & (1 << ARGUMENT_BITS[name]):
+                if name == "action":
+                    code = int(self.actions[index])
+                    arguments[name] = None if code < 0 else ACTION_TYPES[code]
+                else:
+                    value = float(self.values[name][index])
+                    arguments[name] = None if value != value else value
+        position = (float(self.plot_x[index]), float(self.plot_y[index]))
+        return COMMAND_TYPES[self.codes[index]], arguments, position
+
+    def index_of(self, row_id):
+        """Current index of the row with a given id, None if it was deleted."""
+        hits = np.flatnonzero(self.ids[: self.size] == row_id)
+        return int(hits[0]) if len(hits) else None
+
+    # Vectorized queries, all returning arrays of length len(self)
+
+    def column(self, name):
+        """Values of a numeric argument (NaN where missing or empty)."""
+        return self.values[name][: self.size]
+
+    def has_argument(self, name):
+        """Boolean mask of the rows that carry an argument."""
+        return (self.present[: self.size] >> ARGUMENT_BITS[name]) & 1 == 1
+
+    def has_value(self, name):
+        """Boolean mask of the rows that carry a non-empty argument."""
+        if name == "action":
+            return self.has_argument(name) & (self.actions[: self.size] >= 0)
+        return self.has_argument(name) & ~np.isnan(self.column(name))
+
+    def command_codes(self):
+        return self.codes[: self.size]
+
+    def is_command(self, commands):
+        """Boolean mask of the rows whose type is one of commands."""
+        codes = [COMMAND_CODES[command] for command in commands]
+        return np.isin(self.command_codes(), codes)
+
+    def positions(self):
+        """Plotted positions as an (n, 2) array."""
+        return np.column_stack((self.plot_x[: self.size], self.plot_y[: self.size]))
+
+    def nbytes(self):
+        return sum(array.nbytes for array in self._arrays())
@@ -0,0 +1,574 @@
+"""
+Canvas layers used by the Flight Planner to draw a path.
+
+The layers own their canvas items and update them in place, so adding a
+point costs the same no matter how long the path already is.
+"""
+
+import math
+
+import numpy as np
+
+from mission_core.commands import COMMAND_TYPES, COMMANDS
+from mission_core.geometry import decimate_polyline
+
+PROFILE_TAG = "profile"
+PROFILE_LINE_TAG = "profile_line"
+ROUTE_TAG = "route"
+ROUTE_LINE_TAG = "route_line"
+
+# Shape drawn for every command on the XY canvas, from the command schema
+DEFAULT_GLYPH = [("oval", (-5, -5, 5, 5), {"fill": "black", "outline": "black"})]
+GLYPHS = {spec.name: spec.glyph or DEFAULT_GLYPH for spec in COMMANDS}
+GLYPHS_BY_CODE = [GLYPHS.get(command, DEFAULT_GLYPH) for command in COMMAND_TYPES]
+
+
+class Viewport:
+    """
+    Maps meters to canvas pixels for a zoomable, pannable view.
+
+    `scale` is in pixels per meter and `center` is the point (in meters)
+    shown in the middle of the canvas. The default view is 250 m square
+    centred on the take off position.
+    """
+
+    MIN_SCALE = 0.01
+    MAX_SCALE = 500
+
+    def __init__(self, width=500, height=500, scale=2, center=(0.0, 0.0)):
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self.center = center
+
+    def to_pixels(self, x, y):
+        """Meters to pixels, accepts numbers or arrays."""
+        x_center, y_center = self.center
+        x_pixels = self.width / 2 + (x - x_center) * self.scale
+        # Invert y since positive y should go up (canvas y increases downwards)
+        y_pixels = self.height / 2 - (y - y_center) * self.scale
+        return x_pixels, y_pixels
+
+    def to_meters(self, x_pixels, y_pixels):
+        x_center, y_center = self.center
+        x = x_center + (x_pixels - self.width / 2) / self.scale
+        y = y_center - (y_pixels - self.height / 2) / self.scale
+        return x, y
+
+    def bounds(self):
+        """Visible area in meters as (x_min, y_min, x_max, y_max)."""
+        x_min, y_max = self.to_meters(0, 0)
+        x_max, y_min = self.to_meters(self.width, self.height)
+        return x_min, y_min, x_max, y_max
+
+    def zoom(self, factor, x_pixels=None, y_pixels=None):
+        """Zooms by factor keeping the point under (x_pixels, y_pixels) in place."""
+        if x_pixels is None:
+            x_pixels, y_pixels = self.width / 2, self.height / 2
+        x, y = self.to_meters(x_pixels, y_pixels)
+        self.scale = min(max(self.scale * factor, self.MIN_SCALE), self.MAX_SCALE)
+        x_after, y_after = self.to_meters(x_pixels, y_pixels)
+        x_center, y_center = self.center
+        self.center = (x_center + x - x_after, y_center + y - y_after)
+
+    def pan(self, dx_pixels, dy_pixels):
+        """Moves the view content by (dx_pixels, dy_pixels)."""
+        x_center, y_center = self.center
+        self.center = (
+            x_center - dx_pixels / self.scale,
+            y_center + dy_pixels / self.scale,
+        )
+
+    def fit(self, xs, ys, margin=20):
+        """Centres the view on the points and zooms so they all fit."""
+        if len(xs) == 0:
+            return
+        x_min, x_max = float(np.min(xs)), float(np.max(xs))
+        y_min, y_max = float(np.min(ys)), float(np.max(ys))
+        self.center = ((x_min + x_max) / 2, (y_min + y_max) / 2)
+        spans = []
+        if x_max > x_min:
+            spans.append((self.width - 2 * margin) / (x_max - x_min))
+        if y_max > y_min:
+            spans.append((self.height - 2 * margin) / (y_max - y_min))
+        if spans:
+            self.scale = min(max(min(spans), self.MIN_SCALE), self.MAX_SCALE)
+
+
+class ChunkedPolyline:
+    """
+    A polyline stored as line items of at most CHUNK points each.
+
+    Appending only rewrites the coordinates of the last item, consecutive
+    items share their end point so the line looks continuous.
+    """
+
+    CHUNK = 256
+
+    def __init__(self, canvas, tags, **options):
+        self.canvas = canvas
+        self.tags = tags  # the first tag must only be used by this line
+        self.options = options
+        self.items = []
+        self.last = []  # flat x, y coordinates of the last chunk
+
+    def append(self, x, y):
+        if len(self.last) >= 2 * self.CHUNK:
+            # Start a new chunk, connected to the last point of the previous one
+            self.last = self.last[-2:]
+            self.items.append(None)
+        if not self.items:
+            self.items.append(None)
+        self.last += [x, y]
+        if len(self.last) < 4:
+            return
+        if self.items[-1] is None:
+            self.items[-1] = self.canvas.create_line(
+                *self.last, tags=self.tags, **self.options
+            )
+        else:
+            self.canvas.coords(self.items[-1], *self.last)
+
+    def set_points(self, xs, ys):
+        """Replaces the whole line, building every chunk from the coordinate arrays."""
+        self.clear()
+        count = len(xs)
+        if count == 0:
+            return
+        coords = np.column_stack((xs, ys))
+        last_start = 0
+        for start in range(0, count - 1, self.CHUNK):
+            chunk = coords[start : start + self.CHUNK + 1]
+            self.items.append(
+                self.canvas.create_line(
+                    *chunk.ravel().tolist(), tags=self.tags, **self.options
+                )
+            )
+            last_start = start
+        if not self.items:
+            self.items.append(None)
+        self.last = coords[last_start:].ravel().tolist()
+
+    def scale(self, x_origin, y_origin, x_scale, y_scale):
+        self.canvas.scale(self.tags[0], x_origin, y_origin, x_scale, y_scale)
+        self.last[0::2] = [x_origin + (x - x_origin) * x_scale for x in self.last[0::2]]
+        self.last[1::2] = [y_origin + (y - y_origin) * y_scale for y in self.last[1::2]]
+
+    def clear(self):
+        self.canvas.delete(self.tags[0])
+        self.items = []
+        self.last = []
+
+
+class ItemPool:
+    """
+    Reusable canvas items, one free list per item kind.
+
+    begin() marks every item as free, take() hands out a free item (creating
+    one only if needed) and end() hides whatever was not taken again.
+    release() hides one item and frees it straight away. The items of a
+    kind in use are always the first `used` ones of its list.
+    """
+
+    def __init__(self, canvas, tags):
+        self.canvas = canvas
+        self.tags = tags  # the first tag must only be used by this pool
+        self.items = {"oval": [], "line": [], "polygon": [], "text": []}
+        self.used = {kind: 0 for kind in self.items}
+        self.slots = {}  # item -> (kind, position in its list)
+
+    def take(self, kind, coords, **options):
+        items = self.items[kind]
+        used = self.used[kind]
+        if used < len(items):
+            item = items[used]
+            self.canvas.coords(item, *coords)
+            self.canvas.itemconfig(item, state="normal", **options)
+        else:
+            create = getattr(self.canvas, f"create_{kind}")
+            item = create(*coords, tags=self.tags, **options)
+            self.slots[item] = (kind, len(items))
+            items.append(item)
+        self.used[kind] = used + 1
+        return item
+
+    def release(self, item):
+        """Hides an item handed out by take() and puts it back in the free list."""
+        kind, slot = self.slots[item]
+        items = self.items[kind]
+        last = self.used[kind] - 1
+        if slot > last:
+            return  # already free
+        # Swap it with the last item in use so the used ones stay in front
+        other = items[last]
+        items[slot], items[last] = other, item
+        self.slots[other] = (kind, slot)
+        self.slots[item] = (kind, last)
+        self.used[kind] = last
+        self.canvas.itemconfig(item, state="hidden")
+
+    def begin(self):
+        for kind in self.used:
+            self.used[kind] = 0
+
+    def end(self):
+        for kind, items in self.items.items():
+            for item in items[self.used[kind] :]:
+                self.canvas.itemconfig(item, state="hidden")
+
+    def clear(self):
+        self.canvas.delete(self.tags[0])
+        for kind in self.items:
+            self.items[kind] = []
+            self.used[kind] = 0
+        self.slots = {}
+
+
+class RouteLayer:
+    """
+    The path drawn on the XY canvas through a Viewport.
+
+    The route is drawn as line pieces of at most CHUNK points, each piece
+    remembering the range of path indices it covers. Only the segments
+    crossing the canvas are drawn and each visible stretch is simplified
+    with Douglas-Peucker to TOLERANCE pixels, so the number of canvas items
+    depends on what is visible at the current zoom, not on the path length.
+    Inserting or deleting a point only rebuilds the pieces around it.
+
+    Command shapes and point numbers are pooled items drawn only for points
+    inside the canvas; when more than MAX_MARKERS (MAX_LABELS) points are
+    visible only every n-th one gets a shape (number). The layer remembers
+    which point every shape and number belongs to, so inserting or deleting
+    a point only renumbers the numbers actually drawn.
+    """
+
+    CHUNK = 256
+    MAX_MARKERS = 2000
+    MAX_LABELS = 300
+    TOLERANCE = 0.5  # pixels
+    MARGIN = 10  # pixels around the canvas still considered visible
+
+    def __init__(self, canvas, viewport):
+        self.canvas = canvas
+        self.viewport = viewport
+        self.markers = ItemPool(canvas, ("route_marker", ROUTE_TAG))
+        self.labels = ItemPool(canvas, ("route_label", ROUTE_TAG))
+        self.count = 0
+        # Line pieces in path order: first and last path index covered, canvas item
+        self.piece_first = np.zeros(0, dtype=np.int64)
+        self.piece_last = np.zeros(0, dtype=np.int64)
+        self.piece_items = []
+        self.last_coords = []  # flat coordinates of the last piece, None if unknown
+        self.last_point = None  # pixel position of the last point of the path
+        self.marker_owners = []  # (path index, items) of every shape drawn
+        self.label_owners = []  # (path index, item) of every number drawn
+
+    def is_visible(self, x, y):
+        width, height = self.viewport.width, self.viewport.height
+        return (0 <= x) & (x <= width) & (0 <= y) & (y <= height)
+
+    def append(self, command, x, y):
+        """Draws the next point of the path, x and y in meters."""
+        x, y = self.viewport.to_pixels(x, y)
+        self.count += 1
+        self._append_route(x, y)
+        self._draw_point(self.count - 1, command, x, y)
+
+    def _append_route(self, x, y):
+        index = self.count - 1
+        previous, self.last_point = self.last_point, (x, y)
+        if previous is None:
+            return
+        if self.piece_items and self.piece_last[-1] == index - 1:
+            if self.last_coords is None:
+                self.last_coords = list(self.canvas.coords(self.piece_items[-1]))
+            if len(self.last_coords) < 2 * self.CHUNK:
+                self.last_coords += [x, y]
+                self.canvas.coords(self.piece_items[-1], *self.last_coords)
+                self.piece_last[-1] = index
+                return
+        self.last_coords = [previous[0], previous[1], x, y]
+        item = self.canvas.create_line(
+            *self.last_coords, fill="black", tags=(ROUTE_LINE_TAG, ROUTE_TAG)
+        )
+        self.piece_first = np.append(self.piece_first, index - 1)
+        self.piece_last = np.append(self.piece_last, index)
+        self.piece_items.append(item)
+
+    def _build_pieces(self, xs, ys, offset=0):
+        """
+        Line pieces for the points xs, ys (path indices offset, offset + 1, ...)
+        as (first indices, last indices, items).
+        """
+        count = len(xs)
+        firsts, lasts, items = [], [], []
+        if count < 2:
+            return np.array(firsts, dtype=np.int64), np.array(lasts, dtype=np.int64), items
+
+        # Cull the segments lying completely outside the canvas
+        low, high = -self.MARGIN, self.viewport.width + self.MARGIN
+        crosses = (np.maximum(xs[:-1], xs[1:]) >= low) & (
+            np.minimum(xs[:-1], xs[1:]) <= high
+        )
+        low, high = -self.MARGIN, self.viewport.height + self.MARGIN
+        crosses &= (np.maximum(ys[:-1], ys[1:]) >= low) & (
+            np.minimum(ys[:-1], ys[1:]) <= high
+        )
+        kept = np.zeros(count, dtype=bool)
+        kept[:-1] |= crosses
+        kept[1:] |= crosses
+        kept_indices = np.flatnonzero(kept)
+
+        # Split into continuous stretches and drop sub-pixel detail from each one
+        breaks = np.flatnonzero(np.diff(kept_indices) > 1) + 1
+        for stretch in np.split(kept_indices, breaks):
+            if len(stretch) < 2:
+                continue
+            stretch = stretch[decimate_polyline(xs[stretch], ys[stretch], self.TOLERANCE)]
+            for start in range(0, len(stretch) - 1, self.CHUNK):
+                chunk = stretch[start : start + self.CHUNK + 1]
+                coords = np.column_stack((xs[chunk], ys[chunk]))
+                item = self.canvas.create_line(
+                    *coords.ravel().tolist(),
+                    fill="black",
+                    tags=(ROUTE_LINE_TAG, ROUTE_TAG),
+                )
+                firsts.append(chunk[0] + offset)
+                lasts.append(chunk[-1] + offset)
+                items.append(item)
+        return np.array(firsts, dtype=np.int64), np.array(lasts, dtype=np.int64), items
+
+    def _patch_route(self, path, low, high, delta):
+        """
+        Rebuilds the pieces touching path indices low..high (before the edit)
+        after delta points were inserted (1) or deleted (-1) there.
+        """
+        # Pieces are ordered, so the ones touching low..high are found by bisection
+        start = int(np.searchsorted(self.piece_last, low, side="left"))
+        stop = int(np.searchsorted(self.piece_first, high, side="right"))
+        if stop > start:
+            low = min(low, int(self.piece_first[start]))
+            high = max(high, int(self.piece_last[stop - 1]))
+            for item in self.piece_items[start:stop]:
+                self.canvas.delete(item)
+
+        count = len(path)
+        low, high = max(low, 0), min(high + delta, count - 1)
+        store = path.store
+        xs, ys = self.viewport.to_pixels(
+            store.plot_x[low : high + 1], store.plot_y[low : high + 1]
+        )
+        firsts, lasts, items = self._build_pieces(xs, ys, low)
+        self.piece_first = np.concatenate(
+            (self.piece_first[:start], firsts, self.piece_first[stop:] + delta)
+        )
+        self.piece_last = np.concatenate(
+            (self.piece_last[:start], lasts, self.piece_last[stop:] + delta)
+        )
+        self.piece_items = self.piece_items[:start] + items + self.piece_items[stop:]
+        self.last_coords = None
+        self.last_point = self.viewport.to_pixels(*path.position(-1)) if count else None
+
+    def _draw_point(self, index, command, x, y):
+        if not self.is_visible(x, y):
+            return
+        if len(self.marker_owners) < self.MAX_MARKERS:
+            self._draw_marker(index, GLYPHS.get(command, DEFAULT_GLYPH), x, y)
+        if len(self.label_owners) < self.MAX_LABELS:
+            self._draw_label(index, x, y)
+
+    def _draw_marker(self, index, glyph, x, y):
+        items = []
+        for kind, offsets, options in glyph:
+            coords = [
+                offset + (x if i % 2 == 0 else y) for i, offset in enumerate(offsets)
+            ]
+            items.append(self.markers.take(kind, coords, **options))
+        self.marker_owners.append((index, items))
+
+    def _draw_label(self, index, x, y):
+        item = self.labels.take("text", (x, y - 10), text=str(index + 1))
+        self.label_owners.append((index, item))
+
+    def insert_point(self, index, command, path):
+        """
+        Draws a point inserted at index into path (a PathModel): the numbers
+        drawn after it are shifted and the route around it is rebuilt.
+        """
+        self._shift_owners(index, 1)
+        self.count += 1
+        self._patch_route(path, index - 1, index, 1)
+        x, y = self.viewport.to_pixels(*path.position(index))
+        self._draw_point(index, command, x, y)
+
+    def remove_point(self, index, path):
+        """Removes the point deleted at index from path (a PathModel)."""
+        for owner, items in self.marker_owners:
+            if owner == index:
+                for item in items:
+                    self.markers.release(item)
+        for owner, item in self.label_owners:
+            if owner == index:
+                self.labels.release(item)
+        self.marker_owners = [o for o in self.marker_owners if o[0] != index]
+        self.label_owners = [o for o in self.label_owners if o[0] != index]
+        self._shift_owners(index + 1, -1)
+        self.count -= 1
+        self._patch_route(path, index - 1, index + 1, -1)
+
+    def _shift_owners(self, start, delta):
+        """Moves the shapes and numbers of the points from start on by delta indices."""
+        self.marker_owners = [
+            (owner + delta if owner >= start else owner, items)
+            for owner, items in self.marker_owners
+        ]
+        label_owners = []
+        for owner, item in self.label_owners:
+            if owner >= start:
+                owner += delta
+                self.canvas.itemconfig(item, text=str(owner + 1))
+            label_owners.append((owner, item))
+        self.label_owners = label_owners
+
+    def redraw(self, path):
+        """Draws the whole path (a PathModel) in one pass."""
+        store = path.store
+        count = len(store)
+        xs, ys = self.viewport.to_pixels(store.plot_x[:count], store.plot_y[:count])
+        self.count = count
+        self.canvas.delete(ROUTE_LINE_TAG)
+        self.piece_first, self.piece_last, self.piece_items = self._build_pieces(xs, ys)
+        self.last_coords = None
+        self.last_point = (float(xs[-1]), float(ys[-1])) if count else None
+
+        visible = np.flatnonzero(self.is_visible(xs, ys))
+        codes = store.command_codes()
+
+        self.markers.begin()
+        self.marker_owners = []
+        stride = max(1, math.ceil(len(visible) / self.MAX_MARKERS))
+        for index in visible[::stride]:
+            self._draw_marker(
+                int(index), GLYPHS_BY_CODE[codes[index]], xs[index], ys[index]
+            )
+        self.markers.end()
+
+        self.labels.begin()
+        self.label_owners = []
+        stride = max(1, math.ceil(len(visible) / self.MAX_LABELS))
+        for index in visible[::stride]:
+            self._draw_label(int(index), xs[index], ys[index])
+        self.labels.end()
+
+    def move(self, dx, dy):
+        """Shifts everything drawn by (dx, dy) pixels, e.g. while dragging the view."""
+        self.canvas.move(ROUTE_TAG, dx, dy)
+        self.last_coords = None
+        if self.last_point is not None:
+            self.last_point = (self.last_point[0] + dx, self.last_point[1] + dy)
+
+    def clear(self):
+        self.canvas.delete(ROUTE_LINE_TAG)
+        self.markers.clear()
+        self.labels.clear()
+        self.count = 0
+        self.piece_first = np.zeros(0, dtype=np.int64)
+        self.piece_last = np.zeros(0, dtype=np.int64)
+        self.piece_items = []
+        self.last_coords = []
+        self.last_point = None
+        self.marker_owners = []
+        self.label_owners = []
+
+
+class AltitudeProfile:
+    """
+    Altitude of every command drawn on the Z canvas.
+
+    The profile is a ChunkedPolyline, only its last chunk changes when a
+    point is appended. The X axis holds `capacity` points and doubles when
+    it runs out; the existing line is then squeezed with one canvas.scale()
+    call instead of being redrawn. Only the last MARKERS points get a marker
+    and a number, taken from a fixed pool of items.
+    """
+
+    MARKERS = 20
+
+    def __init__(self, canvas, width=400, height=200, max_z=20, capacity=10):
+        self.canvas = canvas
+        self.width = width
+        self.height = height
+        self.max_z = max_z
+        self.initial_capacity = capacity
+        self.capacity = capacity
+        self.count = 0
+        self.line = ChunkedPolyline(canvas, (PROFILE_LINE_TAG, PROFILE_TAG))
+        self.markers = []  # pool of (oval, text) items
+        self.marker_points = {}  # pool slot -> (index, y)
+
+    def x_for(self, index):
+        return (self.width / self.capacity) * index
+
+    def y_for(self, z):
+        return self.height - (z / self.max_z) * self.height
+
+    def append(self, z):
+        """Plots the next point and returns its canvas coordinates."""
+        self.count += 1
+        if self.count > self.capacity:
+            self.rescale(self.capacity * 2)
+
+        x, y = self.x_for(self.count), self.y_for(z)
+        self.line.append(x, y)
+        self._place_marker(self.count, y)
+        return x, y
+
+    def _place_marker(self, index, y):
+        slot = (index - 1) % self.MARKERS
+        while len(self.markers) <= slot:
+            self.markers.append(
+                (
+                    self.canvas.create_oval(0, 0, 0, 0, fill="red", tags=PROFILE_TAG),
+                    self.canvas.create_text(0, 0, tags=PROFILE_TAG),
+                )
+            )
+        self.marker_points[slot] = (index, y)
+        self._move_marker(slot)
+
+    def _move_marker(self, slot):
+        oval, text = self.markers[slot]
+        index, y = self.marker_points[slot]
+        x = self.x_for(index)
+        self.canvas.coords(oval, x - 2, y - 2, x + 2, y + 2)
+        self.canvas.coords(text, x, y - 10)
+        self.canvas.itemconfig(text, text=str(index))
+
+    def rescale(self, capacity):
+        """Fits `capacity` points on the X axis with a single transform of the line."""
+        self.line.scale(0, 0, self.capacity / capacity, 1)
+        self.capacity = capacity
+        for slot in self.marker_points:
+            self._move_marker(slot)
+
+    def clear(self):
+        self.canvas.delete(PROFILE_TAG)
+        self.line.clear()
+        self.capacity = self.initial_capacity
+        self.count = 0
+        self.markers = []
+        self.marker_points = {}
+
+    def redraw(self, altitudes):
+        """Rebuilds the whole profile from an array of altitudes, e.g. after a delete."""
+        self.clear()
+        count = len(altitudes)
+        while self.capacity < count:
+            self.capacity *= 2
+        if count == 0:
+            return
+
+        ys = self.y_for(np.asarray(altitudes, dtype=np.float64))
+        self.line.set_points(self.x_for(np.arange(1, count + 1)), ys)
+        self.count = count
+        for index in range(max(1, count - self.MARKERS + 1), count + 1):
+            self._place_marker(index, float(ys[index - 1]))
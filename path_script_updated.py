@@ -1,9 +1,41 @@
+import math
+import os
 import tkinter as tk
 from tkinter import filedialog, simpledialog, messagebox, ttk
 
-import json
-import paramiko
-import re
+from drone_upload import (
+    SessionPool,
+    UploadQueue,
+    parse_target,
+    parse_targets,
+    read_inventory,
+    summarize,
+)
+from mission_core import (
+    ACTION_TYPES,
+    CODECS,
+    COMMAND_TYPES,
+    EditHistory,
+    FlightEstimator,
+    PathModel,
+    optimize_mission,
+    optimize_path,
+    add_survey,
+    export_mission,
+    load_mission,
+    check_path,
+    parse_grid,
+    read_arguments,
+    read_table,
+    write_table,
+)
+from mission_core.commands import COMMAND_BUTTONS, SPECS
+from mission_core.grid import default_columns
+from path_canvas import AltitudeProfile, RouteLayer, Viewport
+
+SESSION_CHECK_MS = 60000  # how often idle SSH sessions are looked for
+UPLOAD_POLL_MS = 100  # how often the window picks up upload progress
+MAX_SHOWN_ERRORS = 10  # problems listed when an export is refused
 
 
 class FlightPlannerApp(tk.Tk):
@@ -23,9 +55,20 @@ class FlightPlannerApp(tk.Tk):
             self, bg="white", width=500, height=500
         )  # Tkinter Canvas widget
         self.canvas.pack(pady=(20, 10))
+        # Zoom and pan of the XY canvas, starts as 250 meters centred on the take off position
+        self.viewport = Viewport(width=500, height=500, scale=2)
         self.draw_grid()
 
         self.canvas.bind("<Button-1>", self.on_canvas_click)
+        self.canvas.bind("<Shift-Button-1>", self.delete_point)
+        # Mouse wheel zooms around the pointer, dragging with the right button pans
+        self.canvas.bind("<MouseWheel>", self.on_canvas_zoom)
+        self.canvas.bind("<Button-4>", self.on_canvas_zoom)  # Linux wheel up
+        self.canvas.bind("<Button-5>", self.on_canvas_zoom)  # Linux wheel down
+        self.canvas.bind("<ButtonPress-3>", self.on_pan_start)
+        self.canvas.bind("<B3-Motion>", self.on_pan_move)
+        self.canvas.bind("<ButtonRelease-3>", self.on_pan_end)
+        self.pan_anchor = None
 
         # Coordinate canvas
         # FLY_TO_Z canvas
@@ -42,29 +85,13 @@ class FlightPlannerApp(tk.Tk):
         self.command_frame.place(
             x=420, y=540, anchor="n"
         )  # Place the frame at 250 pixels from the top and to the far right
-        self.point_counter = (
-            0  # Used to manage the indexing and scaling of points, on the Z canvas.
-        )
-        self.expected_total_points = (
-            10  # this is used to manage the scaling of the Z axis - expects
-        )
+        # Draws the altitude of every point on the Z canvas, rescaling the X axis as the path grows
+        self.altitude_profile = AltitudeProfile(self.canvas_z, width=400, height=200)
         self.last_z_value = 0  # default starting value
 
-        # A dictionary mapping button labels to their respective command types
-        self.command_buttons_row1 = {
-            "Fly to Z": "SCHEDULE_FLY_TO_Z",
-            "Return to Start": "SCHEDULE_RETURN_TO_TAKEOFF_POSITION",
-            "Fly to XY": "SCHEDULE_FLY_TO_XY",
-            "Fly to XYZ": "SCHEDULE_MOVE_XYZ",
-        }
-
-        self.command_buttons_row2 = {
-            "Delay": "SCHEDULE_WAIT_FOR_PERIOD",
-            "Set XY Speed": "SCHEDULE_SET_XY_SPEED",
-            "Set Yaw": "SCHEDULE_FLY_TO_YAW",
-            "Take Picture": "SCHEDULE_TAKE_PICTURE",
-            "Start Recording": "SCHEDULE_SET_PAYLOAD_RECORDING",
-        }
+        # Dictionaries mapping button labels to their respective command types,
+        # from the command schema
+        self.command_buttons_row1, self.command_buttons_row2 = COMMAND_BUTTONS
         # Creating subframes for two rows of buttons
         self.command_frame_row1 = ttk.Frame(self.command_frame)
         self.command_frame_row1.pack(side=tk.TOP, fill=tk.X)
@@ -91,6 +118,12 @@ class FlightPlannerApp(tk.Tk):
             )
             btn.pack(side=tk.LEFT, padx=5)
 
+        self.btn_open = ttk.Button(self, text="Open JSON", command=self.open_json)
+        self.btn_open.pack(side=tk.TOP, pady=(20, 0))
+
+        self.btn_export_table = ttk.Button(self, text="Export Table", command=self.export_table)
+        self.btn_export_table.pack(side=tk.TOP, pady=(10, 0))
+
         self.btn_export = ttk.Button(
             self, text="Export to JSON", command=self.export_to_json
         )
@@ -98,31 +131,133 @@ class FlightPlannerApp(tk.Tk):
             side=tk.TOP, pady=20
         )  # Stack this button below the previous buttons
 
-        self.path_points = (
-            []
-        )  # A list  stores dictionaries representing each point in the flight path, inclu type, arguments, and canvas coordinates.
+        # Leaves out the commands that do not change the flight from the exported file
+        self.optimize_export = tk.BooleanVar(value=False)
+        self.chk_optimize_export = ttk.Checkbutton(
+            self, text="Optimize on export", variable=self.optimize_export
+        )
+        self.chk_optimize_export.pack(side=tk.TOP, pady=(0, 10))
+
+        self.btn_fit = ttk.Button(self, text="Fit to Path", command=self.fit_to_path)
+        self.btn_fit.pack(side=tk.TOP)
+
+        self.btn_optimize = ttk.Button(self, text="Optimize Order", command=self.optimize_order)
+        self.btn_optimize.pack(side=tk.TOP, pady=(10, 0))
+
+        self.btn_survey = ttk.Button(self, text="Survey Area", command=self.add_survey)
+        self.btn_survey.pack(side=tk.TOP, pady=(10, 0))
+
+        self.btn_paste = ttk.Button(self, text="Paste Rows", command=self.paste_rows)
+        self.btn_paste.pack(side=tk.TOP, pady=(10, 0))
+
+        # Estimated flight time and battery use, kept current as the path is edited
+        self.estimate_label = ttk.Label(self)
+        self.estimate_label.pack(side=tk.TOP, pady=(10, 0))
+
+        # Undo / redo of path edits, also on Ctrl+Z and Ctrl+Y
+        self.btn_undo = ttk.Button(self, text="Undo", command=self.undo)
+        self.btn_undo.place(x=20, y=20)
+        self.btn_redo = ttk.Button(self, text="Redo", command=self.redo)
+        self.btn_redo.place(x=20, y=55)
+        self.bind("<Control-z>", self.undo)
+        self.bind("<Control-y>", self.redo)
+        self.bind("<Control-Z>", self.redo)  # Ctrl+Shift+Z
+
+        # The path is checked after every edit, the first problem is shown here
+        self.diagnostics_label = ttk.Label(self, wraplength=160, foreground="red")
+        self.diagnostics_label.place(x=10, y=100)
+
+        # Authenticated SSH sessions stay open between exports to the same drone
+        self.ssh_pool = SessionPool()
+        self.after(SESSION_CHECK_MS, self.evict_idle_sessions)
+        # Uploads run on a background thread, the window polls their progress
+        self.upload_queue = UploadQueue(self.ssh_pool)
+        self.uploads_window = None
+        self.after(UPLOAD_POLL_MS, self.poll_uploads)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # The flight path itself lives in a GUI-free model, this window only draws it
+        self.path = PathModel()
+        # Every edit goes through the history so it can be undone
+        self.history = EditHistory(self.path)
+        # Only recomputes the commands after the first edited one
+        self.estimator = FlightEstimator(self.path)
+        # Last values entered in the form of every command, offered again next time
+        self.form_values = {}
+        # Draws the path on the XY canvas as one polyline plus pooled shapes and numbers
+        self.route_layer = RouteLayer(self.canvas, self.viewport)
         self.draw_axis_names()
+        self.update_path_info()
 
     """
     These methods draw grid lines on the canvases for better 
     visualization of the XY plane and Z axis."""
 
     def draw_grid(self):
-        # Define the number of ticks based on the area and tick size
-        # 250 meters with each tick representing 10 meters
-        tick_spacing = 20  # pixels per tick, for simplicity in visualization
-        num_ticks = (
-            250 // 10
-        )  # Number of ticks to represent 250 meters with each tick being 10 meters
+        self.canvas.delete("grid")
+        # Pick the smallest "round" tick (in meters) that is at least 20 pixels wide,
+        # at the default zoom this is one tick every 10 meters
+        tick = 1
+        for step in [2, 2.5, 2] * 8:
+            if tick * self.viewport.scale >= 20:
+                break
+            tick *= step
+        x_min, y_min, x_max, y_max = self.viewport.bounds()
         # Draw grid lines based on the tick spacing
-        for i in range(num_ticks + 1):  # +1 to include the last line at the edge
-            # Calculate position for each line
-            pos = i * tick_spacing
-            self.canvas.create_line(pos, 0, pos, 500, fill="gray")  # Vertical lines
-            self.canvas.create_line(0, pos, 500, pos, fill="gray")  # Horizontal lines
+        x = math.floor(x_min / tick) * tick
+        while x <= x_max:
+            pos, _ = self.viewport.to_pixels(x, 0)
+            self.canvas.create_line(pos, 0, pos, 500, fill="gray", tags="grid")  # Vertical lines
+            x += tick
+        y = math.floor(y_min / tick) * tick
+        while y <= y_max:
+            _, pos = self.viewport.to_pixels(0, y)
+            self.canvas.create_line(0, pos, 500, pos, fill="gray", tags="grid")  # Horizontal lines
+            y += tick
+
+        # Draw center point (the take off position)
+        x_center, y_center = self.viewport.to_pixels(0, 0)
+        self.canvas.create_oval(
+            x_center - 5, y_center - 5, x_center + 5, y_center + 5, fill="red", tags="grid"
+        )
+        self.canvas.tag_lower("grid")
 
-        # Draw center point (optional, depending on your needs)
-        self.canvas.create_oval(245, 245, 255, 255, fill="red")
+    def redraw_canvas(self):
+        """Redraws the grid and the path on the XY canvas for the current zoom and pan."""
+        self.draw_grid()
+        self.route_layer.redraw(self.path)
+
+    def on_canvas_zoom(self, event):
+        if event.num == 5 or event.delta < 0:
+            factor = 1 / 1.25
+        else:
+            factor = 1.25
+        self.viewport.zoom(factor, event.x, event.y)
+        self.redraw_canvas()
+
+    def on_pan_start(self, event):
+        self.pan_anchor = (event.x, event.y)
+
+    def on_pan_move(self, event):
+        # While dragging only move the existing items, the path is redrawn on release
+        if self.pan_anchor is None:
+            return
+        dx, dy = event.x - self.pan_anchor[0], event.y - self.pan_anchor[1]
+        self.pan_anchor = (event.x, event.y)
+        self.viewport.pan(dx, dy)
+        self.canvas.move("grid", dx, dy)
+        self.route_layer.move(dx, dy)
+
+    def on_pan_end(self, event):
+        self.pan_anchor = None
+        self.redraw_canvas()
+
+    def fit_to_path(self):
+        if len(self.path) == 0:
+            return
+        positions = self.path.store.positions()
+        self.viewport.fit(positions[:, 0], positions[:, 1])
+        self.redraw_canvas()
 
     """
     These methods draw grid lines on the canvases for better 
@@ -134,18 +269,12 @@ class FlightPlannerApp(tk.Tk):
             self.canvas_z.create_line(0, i, 400, i, dash=(2, 2))
 
     def meters_to_pixels(self, x_meters, y_meters):
-        scale = 2  # 2 pixels per meter because 500 pixels cover 250 meters
-        # Convert meters to pixels
-        x_pixels = x_meters * scale
-        y_pixels = y_meters * scale
-        # Adjust for canvas origin to make (0,0) meters at the center of the canvas
-        x_center_offset = 250  # Center of the canvas in pixels (if canvas is 500x500)
-        y_center_offset = 250  # Same as above
-        # Adjust x normally since positive x is right
-        x_adjusted = x_center_offset + x_pixels
-        # Invert y since positive y should go up (canvas y increases downwards)
-        y_adjusted = y_center_offset - y_pixels  # Subtract to invert y-axis
-        return x_adjusted, y_adjusted
+        # (0,0) meters is the center of the canvas at the default zoom, positive y goes up
+        return self.viewport.to_pixels(x_meters, y_meters)
+
+    def pixels_to_meters(self, x_pixels, y_pixels):
+        # Inverse of meters_to_pixels, used to store clicked positions in the path model
+        return self.viewport.to_meters(x_pixels, y_pixels)
 
     """
     Adds a command to the last plotted point. 
@@ -154,88 +283,36 @@ class FlightPlannerApp(tk.Tk):
 
     def add_command(self, command):
 
-        # Default values for the canvas coordinates
-        x_for_canvas, y_for_canvas = self.meters_to_pixels(0, 0)
+        # Default values for the plotted position
+        x_position, y_position = 0.0, 0.0
 
-        if len(self.path_points) == 0 and command not in [
-            "SCHEDULE_FLY_TO_Z",
-            "SCHEDULE_MOVE_XYZ",
-        ]:  # If there are no points on the canvas
+        if (
+            len(self.path) == 0 and not SPECS[command].starts_path
+        ):  # If there are no points on the canvas
             return
 
         # Get arguments for the specific command
         arguments = self.get_command_arguments(command)
-        if not arguments:  # User closed the dialog or pressed cancel
+        if arguments is None:  # User closed the dialog or pressed cancel
             return
 
-        if command in [
-            "SCHEDULE_MOVE_XYZ",
-            "SCHEDULE_FLY_TO_XY",
-            "SCHEDULE_RETURN_TO_TAKEOFF_POSITION",
-        ]:
-            x_from_user = arguments.get("x", 0)
-            y_from_user = arguments.get("y", 0)
-            x_for_canvas, y_for_canvas = self.meters_to_pixels(
-                x_from_user, y_from_user
-            )  # Convert meters to pixels
-
-            if command == "SCHEDULE_MOVE_XYZ":
-                z_value = arguments.get("z", 0)
-
-        elif command in [
-            "SCHEDULE_FLY_TO_Z",
-            "SCHEDULE_FLY_TO_YAW",
-            "SCHEDULE_WAIT_FOR_PERIOD",
-            "SCHEDULE_SET_XY_SPEED",
-        ]:
-            # Use the last known XY if available
-            if len(self.path_points) > 0:
-                last_point = self.path_points[-1]
-                x_for_canvas, y_for_canvas = last_point["canvas_coordinates"]
-
-        if command in ["SCHEDULE_FLY_TO_Z", "SCHEDULE_MOVE_XYZ", "SCHEDULE_MOVE_XYZ"]:
-            z_value = arguments.get("z", 0)
-
-            # Convert and plot Z value on Z canvas, even if it's the first command
-            x_scaled_for_z_canvas, y_scaled_for_z_canvas = (
-                self.plot_z_value_on_canvas_z(z_value)
-            )
-            print("plot z)", z_value)
-            self.last_z_value = z_value  # Update the last z value
-
+        if SPECS[command].moves_xy:
+            x_position = arguments.get("x") or 0
+            y_position = arguments.get("y") or 0
         else:
-            z_value = self.get_last_known_z()  # Use the last known z value
-            x_scaled_for_z_canvas, y_scaled_for_z_canvas = (
-                self.plot_z_value_on_canvas_z(z_value)
-            )
-
-        # If there's at least one point, and both current and last point have 'x' and 'y' arguments,
-        # then draw a line from the last point to the current one using canvas coordinates
-        if len(self.path_points) > 0:
-            last_canvas_x, last_canvas_y = self.path_points[-1]["canvas_coordinates"]
-            self.canvas.create_line(
-                last_canvas_x,
-                last_canvas_y,
-                x_for_canvas,
-                y_for_canvas,
-                fill="black",
-                tags=f"line{len(self.path_points)}",
-            )
+            # Use the last known XY if available
+            x_position, y_position = self.path.last_position()
 
-        self.point_counter += 1
+        self.history.append(command, arguments, (x_position, y_position))
 
-        # Draw shape for command on XY canvas
-        # Based on command type, create a different shape
-        self.create_shape_on_canvas(command, x_for_canvas, y_for_canvas)
+        # Extend the route to the new point and draw the shape of its command
+        self.route_layer.append(command, x_position, y_position)
 
-        self.path_points.append(
-            {
-                "type": command,
-                "arguments": arguments,
-                "canvas_coordinates": (x_for_canvas, y_for_canvas),
-                "canvas_z_coordinates": (x_scaled_for_z_canvas, y_scaled_for_z_canvas),
-            }
-        )
+        # Plot the altitude after this command on the Z canvas, even if it's the first command.
+        # Commands without a Z value keep the last known z value
+        self.last_z_value = self.get_last_known_z()
+        self.plot_z_value_on_canvas_z(self.last_z_value)
+        self.update_path_info()
         return 0
 
     """This event handler is triggered when the user clicks on the XY plane canvas.
@@ -252,56 +329,22 @@ class FlightPlannerApp(tk.Tk):
             if not command:  # User closed the dialog or pressed cancel
                 return
 
-            # Get arguments for the specific command
-            arguments = self.get_command_arguments(command)
-            if not arguments:  # User closed the dialog or pressed cancel
+            # Get arguments for the specific command, offering the clicked position
+            x_position, y_position = self.pixels_to_meters(canvas_x, canvas_y)
+            arguments = self.get_command_arguments(
+                command, {"x": f"{x_position:.2f}", "y": f"{y_position:.2f}"}
+            )
+            if arguments is None:  # User closed the dialog or pressed cancel
                 return
 
-            if command in ["SCHEDULE_FLY_TO_Z", "SCHEDULE_MOVE_XYZ"]:
-                z_value = arguments.get("z", 0)
-                x_scaled, y_scaled = self.plot_z_value_on_canvas_z(z_value)
-                print("plot z)", z_value)
-                self.last_z_value = z_value  # Update the last z value
-
-            else:
-                z_value = self.get_last_known_z()  # Use the last known z value
-                x_scaled, y_scaled = self.plot_z_value_on_canvas_z(z_value)
-
-            # If there's at least one point, and both current and last point have 'x' and 'y' arguments,
-            # then draw a line from the last point to the current one using canvas coordinates
-            if len(self.path_points) > 0:
-                last_canvas_x, last_canvas_y = self.path_points[-1][
-                    "canvas_coordinates"
-                ]
-                self.canvas.create_line(
-                    last_canvas_x,
-                    last_canvas_y,
-                    canvas_x,
-                    canvas_y,
-                    fill="black",
-                    tags=f"line{len(self.path_points)}",
-                )
-
-            # Based on command type, create a different shape
-            self.create_shape_on_canvas(
-                command, canvas_x, canvas_y
-            )  # used to draw shapes on canvas
+            self.history.append(command, arguments, (x_position, y_position))
 
-            self.canvas.create_text(
-                canvas_x,
-                canvas_y - 10,
-                text=str(len(self.path_points) + 1),
-                tags=f"text{len(self.path_points)}",
-            )
+            # Extend the route to the clicked point, draw the shape of the command and its number
+            self.route_layer.append(command, x_position, y_position)
 
-            self.path_points.append(
-                {
-                    "type": command,
-                    "arguments": arguments,
-                    "canvas_coordinates": (canvas_x, canvas_y),
-                    "canvas_z_coordinates": (x_scaled, y_scaled),
-                }
-            )
+            self.last_z_value = self.get_last_known_z()
+            self.plot_z_value_on_canvas_z(self.last_z_value)
+            self.update_path_info()
 
         except Exception as e:
             print("Error:", e)
@@ -313,79 +356,27 @@ class FlightPlannerApp(tk.Tk):
         allowing the application to maintain continuity in the flight path's altitude by defaulting
         to the last known altitude.
         """
-        for point in reversed(self.path_points):
-            z_value = point["arguments"].get("z")
-            if z_value is not None:
-                return z_value
-        return 0  # default if no Z-value was ever
+        return self.path.last_known_z()  # 0 if no Z-value was ever set
 
     def redraw_canvas_z(self):
         """
-        Clears and redraws all points on the Z axis canvas based on the current list of path points.
-        This method is called after significant changes to the path (e.g., adding many points, deleting points)
-        to ensure the Z axis canvas accurately reflects the current flight path, adjusting the scaling
-        of the canvas if necessary to accommodate the number of points.
+        Redraws all points on the Z axis canvas based on the current path.
+        This method is called after significant changes to the path (e.g. deleting points)
+        to ensure the Z axis canvas accurately reflects the current flight path. The grid
+        and axis names are left untouched, only the profile items are rebuilt.
         """
-
-        for idx, point in enumerate(self.path_points, start=1):
-            x_scaled = (400 / self.expected_total_points) * idx
-            z = point["arguments"].get("z", 0)
-            max_z_value = 20
-            y_scaled = 200 - (z / max_z_value) * 200
-
-            self.canvas_z.create_oval(
-                x_scaled - 2, y_scaled - 2, x_scaled + 2, y_scaled + 2, fill="red"
-            )
-            self.canvas_z.create_text(x_scaled, y_scaled - 10, text=str(idx))
-
-            if idx > 1:  # If there's a previous point, draw a line to it
-                last_x_scaled, last_y_scaled = (400 / self.expected_total_points) * (
-                    idx - 1
-                ), 200 - (
-                    self.path_points[idx - 2]["arguments"].get("z", 0) / max_z_value
-                ) * 200
-                self.canvas_z.create_line(
-                    last_x_scaled, last_y_scaled, x_scaled, y_scaled
-                )
+        self.altitude_profile.redraw(self.path.altitudes.altitudes())
 
     """Plots the Z value (altitude) on the Z axis canvas, 
-    adjusting the scale if the number of points exceeds the initial expected total.
+    adjusting the scale if the number of points exceeds the current X axis.
     Returns the scaled X and Y coordinates of the point on the Z axis canvas."""
 
     def plot_z_value_on_canvas_z(self, z=None):
-        if z is None and self.path_points:
-            z = self.path_points[-1]["arguments"].get("z", 0)
-        #    # Handle points without explicit Z value
-        #     if z is None and hasattr(self, "prev_z"):
-        #         z = self.prev_z
-        #     elif z is not None:
-        #         self.prev_z = z
-        #     else:  # This handles the case where it's the first point and doesn't have a Z value
-        #         return
-
-        # I'm assuming the same scaling from the previous code example, adjust if necessary
-        # Adjusting X scaling
-        # Check if we've exceeded the current expected total points
-        if self.point_counter > self.expected_total_points:
-            self.expected_total_points *= 2
-            self.canvas_z.delete("all")  # Clear canvas
-            self.redraw_canvas_z()  # Redraw all points based on new scale
-
-        x_scaled = (400 / self.expected_total_points) * self.point_counter
-
-        max_z_value = 20  # Adjust this according to your data's range
-        y_scaled = 200 - (z / max_z_value) * 200
-
-        self.canvas_z.create_oval(
-            x_scaled - 2, y_scaled - 2, x_scaled + 2, y_scaled + 2, fill="red"
-        )
-        self.canvas_z.create_text(x_scaled, y_scaled - 10, text=str(self.point_counter))
-
-        if self.path_points:  # If there's a previous point, draw a line to it
-            last_x_scaled, last_y_scaled = self.path_points[-1]["canvas_z_coordinates"]
-            self.canvas_z.create_line(last_x_scaled, last_y_scaled, x_scaled, y_scaled)
-
-        return x_scaled, y_scaled  # Ensure you return these values
+        if z is None:
+            z = self.get_last_known_z()
+        # Appending only moves the items of the newest point, growing the X axis
+        # rescales the existing profile in a single canvas call
+        return self.altitude_profile.append(z)
 
     def draw_axis_names(self):
         """
@@ -396,86 +387,10 @@ class FlightPlannerApp(tk.Tk):
         self.canvas_z.create_text(200, 190, text="Point Number", anchor="s")
         self.canvas_z.create_text(5, 100, text="Height", anchor="w", angle=90)
 
-    """
-    These methods are used for visual feedback in the UI, such as 
-    drawing shapes that represent commands on the canvas, 
-    labeling axes, and updating labels after deleting points.
-    """
-
-    def create_shape_on_canvas(self, command, x, y):
-        size = 5  # General size
-        if command == "SCHEDULE_MOVE_XYZ":
-            self.canvas.create_oval(
-                x - size,
-                y - size,
-                x + size,
-                y + size,
-                fill="black",
-                tags=f"point{len(self.path_points)}",
-            )
-        elif command == "SCHEDULE_FLY_TO_Z":
-            self.canvas.create_line(
-                x,
-                y - size,
-                x,
-                y + size,
-                fill="black",
-                tags=f"point{len(self.path_points)}",
-            )  # Arrow pointing up
-        elif command == "SCHEDULE_FLY_TO_YAW":
-            self.canvas.create_oval(
-                x - size,
-                y - size,
-                x + size,
-                y + size,
-                fill="white",
-                outline="black",
-                tags=f"point{len(self.path_points)}",
-            )  # Ring
-        elif command == "SCHEDULE_WAIT_FOR_PERIOD":
-            offset = 3
-            self.canvas.create_line(
-                x - offset,
-                y - offset,
-                x + offset,
-                y + offset,
-                fill="black",
-                tags=f"point{len(self.path_points)}",
-            )  # Small X
-            self.canvas.create_line(
-                x + offset,
-                y - offset,
-                x - offset,
-                y + offset,
-                fill="black",
-                tags=f"point{len(self.path_points)}",
-            )  # Small X
-        elif command == "SCHEDULE_SET_XY_SPEED":
-            # Triangle pointing to side
-            self.canvas.create_polygon(
-                x + size,
-                y,
-                x - size,
-                y + size,
-                x - size,
-                y - size,
-                fill="black",
-                tags=f"point{len(self.path_points)}",
-            )
-        else:
-            self.canvas.create_oval(
-                x - 5,
-                y - 5,
-                x + 5,
-                y + 5,
-                fill="black",
-                tags=f"point{len(self.path_points)}",
-            )
-
     """
     get_command_type and get_command_arguments: 
     These methods display dialogs to the user for selecting a command type and 
-    entering the necessary arguments for the selected command.
+    entering the necessary arguments for the selected command, all of them in one form.
     """
 
     def get_command_type(self):
@@ -483,87 +398,221 @@ class FlightPlannerApp(tk.Tk):
         self.wait_window(dialog.top)
         return dialog.result
 
-    def get_action_type(self):
-        action = ActionDialog(self)
-        self.wait_window(action.top)
-        return action.result
-
-    def get_command_arguments(self, command):
-        if command == "SCHEDULE_MOVE_XYZ":
-            action = self.get_action_type()
-            delay = simpledialog.askfloat("Arguments", "Enter delay:")
-            velocity = simpledialog.askfloat("Arguments", "Enter velocity:")
-            x = simpledialog.askfloat("Arguments", "Enter x coordinate:")
-            y = simpledialog.askfloat("Arguments", "Enter y coordinate:")
-            yaw = simpledialog.askfloat("Arguments", "Enter yaw:")
-            z = simpledialog.askfloat("Arguments", "Enter z:")
-            return {
-                "x": x,
-                "y": y,
-                "action": action,  # Added this line
-                "velocity": velocity,
-                "yaw": yaw,
-                "z": z,
-                "delay": delay,
-            }
-        # Add other command types and their specific argument prompts here
-        # For the sake of space, I will just add one more. Add others similarly.
-        elif command == "SCHEDULE_FLY_TO_XY":
-            x = simpledialog.askfloat("Arguments", "Enter x:")
-            y = simpledialog.askfloat("Arguments", "Enter y:")
-            return {"x": x, "y": y}
-
-        elif command == "SCHEDULE_FLY_TO_Z":
-            z = simpledialog.askfloat("Arguments", "Enter z:")
-            return {"z": z}
-        elif command == "SCHEDULE_FLY_TO_YAW":
-            yaw = simpledialog.askfloat("Arguments", "Enter yaw:")
-            return {"yaw": yaw}
-        elif command == "SCHEDULE_SET_XY_SPEED":
-            speed = simpledialog.askfloat("Arguments", "Enter speed:")
-            return {"speed": speed}
-        elif command == "SCHEDULE_SET_PAYLOAD_RECORDING":
-            return {}
-        elif command == "SCHEDULE_WAIT_FOR_PERIOD":
-            period = simpledialog.askfloat("Arguments", "Enter period :")
-            return {"period": period}
-        elif command == "SCHEDULE_TAKE_PICTURE":
-            return {}
-        elif command == "SCHEDULE_RETURN_TO_TAKEOFF_POSITION":
-            x = 0.0
-            y = 0.0
-            return {"x": x, "y": y}
-        else:
+    def get_command_arguments(self, command, initial=None):
+        # The arguments each command needs are described in mission_core.commands,
+        # commands without any to enter are added straight away
+        codec = CODECS.get(command)
+        if codec is None:
             return None
-
-        # Parsing function to get all the FLY_TO commands
+        if codec.spec.fixed is not None or not codec.fields:
+            return codec.ask(None)
+        values = dict(self.form_values.get(command, {}), **(initial or {}))
+        form = CommandForm(self, command, values)
+        self.wait_window(form.top)
+        if form.result is not None:
+            self.form_values[command] = form.values
+        return form.result
 
     def delete_point(self, event):
         """
-        Deletes a point from the XY plane canvas when a user clicks close to it. This method identifies
-        the clicked point, removes it from the list of path points, and then updates the canvas by
-        removing the point's graphical representation and adjusting the labels of remaining points to
-        reflect the new order.
-        """
-        x, y = event.x, event.y
-        items = self.canvas.find_overlapping(x - 5, y - 5, x + 5, y + 5)
-        for item in items:
-            tags = self.canvas.gettags(item)
-            for tag in tags:
-                if "point" in tag:
-                    idx = int(tag[5:])
-                    self.path_points.pop(idx)
-                    self.canvas.delete(f"point{idx}", f"text{idx}")
-                    self.refresh_numbers()
-
-    def refresh_numbers(self):
-        """
-        Updates the labels for each point on the XY plane canvas after a point has been deleted.
-        This ensures that the sequence numbers displayed next to each point are always correct,
-        reflecting their current order in the path following any modifications.
+        Deletes a point from the XY plane canvas when a user shift-clicks close to it. This method
+        finds the closest point through the spatial index of the path, removes it from the path,
+        and then updates the canvas by hiding the point's graphical representation and renumbering
+        only the labels drawn after it to reflect the new order.
         """
-        for i, point in enumerate(self.path_points):
-            self.canvas.itemconfig(f"text{i}", text=str(i + 1))
+        x, y = self.pixels_to_meters(event.x, event.y)
+        # Closest point within 5 pixels of the click
+        idx = self.path.find_point(x, y, 5 / self.viewport.scale)
+        if idx is None:
+            return
+        self.history.delete(idx)
+        self.route_layer.remove_point(idx, self.path)
+        self.redraw_canvas_z()
+        self.update_path_info()
+
+    def update_path_info(self):
+        self.update_diagnostics()
+        self.update_estimate()
+
+    """
+    update_diagnostics: Runs the checks of mission_core.validation over the whole path
+    (a few array operations, so it is done after every edit) and shows the first problem.
+    """
+
+    def update_diagnostics(self):
+        diagnostics = check_path(self.path) if len(self.path) else []
+        if not diagnostics:
+            self.diagnostics_label.config(text="")
+            return
+        text = diagnostics[0].message
+        if len(diagnostics) > 1:
+            text += f"\n({len(diagnostics) - 1} more problems)"
+        self.diagnostics_label.config(text=text)
+
+    """
+    update_estimate: Shows how long the path takes to fly, return to the take off
+    position included, and how much of the battery that uses.
+    """
+
+    def update_estimate(self):
+        if not len(self.path):
+            self.estimate_label.config(text="")
+            return
+        minutes, seconds = divmod(round(self.estimator.total_time()), 60)
+        battery = self.estimator.battery_used()
+        self.estimate_label.config(
+            text=f"Flight: {minutes} min {seconds} s, battery {battery:.0%}",
+            foreground="red" if battery > 1 else "",
+        )
+
+    """
+    optimize_order: Reorders the waypoints clicked in any order so the path is flown
+    in less time, keeping every action with its waypoint. It is one undo step.
+    """
+
+    def optimize_order(self):
+        if not len(self.path):
+            return
+        saved = optimize_path(self.path, self.history, self.estimator.profile)
+        self.redraw_canvas()
+        self.redraw_canvas_z()
+        self.update_path_info()
+        if saved > 0:
+            messagebox.showinfo("Optimize Order", f"The path now flies {saved:.0f} s faster.")
+        else:
+            messagebox.showinfo("Optimize Order", "No faster order was found.")
+
+    """
+    add_survey: Asks for the corners of an area and appends a lawnmower pattern
+    covering it (altitude, lines and pictures) in one batch, as one undo step.
+    """
+
+    def add_survey(self):
+        corners = simpledialog.askstring(
+            "Survey Area", "Corners as x,y separated by spaces (e.g. 0,0 40,0 40,30 0,30):"
+        )
+        if not corners:
+            return
+        altitude = simpledialog.askfloat("Survey Area", "Altitude:")
+        spacing = simpledialog.askfloat("Survey Area", "Line spacing:")
+        heading = simpledialog.askfloat("Survey Area", "Line heading (degrees):", initialvalue=0.0)
+        if altitude is None or spacing is None or heading is None:
+            return
+        picture_spacing = simpledialog.askfloat(
+            "Survey Area", "Distance between pictures along a line (cancel for line ends only):"
+        )
+        try:
+            polygon = [tuple(float(v) for v in corner.split(",")) for corner in corners.split()]
+            added = add_survey(
+                self.path, polygon, altitude, spacing, heading, picture_spacing, history=self.history
+            )
+        except ValueError as e:
+            messagebox.showerror("Survey Area", str(e))
+            return
+        if not added:
+            messagebox.showinfo("Survey Area", "No survey line fits in the area.")
+            return
+        self.fit_to_path()  # redraws the XY canvas
+        self.redraw_canvas_z()
+        self.update_path_info()
+
+    """
+    paste_rows: Opens the grid editor, where rows copied from a spreadsheet or typed
+    one per line are checked all together and added to the path as one undo step.
+    """
+
+    def paste_rows(self):
+        dialog = GridDialog(self, starts_path=not len(self.path))
+        self.wait_window(dialog.top)
+        if not dialog.result:
+            return
+        self.history.extend(dialog.result)
+        self.fit_to_path()  # redraws the XY canvas
+        self.redraw_canvas_z()
+        self.update_path_info()
+
+    """
+    undo and redo: step through the edit history. Small steps update the canvases
+    point by point, big ones (e.g. a whole imported path) redraw them once at the end.
+    """
+
+    def undo(self, event=None):
+        self.replay_history(self.history.undo, self.history.undo_size())
+
+    def redo(self, event=None):
+        self.replay_history(self.history.redo, self.history.redo_size())
+
+    def replay_history(self, step, size):
+        if size == 0:
+            return
+        if size > 100:
+            step()
+            self.redraw_canvas()
+        else:
+            step(self.show_edit)
+        self.redraw_canvas_z()
+        self.update_path_info()
+
+    def show_edit(self, kind, index, point):
+        if kind == "insert":
+            self.route_layer.insert_point(index, point["type"], self.path)
+        else:
+            self.route_layer.remove_point(index, self.path)
+
+    """
+    open_json: Loads a mission exported earlier. The file is read as a stream and
+    added to the path in batches, then both canvases are drawn once. A CSV or Parquet
+    table of commands (e.g. a survey spreadsheet) is loaded in one batch.
+    """
+
+    def open_json(self):
+        file = filedialog.askopenfilename(
+            filetypes=[
+                ("JSON files", "*.json"),
+                ("Command tables", "*.csv *.parquet"),
+                ("All files", "*"),
+            ]
+        )
+        if not file:
+            return
+
+        path = PathModel()
+        try:
+            if file.lower().endswith(".json"):
+                load_mission(file, path)
+            else:
+                read_table(file, path)
+        except (OSError, ValueError, ImportError) as e:
+            messagebox.showerror("Error", f"Could not open {file}: {e}")
+            return
+
+        # Swap the model in only once the whole file loaded
+        self.path = path
+        self.history = EditHistory(self.path)
+        self.estimator = FlightEstimator(self.path)
+        if len(self.path):
+            self.fit_to_path()  # redraws the XY canvas
+        else:
+            self.redraw_canvas()
+        self.redraw_canvas_z()
+        self.update_path_info()
+
+    """
+    export_table: Writes the path as a table of commands, one row per command, to a
+    CSV file or, when pyarrow is installed, a Parquet file for analysis.
+    """
+
+    def export_table(self):
+        file = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("Parquet files", "*.parquet")],
+        )
+        if not file:
+            return
+        try:
+            write_table(self.path, file)
+        except (OSError, ImportError) as e:
+            messagebox.showerror("Error", f"Could not write {file}: {e}")
 
     """    
     export_to_json: Converts the plotted points and commands into a structured JSON
@@ -577,64 +626,30 @@ class FlightPlannerApp(tk.Tk):
             defaultextension=".json", filetypes=[("JSON files", "*.json")]
         )
 
-        # Check for at least one SCHEDULE_MOVE_XYZ or SCHEDULE_FLY_TO_XY command
-        if not any(
-            point["type"] in ["SCHEDULE_MOVE_XYZ", "SCHEDULE_FLY_TO_XY"]
-            for point in self.path_points
-        ):
-            messagebox.showerror(
-                "Error",
-                "At least one SCHEDULE_MOVE_XYZ or SCHEDULE_FLY_TO_XY command is required before exporting.",
-            )
+        if not file:  # User cancelled the save dialog
             return
-        if file:  # If user didn't cancel the save dialog
-            initial_block = [
-                {"arguments": {"version": "2.0.0"}, "type": "SCHEDULE_PLANNER_VERSION"},
-                {"arguments": {"speed": 1.5}, "type": "SCHEDULE_SET_XY_SPEED"},
-                {"arguments": {"yaw": 90}, "type": "SCHEDULE_FLY_TO_YAW"},
-            ]
 
-            final_block = [
-                {"type": "SCHEDULE_RETURN_TO_TAKEOFF_POSITION"},
-                {
-                    "type": "START_TASK",
-                    "arguments": {
-                        "task": {
-                            "description": "",
-                            "id": "JsNis48JmatqrH8id68b",
-                            "name": "42L C-G",
-                        }
-                    },
-                },
-            ]
+        # Check the path is valid, e.g. at least one SCHEDULE_MOVE_XYZ or SCHEDULE_FLY_TO_XY command
+        errors = [d.message for d in check_path(self.path) if d.severity == "error"]
+        if errors:
+            shown = errors[:MAX_SHOWN_ERRORS]
+            if len(errors) > len(shown):
+                shown.append(f"... and {len(errors) - len(shown)} more.")
+            messagebox.showerror("Error", "\n".join(shown))
+            return
 
-        # Define a custom order for the arguments
-        arguments_order = [
-            "action",
-            "delay",
-            "velocity",
-            "x",
-            "y",
-            "yaw",
-            "z",
-            "speed",
-            "period",
-        ]
-
-        # Create a copy of path_points excluding the canvas_coordinates and with ordered arguments
-        export_points = []
-        for point in self.path_points:
-            ordered_arguments = {
-                k: point["arguments"][k]
-                for k in arguments_order
-                if k in point["arguments"]
-            }
-            export_point = {"arguments": ordered_arguments, "type": point["type"]}
-            export_points.append(export_point)
-
-        with open(file, "w") as f:
-            json.dump(initial_block + export_points + final_block, f)
-        messagebox.showinfo("Success", "Commands exported successfully!")
+        # The initial/final blocks and argument ordering are handled by mission_core.export
+        if self.optimize_export.get():
+            path, initial, savings = optimize_mission(self.path, self.estimator.profile)
+            export_mission(path, file, initial)
+            messagebox.showinfo(
+                "Success",
+                f"Commands exported successfully! {savings.commands} commands and"
+                f" {savings.seconds:.0f} s of flight were optimized away.",
+            )
+        else:
+            export_mission(self.path, file)
+            messagebox.showinfo("Success", "Commands exported successfully!")
 
         # After saving the JSON file
         self.send_via_ssh(file)
@@ -647,47 +662,62 @@ class FlightPlannerApp(tk.Tk):
     def send_via_ssh(self, filepath):
         ssh_dialog = SSHDialog(self)
         self.wait_window(ssh_dialog.top)
-        username, ip_address = (
-            ssh_dialog.result.split("@") if ssh_dialog.result else (None, None)
-        )
-
-        if not username or not ip_address:
+        if not ssh_dialog.result:
             return
-
-        password = simpledialog.askstring(
-            "SSH Authentication", "Enter password for SSH:", show="*"
-        )
-
         try:
-            transport = paramiko.Transport((ip_address, 22))
-            transport.connect(username=username, password=password)
+            targets = parse_targets(ssh_dialog.result)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        if not targets:
+            return
 
-            sftp = paramiko.SFTPClient.from_transport(transport)
-            # Extract the filename without extension for the directory name
-            filename = filepath.split("/")[-1]
-            base_filename = filename.rsplit(".", 1)[0]
+        # A drone we already sent to keeps its session open, no new login needed
+        password = None
+        if not all(self.ssh_pool.has_session(*parse_target(target)) for target in targets):
+            password = simpledialog.askstring(
+                "SSH Authentication", "Enter password for SSH:", show="*"
+            )
+            if password is None:
+                return
 
-            # Create directory under /home/root/paths
-            remote_dir_path = f"/home/root/paths/{base_filename}"
-            try:
-                sftp.mkdir(remote_dir_path)
-            except IOError:
-                # Directory probably already exists; you can either pass or handle this differently
-                pass
+        # The upload runs in the background, editing can go on meanwhile
+        job = self.upload_queue.submit(targets, [filepath], password)
+        self.show_uploads().add_job(job, os.path.basename(filepath))
 
-            # Upload the file to the newly created directory
-            remote_file_path = f"{remote_dir_path}/{filename}"
-            sftp.put(filepath, remote_file_path)
+    """
+    poll_uploads: Picks up the progress reported by the upload thread and shows it
+    in the uploads window. Failures are also reported in a message box.
+    """
 
-            sftp.close()
-            transport.close()
+    def poll_uploads(self):
+        for event in self.upload_queue.poll():
+            kind, job = event[:2]
+            window = self.show_uploads(focus=False)
+            if kind == "progress":
+                window.show(job, *event[2:])
+            else:
+                window.finish(job)
+                failed = not all(result.ok for result in job.results)
+                if failed and not job.cancelled.is_set():
+                    messagebox.showerror("Error", summarize(job.results))
+        self.after(UPLOAD_POLL_MS, self.poll_uploads)
 
-            messagebox.showinfo(
-                "Success", f"File successfully sent to {username}@{ip_address}!"
-            )
+    def show_uploads(self, focus=True):
+        if self.uploads_window is None:
+            self.uploads_window = UploadsWindow(self)
+        elif focus:
+            self.uploads_window.top.deiconify()
+        return self.uploads_window
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to send file due to: {str(e)}")
+    def evict_idle_sessions(self):
+        self.ssh_pool.evict_idle()
+        self.after(SESSION_CHECK_MS, self.evict_idle_sessions)
+
+    def on_close(self):
+        self.upload_queue.shutdown()
+        self.ssh_pool.close_all()
+        self.destroy()
 
 
 """custom dialog windows for entering SSH connection details
@@ -699,23 +729,109 @@ class SSHDialog:
         self.top = tk.Toplevel(parent)
         self.top.title("SSH Destination")
 
-        tk.Label(self.top, text="Enter destination (username@IP_ADDRESS)").pack(pady=10)
+        tk.Label(
+            self.top,
+            text="Enter destination (username@IP_ADDRESS)\nor several, separated by commas",
+        ).pack(pady=10)
 
-        self.entry = tk.Entry(self.top)
+        self.entry = tk.Entry(self.top, width=40)
         self.entry.pack(pady=10)
         # Set the default value for the entry widget
         self.entry.insert(0, "root@192.168.0.227")
 
+        self.btn_inventory = tk.Button(
+            self.top, text="Load Fleet Inventory...", command=self.load_inventory
+        )
+        self.btn_inventory.pack()
+
         self.btn_ok = tk.Button(self.top, text="OK", command=self.on_ok)
         self.btn_ok.pack(pady=10)
 
         self.result = None
 
+    def load_inventory(self):
+        # An inventory file lists one username@IP_ADDRESS per line
+        file = filedialog.askopenfilename(parent=self.top)
+        if not file:
+            return
+        try:
+            targets = read_inventory(file)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", str(e), parent=self.top)
+            return
+        self.entry.delete(0, tk.END)
+        self.entry.insert(0, ", ".join(targets))
+
     def on_ok(self):
         self.result = self.entry.get()
         self.top.destroy()
 
 
+class UploadsWindow:
+    """
+    Non-modal list of the uploads: one row per export, with a row per drone
+    under it. Closing the window only hides it.
+    """
+
+    def __init__(self, parent):
+        self.top = tk.Toplevel(parent)
+        self.top.title("Uploads")
+        self.top.protocol("WM_DELETE_WINDOW", self.top.withdraw)
+        self.jobs = {}
+
+        self.table = ttk.Treeview(self.top, columns=("status", "progress"), height=12)
+        self.table.heading("#0", text="Upload")
+        self.table.heading("status", text="Status")
+        self.table.heading("progress", text="Sent")
+        self.table.pack(padx=10, pady=(10, 0), fill=tk.BOTH, expand=True)
+
+        self.btn_cancel = ttk.Button(self.top, text="Cancel Upload", command=self.cancel_selected)
+        self.btn_cancel.pack(pady=10)
+
+    def add_job(self, job, name):
+        self.jobs[f"job{job.id}"] = job
+        node = self.table.insert(
+            "", tk.END, iid=f"job{job.id}", text=name, values=("queued", ""), open=True
+        )
+        if len(job.targets) > 1:
+            for target in job.targets:
+                self.table.insert(
+                    node, tk.END, iid=f"job{job.id}:{target}", text=target, values=("queued", "")
+                )
+        else:
+            self.table.item(node, text=f"{name} -> {job.targets[0]}")
+        self.table.see(node)
+
+    def _row(self, job, target):
+        return f"job{job.id}" if len(job.targets) == 1 else f"job{job.id}:{target}"
+
+    def show(self, job, target, status, sent, total):
+        progress = f"{100 * sent // total}%" if total else ""
+        if status == "done":
+            progress = "100%"
+        self.table.item(self._row(job, target), values=(status, progress))
+        if len(job.targets) > 1:
+            self.table.item(f"job{job.id}", values=("sending", ""))
+
+    def finish(self, job):
+        for result in job.results:
+            if result.ok:
+                status = "sent" if result.sent else "up to date"
+            else:
+                status = "cancelled" if job.cancelled.is_set() else f"failed: {result.error}"
+            self.table.item(self._row(job, result.target), values=(status, ""))
+        if len(job.targets) > 1:
+            done = sum(1 for result in job.results if result.ok)
+            self.table.item(f"job{job.id}", values=(f"{done} of {len(job.targets)} done", ""))
+
+    def cancel_selected(self):
+        for row in self.table.selection():
+            job = self.jobs.get(row.split(":", 1)[0])
+            if job is not None and job.results is None:
+                job.cancel()
+                self.table.item(f"job{job.id}", values=("cancelling", ""))
+
+
 class CommandDialog:
     def __init__(self, parent):
         self.top = tk.Toplevel(parent)
@@ -723,17 +839,7 @@ class CommandDialog:
 
         tk.Label(self.top, text="Select Command Type").pack(pady=10)
 
-        self.command_types = [
-            "SCHEDULE_MOVE_XYZ",
-            "SCHEDULE_FLY_TO_XY",
-            "SCHEDULE_FLY_TO_Z",
-            "SCHEDULE_FLY_TO_YAW",
-            "SCHEDULE_SET_XY_SPEED",
-            "SCHEDULE_SET_PAYLOAD_RECORDING",
-            "SCHEDULE_WAIT_FOR_PERIOD",
-            "SCHEDULE_TAKE_PICTURE",
-            "SCHEDULE_RETURN_TO_TAKEOFF_POSITION",
-        ]
+        self.command_types = COMMAND_TYPES
 
         self.combobox = ttk.Combobox(self.top, values=self.command_types)
         self.combobox.current(0)
@@ -749,32 +855,132 @@ class CommandDialog:
         self.top.destroy()
 
 
-class ActionDialog:
-    def __init__(self, parent):
+class CommandForm:
+    """
+    All the arguments of a command in one form: Tab moves between the fields,
+    Enter checks them and closes the form, Escape cancels. The values stay in
+    the form until they are all valid.
+    """
+
+    def __init__(self, parent, command, values):
         self.top = tk.Toplevel(parent)
-        self.top.title("Action Type Selection")
+        self.top.title(command)
+        self.top.transient(parent)
+        self.command = command
+        self.entries = {}
+
+        for row, field in enumerate(CODECS[command].fields):
+            label = tk.Label(self.top, text=field.prompt)
+            label.grid(row=row, column=0, sticky="w", padx=10, pady=2)
+            if field.name == "action":
+                entry = ttk.Combobox(self.top, values=ACTION_TYPES, width=18)
+            else:
+                entry = ttk.Entry(self.top, width=20)
+            value = values.get(field.name, field.default)
+            if value is not None:
+                entry.insert(0, value if isinstance(value, str) else f"{value:g}")
+            entry.grid(row=row, column=1, padx=10, pady=2)
+            self.entries[field.name] = entry
+
+        self.error_label = tk.Label(self.top, foreground="red", wraplength=280, justify=tk.LEFT)
+        self.error_label.grid(row=len(self.entries), column=0, columnspan=2, padx=10)
+        self.btn_ok = tk.Button(self.top, text="OK", command=self.on_ok)
+        self.btn_ok.grid(row=len(self.entries) + 1, column=0, columnspan=2, pady=10)
 
-        tk.Label(self.top, text="Select Action Type").pack(pady=10)
+        self.top.bind("<Return>", self.on_ok)
+        self.top.bind("<Escape>", lambda event: self.top.destroy())
+        first = next(iter(self.entries.values()))
+        first.focus_set()
+        first.select_range(0, tk.END)
 
-        self.action_types = [
-            "NO_ACTION",
-            "STOP_BURST",
-            "START_BURST",
-        ]
+        self.values = None
+        self.result = None
 
-        self.combobox = ttk.Combobox(self.top, values=self.action_types)
-        self.combobox.current(0)
-        self.combobox.pack(pady=10)
+    def on_ok(self, event=None):
+        values = {name: entry.get() for name, entry in self.entries.items()}
+        arguments, problems = read_arguments(self.command, values)
+        if problems:
+            self.error_label.config(text="\n".join(message for _, message in problems))
+            self.entries[problems[0][0]].focus_set()
+            return
+        self.values = values
+        self.result = arguments
+        self.top.destroy()
 
-        self.btn_ok = tk.Button(self.top, text="OK", command=self.on_ok)
-        self.btn_ok.pack(pady=10)
+
+class GridDialog:
+    """
+    Rows of commands pasted or typed as a table, checked all together. Lines
+    with problems are marked and listed; the rows are only added once there
+    are none.
+    """
+
+    def __init__(self, parent, starts_path=False):
+        self.top = tk.Toplevel(parent)
+        self.top.title("Paste Rows")
+        self.top.transient(parent)
+        self.starts_path = starts_path
+
+        frame = tk.Frame(self.top)
+        frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        tk.Label(frame, text="Command of the rows").pack(side=tk.LEFT)
+        self.combobox = ttk.Combobox(frame, values=COMMAND_TYPES, state="readonly", width=36)
+        self.combobox.set("SCHEDULE_MOVE_XYZ")
+        self.combobox.pack(side=tk.LEFT, padx=5)
+        self.combobox.bind("<<ComboboxSelected>>", self.show_columns)
+
+        self.columns_label = tk.Label(self.top, justify=tk.LEFT)
+        self.columns_label.pack(anchor="w", padx=10)
+        self.show_columns()
+
+        self.text = tk.Text(self.top, width=70, height=20, undo=True)
+        self.text.pack(fill=tk.BOTH, expand=True, padx=10)
+        self.text.tag_config("problem", background="#ffd0d0")
+        self.text.focus_set()
+
+        self.problems = tk.Listbox(self.top, height=6, foreground="red")
+        self.problems.pack(fill=tk.X, padx=10, pady=(5, 0))
+
+        buttons = tk.Frame(self.top)
+        buttons.pack(pady=10)
+        tk.Button(buttons, text="Check", command=self.check).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Add Rows", command=self.on_ok).pack(side=tk.LEFT, padx=5)
+        self.top.bind("<Escape>", lambda event: self.top.destroy())
 
         self.result = None
 
+    def show_columns(self, event=None):
+        columns = " ".join(default_columns(self.combobox.get())) or "(none)"
+        self.columns_label.config(
+            text=f"Columns without a header row: {columns}\n"
+            "A first row naming the columns (x, y, z, yaw, speed, type...) overrides them."
+        )
+
+    def check(self):
+        commands, diagnostics = parse_grid(
+            self.text.get("1.0", tk.END), self.combobox.get(), self.starts_path
+        )
+        self.text.tag_remove("problem", "1.0", tk.END)
+        self.problems.delete(0, tk.END)
+        for diagnostic in diagnostics:
+            line = diagnostic.index + 1
+            self.text.tag_add("problem", f"{line}.0", f"{line}.end")
+            self.problems.insert(tk.END, diagnostic.message)
+        if diagnostics:
+            self.text.see(f"{diagnostics[0].index + 1}.0")
+        else:
+            self.problems.insert(tk.END, f"{len(commands)} commands ready to add.")
+        return commands, diagnostics
+
     def on_ok(self):
-        self.result = self.combobox.get()
+        commands, diagnostics = self.check()
+        if diagnostics or not commands:
+            return
+        self.result = commands
         self.top.destroy()
 
 
-app = FlightPlannerApp()
-app.mainloop()
+if __name__ == "__main__":
+    app = FlightPlannerApp()
+    app.mainloop()
+
@@ -0,0 +1,21 @@
+import os
+
+import pytest
+
+from mission_core import PathModel
+
+# Mission exported by the planner, kept at the root of the repository
+SAMPLE_MISSION = os.path.join(os.path.dirname(os.path.dirname(__file__)), "test_6.4_1")
+
+
+@pytest.fixture
+def sample_file():
+    return SAMPLE_MISSION
+
+
+def make_path(*commands):
+    """A PathModel from (command, arguments) pairs."""
+    path = PathModel()
+    for command, arguments in commands:
+        path.append(command, arguments)
+    return path
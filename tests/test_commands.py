@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from mission_core import CODECS, PathModel, get_command_arguments, order_arguments
+from mission_core.commands import ARGUMENT_BITS, NO_ACTION_CODE
+
+
+def test_to_json_matches_json_dumps():
+    arguments = {"z": 2.0, "yaw": 90.0, "y": 1.5, "x": -1.0, "velocity": 1.0, "delay": 0.0}
+    arguments["action"] = "NO_ACTION"
+    expected = json.dumps({"arguments": order_arguments(arguments), "type": "SCHEDULE_MOVE_XYZ"})
+    assert CODECS["SCHEDULE_MOVE_XYZ"].to_json(arguments) == expected
+
+
+def test_parse_keeps_empty_values_as_nan():
+    bitmap, action, values = CODECS["SCHEDULE_FLY_TO_XY"].parse({"x": 1.0, "y": None})
+    assert bitmap == (1 << ARGUMENT_BITS["x"]) | (1 << ARGUMENT_BITS["y"])
+    assert action == NO_ACTION_CODE
+    assert values[0] == ("x", 1.0) and values[1][1] != values[1][1]
+
+
+def test_parse_rejects_unknown_names():
+    with pytest.raises(ValueError):
+        CODECS["SCHEDULE_FLY_TO_XY"].parse({"x": 1.0, "height": 2.0})
+    # Known arguments the command does not take are rejected as well
+    with pytest.raises(ValueError, match="SCHEDULE_FLY_TO_Z: speed"):
+        CODECS["SCHEDULE_FLY_TO_Z"].parse({"z": 2.0, "speed": 1.0})
+    with pytest.raises(ValueError):
+        PathModel().append("SCHEDULE_TAKE_PICTURE", {"x": 1.0})
+    assert CODECS["SCHEDULE_RETURN_TO_TAKEOFF_POSITION"].parse({"x": 0.0, "y": 0.0})[0]
+    with pytest.raises(ValueError):
+        CODECS["SCHEDULE_MOVE_XYZ"].parse({"action": "JUMP"})
+
+
+def test_check_reports_missing_and_out_of_range_values():
+    problems = dict(CODECS["SCHEDULE_SET_XY_SPEED"].check({"speed": -1.0}))
+    assert set(problems) == {"speed"}
+    assert dict(CODECS["SCHEDULE_FLY_TO_XY"].check({"x": 1.0})) == {"y": "y is missing."}
+
+
+def test_ask_calls_back_for_every_value():
+    prompts = []
+
+    def ask_float(prompt):
+        prompts.append(prompt)
+        return 1.0
+
+    arguments = get_command_arguments("SCHEDULE_FLY_TO_XY", ask_float)
+    assert arguments == {"x": 1.0, "y": 1.0} and len(prompts) == 2
+    assert get_command_arguments("NOT_A_COMMAND", ask_float) is None
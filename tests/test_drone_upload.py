@@ -0,0 +1,399 @@
+import hashlib
+import io
+import os
+import socket
+import threading
+import time
+
+import paramiko
+import pytest
+
+import drone_upload
+from drone_upload import (
+    Session,
+    SessionPool,
+    UploadCancelled,
+    UploadQueue,
+    partial_path,
+    remote_mission_path,
+    source_path,
+    summarize,
+    upload_fleet,
+    upload_mission,
+)
+
+
+class FakeFile(io.BytesIO):
+    def __init__(self, files, name, mode):
+        super().__init__(files.get(name, b"") if "w" not in mode else b"")
+        self.files, self.name, self.mode = files, name, mode
+
+    def set_pipelined(self, pipelined):
+        pass
+
+    def prefetch(self):
+        pass
+
+    def close(self):
+        if "w" in self.mode or "+" in self.mode:
+            self.files[self.name] = self.getvalue()
+        super().close()
+
+
+class FakeStat:
+    def __init__(self, size):
+        self.st_size = size
+        self.st_mode = 0o100644
+        self.st_mtime = 0
+
+
+class FakeTransport:
+    def open_session(self, timeout=None):
+        raise paramiko.SSHException("no shell")  # a drone without sha256sum
+
+
+class FakeSFTP:
+    """SFTP client over a dict of remote files."""
+
+    def __init__(self):
+        self.files = {}
+
+    def get_channel(self):
+        return self
+
+    def get_transport(self):
+        return FakeTransport()
+
+    def stat(self, name):
+        if name not in self.files:
+            raise IOError(name)
+        return FakeStat(len(self.files[name]))
+
+    def open(self, name, mode="rb"):
+        if "r" in mode and name not in self.files:
+            raise IOError(name)
+        return FakeFile(self.files, name, mode)
+
+    def mkdir(self, name):
+        raise IOError(name)
+
+    def remove(self, name):
+        if name not in self.files:
+            raise IOError(name)
+        del self.files[name]
+
+    def posix_rename(self, old, new):
+        self.files[new] = self.files.pop(old)
+
+    def utime(self, name, times):
+        pass
+
+    def close(self):
+        pass
+
+
+class LiveTransport:
+    """Transport of a pooled session, dropped by setting active to False."""
+
+    def __init__(self):
+        self.active = True
+        self.closed = False
+
+    def is_active(self):
+        return self.active
+
+    def is_authenticated(self):
+        return True
+
+    def send_ignore(self):
+        if not self.active:
+            raise EOFError()
+
+    def close(self):
+        self.active = False
+        self.closed = True
+
+
+class Logins(list):
+    """
+    (username, host, password) of every login, hosts in refused do not
+    answer and logins wait while open is cleared.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.refused = set()
+        self.open = threading.Event()
+        self.open.set()
+        self.threads = set()
+
+
+@pytest.fixture
+def connects(monkeypatch):
+    """Logins made by SessionPool, which gets a FakeSFTP per session."""
+    made = Logins()
+    monkeypatch.setattr(drone_upload, "RETRY_DELAY", 0)
+
+    def connect(pool, username, host, password):
+        made.threads.add(threading.current_thread())
+        made.open.wait(5)
+        if host in made.refused:
+            raise ConnectionRefusedError(host)
+        made.append((username, host, password))
+        return Session(LiveTransport(), FakeSFTP())
+
+    monkeypatch.setattr(SessionPool, "_connect", connect)
+    return made
+
+
+@pytest.fixture
+def mission(tmp_path):
+    file = tmp_path / "mission.json"
+    file.write_bytes(b"new mission content " * 100)
+    return str(file)
+
+
+def remote_file(mission):
+    return remote_mission_path(mission)[1]
+
+
+def test_upload_sends_the_file(mission):
+    sftp = FakeSFTP()
+    assert upload_mission(sftp, mission)
+    with open(mission, "rb") as f:
+        assert sftp.files[remote_file(mission)] == f.read()
+    assert list(sftp.files) == [remote_file(mission)]
+
+
+def test_same_size_and_time_is_compared_by_content(mission):
+    # Exported again within the same second, with the same length
+    sftp = FakeSFTP()
+    os.utime(mission, (0, 0))
+    sftp.files[remote_file(mission)] = b"old mission content " * 100
+    assert upload_mission(sftp, mission)
+    with open(mission, "rb") as f:
+        assert sftp.files[remote_file(mission)] == f.read()
+    assert not upload_mission(sftp, mission)
+
+
+def test_resume_continues_a_partial_upload_of_the_same_file(mission):
+    sftp = FakeSFTP()
+    with open(mission, "rb") as f:
+        content = f.read()
+    temporary = partial_path(remote_file(mission))
+    sftp.files[temporary] = content[:500]
+    sftp.files[source_path(temporary)] = hashlib.sha256(content).hexdigest().encode()
+    progress = []
+    upload_mission(sftp, mission, lambda sent, total: progress.append(sent))
+    assert progress[0] == 500
+    assert sftp.files[remote_file(mission)] == content
+
+
+def test_partial_upload_of_other_content_is_started_over(mission):
+    # A cancelled upload of an older mission of the same size
+    sftp = FakeSFTP()
+    size = os.path.getsize(mission)
+    temporary = partial_path(remote_file(mission))
+    old = b"x" * size
+    sftp.files[temporary] = old[:500]
+    sftp.files[source_path(temporary)] = hashlib.sha256(old).hexdigest().encode()
+    upload_mission(sftp, mission)
+    with open(mission, "rb") as f:
+        assert sftp.files[remote_file(mission)] == f.read()
+
+
+def test_partial_upload_without_source_is_started_over(mission):
+    sftp = FakeSFTP()
+    sftp.files[partial_path(remote_file(mission))] = b"y" * 500
+    upload_mission(sftp, mission)
+    with open(mission, "rb") as f:
+        assert sftp.files[remote_file(mission)] == f.read()
+
+
+def test_corrupt_upload_is_not_renamed_into_place(mission, monkeypatch):
+    sftp = FakeSFTP()
+    write = FakeFile.write
+
+    def corrupt(self, data):
+        return write(self, data.replace(b"new", b"old"))
+
+    monkeypatch.setattr(FakeFile, "write", corrupt)
+    with pytest.raises(IOError):
+        upload_mission(sftp, mission)
+    assert remote_file(mission) not in sftp.files
+
+
+def test_pool_reuses_the_session(connects):
+    pool = SessionPool()
+    with pool.session("root", "10.0.0.1", "secret") as first:
+        pass
+    with pool.session("root", "10.0.0.1") as second:
+        pass
+    assert second is first
+    assert connects == [("root", "10.0.0.1", "secret")]
+    assert pool.has_session("root", "10.0.0.1")
+
+
+def test_pool_replaces_a_dead_transport(connects):
+    pool = SessionPool()
+    with pool.session("root", "10.0.0.1", "secret"):
+        pass
+    dead = pool.sessions["root@10.0.0.1"]
+    dead.transport.active = False
+    assert not pool.has_session("root", "10.0.0.1")
+    with pool.session("root", "10.0.0.1") as sftp:
+        assert sftp is not dead.sftp
+    assert dead.transport.closed
+    assert connects == [("root", "10.0.0.1", "secret")] * 2
+
+
+def test_pool_drops_a_session_that_failed_in_use(connects):
+    pool = SessionPool()
+    with pytest.raises(EOFError):
+        with pool.session("root", "10.0.0.1", "secret"):
+            pool.sessions["root@10.0.0.1"].transport.active = False
+            raise EOFError()
+    assert "root@10.0.0.1" not in pool.sessions
+
+
+def test_pool_evicts_idle_sessions_and_their_password(connects):
+    pool = SessionPool(idle_timeout=-1)
+    with pool.session("root", "10.0.0.1", "secret"):
+        pass
+    transport = pool.sessions["root@10.0.0.1"].transport
+    pool.evict_idle()
+    assert pool.sessions == {} and pool.passwords == {}
+    assert transport.closed
+    with pytest.raises(paramiko.AuthenticationException):
+        with pool.session("root", "10.0.0.1"):
+            pass
+
+
+def test_connect_gives_up_after_the_timeout(monkeypatch):
+    calls = []
+
+    def create_connection(address, timeout):
+        calls.append((address, timeout))
+        raise socket.timeout("timed out")
+
+    monkeypatch.setattr(drone_upload.socket, "create_connection", create_connection)
+    monkeypatch.setattr(paramiko, "Transport", lambda *args: pytest.fail("connected without timeout"))
+    pool = SessionPool(connect_timeout=3, port=2222)
+    with pytest.raises(socket.timeout):
+        pool._connect("root", "10.0.0.1", "secret")
+    assert calls == [(("10.0.0.1", 2222), 3)]
+
+
+def test_fleet_gives_a_result_per_target(connects, mission, tmp_path):
+    other = tmp_path / "other.json"
+    other.write_bytes(b"other mission")
+    connects.refused.add("10.0.0.3")
+    targets = ["root@10.0.0.1", "root@10.0.0.2", "root@10.0.0.3"]
+    statuses = {}
+
+    def on_progress(target, status, sent, total):
+        statuses.setdefault(target, []).append(status)
+
+    pool = SessionPool()
+    results = upload_fleet(pool, targets, [mission, str(other)], "secret", on_progress=on_progress)
+    assert [result.target for result in results] == targets
+    assert [result.sent for result in results] == [2, 2, 0]
+    assert isinstance(results[2].error, ConnectionRefusedError)
+    assert statuses["root@10.0.0.1"][-1] == "done"
+    assert statuses["root@10.0.0.3"].count("connecting") == drone_upload.RETRIES
+    assert statuses["root@10.0.0.3"][-1] == "failed"
+    for target in targets[:2]:
+        sftp = pool.sessions[target].sftp
+        assert sftp.files[remote_file(str(other))] == b"other mission"
+    assert summarize(results).splitlines()[0] == "2 of 3 drones received the mission."
+
+    # Sent again: both drones already hold the missions
+    results = upload_fleet(pool, targets[:2], [mission, str(other)])
+    assert [(result.ok, result.sent) for result in results] == [(True, 0), (True, 0)]
+
+
+@pytest.mark.parametrize("name", ["missing.json", "directory.json"])
+def test_fleet_does_not_retry_local_errors(connects, tmp_path, name):
+    (tmp_path / "directory.json").mkdir()
+    statuses = []
+    results = upload_fleet(
+        SessionPool(),
+        ["root@10.0.0.1"],
+        [str(tmp_path / name)],
+        "secret",
+        on_progress=lambda target, status, sent, total: statuses.append(status),
+    )
+    assert isinstance(results[0].error, OSError)
+    assert statuses == ["connecting", "checking", "failed"]
+
+
+def test_fleet_cancelled_before_start(connects, mission):
+    cancelled = threading.Event()
+    cancelled.set()
+    results = upload_fleet(SessionPool(), ["root@10.0.0.1"], [mission], "secret", cancelled=cancelled)
+    assert isinstance(results[0].error, UploadCancelled)
+    assert connects == []
+
+
+def test_fleet_cancelled_while_sending(connects, mission, monkeypatch):
+    monkeypatch.setattr(drone_upload, "TRANSFER_CHUNK", 100)
+    cancelled = threading.Event()
+    statuses = []
+
+    def on_progress(target, status, sent, total):
+        statuses.append(status)
+        if status == "sending" and sent >= 500:
+            cancelled.set()
+
+    pool = SessionPool()
+    results = upload_fleet(
+        pool, ["root@10.0.0.1"], [mission], "secret", on_progress=on_progress, cancelled=cancelled
+    )
+    assert isinstance(results[0].error, UploadCancelled)
+    assert statuses[-1] == "cancelled"
+    assert remote_file(mission) not in pool.sessions["root@10.0.0.1"].sftp.files
+
+
+def wait_for_jobs(upload_queue, count):
+    """Events polled until count jobs finished."""
+    events = []
+    deadline = time.monotonic() + 5
+    while sum(event[0] == "finished" for event in events) < count:
+        assert time.monotonic() < deadline, "upload jobs did not finish"
+        events += upload_queue.poll()
+        time.sleep(0.01)
+    return events
+
+
+def test_queue_runs_jobs_in_order_and_posts_events(connects, mission):
+    upload_queue = UploadQueue(SessionPool())
+    first = upload_queue.submit(["root@10.0.0.1"], [mission], "secret")
+    second = upload_queue.submit(["root@10.0.0.2"], [mission], "secret")
+    events = wait_for_jobs(upload_queue, 2)
+    finished = [event[1] for event in events if event[0] == "finished"]
+    assert finished == [first, second]
+    second_start = ("progress", second, "root@10.0.0.2", "connecting", 0, 0)
+    assert events.index(("finished", first)) < events.index(second_start)
+    assert ("progress", first, "root@10.0.0.1", "done", 0, 0) in events
+    assert [result.ok for result in first.results + second.results] == [True, True]
+    assert first.password is None and second.password is None
+    # The uploads ran on the worker, the events only reach this thread through poll
+    assert threading.main_thread() not in connects.threads
+    assert upload_queue.poll() == []
+    upload_queue.shutdown()
+
+
+def test_queue_shutdown_cancels_running_and_queued_jobs(connects, mission):
+    connects.open.clear()
+    upload_queue = UploadQueue(SessionPool())
+    running = upload_queue.submit(["root@10.0.0.1"], [mission], "secret")
+    queued = upload_queue.submit(["root@10.0.0.2"], [mission], "secret")
+    while upload_queue.current is not running:
+        time.sleep(0.01)
+    upload_queue.shutdown()
+    connects.open.set()
+    wait_for_jobs(upload_queue, 2)
+    for job in (running, queued):
+        assert isinstance(job.results[0].error, UploadCancelled)
+    upload_queue.thread.join(5)
+    assert not upload_queue.thread.is_alive()
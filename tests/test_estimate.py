@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from conftest import make_path
+from mission_core import FlightProfile, PathModel, estimate_path
+from mission_core.estimate import START_SPEED, FlightEstimator
+
+
+def test_straight_leg():
+    path = make_path(
+        ("SCHEDULE_SET_XY_SPEED", {"speed": 2.0}),
+        ("SCHEDULE_FLY_TO_XY", {"x": 30.0, "y": 40.0}),
+    )
+    estimator = FlightEstimator(path, FlightProfile(hover_power=360.0, battery=10.0))
+    assert estimator.total_time(include_return=False) == pytest.approx(25.0)
+    assert estimator.total_time() == pytest.approx(50.0)
+    assert estimator.total_energy() == pytest.approx(5.0)
+    assert estimator.battery_used() == pytest.approx(0.5)
+
+
+def test_start_speed_applies_before_any_speed_command():
+    path = make_path(("SCHEDULE_FLY_TO_XY", {"x": 0.0, "y": 15.0}))
+    assert estimate_path(path)[0] == pytest.approx(2 * 15.0 / START_SPEED)
+
+
+def test_incremental_update_matches_fresh_estimate():
+    random.seed(5)
+    path = PathModel()
+    estimator = FlightEstimator(path)
+    for _ in range(300):
+        if len(path) > 3 and random.random() < 0.3:
+            path.delete(random.randrange(len(path)))
+        else:
+            command, arguments = random.choice(
+                [
+                    ("SCHEDULE_FLY_TO_Z", {"z": random.uniform(1, 10)}),
+                    ("SCHEDULE_SET_XY_SPEED", {"speed": random.uniform(0.5, 3)}),
+                    ("SCHEDULE_FLY_TO_XY", {"x": random.uniform(-9, 9), "y": random.uniform(-9, 9)}),
+                    ("SCHEDULE_FLY_TO_YAW", {"yaw": random.uniform(0, 360)}),
+                    ("SCHEDULE_TAKE_PICTURE", {}),
+                ]
+            )
+            path.insert(random.randint(0, len(path)), command, arguments)
+        fresh = FlightEstimator(path)
+        assert estimator.total_time() == pytest.approx(fresh.total_time())
+        assert estimator.total_energy() == pytest.approx(fresh.total_energy())
@@ -0,0 +1,20 @@
+import json
+
+from conftest import make_path
+from mission_core import FINAL_BLOCK, INITIAL_BLOCK, build_mission, export_mission
+
+
+def test_export_writes_the_planner_file_again(sample_file, tmp_path):
+    with open(sample_file) as f:
+        data = f.read()
+    commands = json.loads(data)[len(INITIAL_BLOCK) : -len(FINAL_BLOCK)]
+    path = make_path(*((command["type"], command["arguments"]) for command in commands))
+    export_mission(path, tmp_path / "mission.json")
+    assert (tmp_path / "mission.json").read_text() == data
+
+
+def test_build_mission_orders_arguments():
+    mission = build_mission([{"type": "SCHEDULE_FLY_TO_XY", "arguments": {"y": 2.0, "x": 1.0}}])
+    assert mission[: len(INITIAL_BLOCK)] == INITIAL_BLOCK
+    assert mission[-len(FINAL_BLOCK) :] == FINAL_BLOCK
+    assert list(mission[len(INITIAL_BLOCK)]["arguments"]) == ["x", "y"]
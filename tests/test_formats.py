@@ -0,0 +1,85 @@
+import json
+
+import numpy as np
+import pytest
+
+from mission_core import INITIAL_BLOCK, export_mission, load_mission, read_table, write_table
+from mission_core.binary_format import (
+    HAS_FINAL_BLOCK,
+    HAS_INITIAL_BLOCK,
+    binary_to_json,
+    decode_path,
+    encode_path,
+    json_to_binary,
+    read_binary,
+    write_binary,
+)
+
+
+def positions(path):
+    return path.store.positions()
+
+
+def test_json_round_trip(sample_file, tmp_path):
+    path = load_mission(sample_file)
+    export_mission(path, tmp_path / "mission.json")
+    with open(sample_file, "rb") as f:
+        assert (tmp_path / "mission.json").read_bytes() == f.read()
+
+
+@pytest.mark.parametrize(
+    "entry, message",
+    [
+        ([1, 2], "Entry 5 of the mission file is not a command"),
+        ({"arguments": {"z": 2.0}}, "Entry 5 of the mission file is not a command"),
+        ({"type": "SCHEDULE_JUMP"}, "Entry 5: unknown command type"),
+        ({"type": "SCHEDULE_FLY_TO_Z", "arguments": [2.0]}, "arguments must be an object"),
+        ({"type": "SCHEDULE_FLY_TO_Z", "arguments": {"z": "high"}}, "z 'high' is not valid"),
+    ],
+)
+def test_malformed_entry_is_a_value_error(tmp_path, entry, message):
+    commands = INITIAL_BLOCK + [{"type": "SCHEDULE_FLY_TO_Z", "arguments": {"z": 1.0}}, entry]
+    file = tmp_path / "mission.json"
+    file.write_text(json.dumps(commands))
+    with pytest.raises(ValueError, match=message):
+        load_mission(file)
+
+
+def test_binary_round_trip(sample_file, tmp_path):
+    json_to_binary(sample_file, tmp_path / "mission.bin")
+    binary_to_json(tmp_path / "mission.bin", tmp_path / "mission.json")
+    with open(sample_file, "rb") as f:
+        assert (tmp_path / "mission.json").read_bytes() == f.read()
+
+
+def test_binary_file_round_trip(sample_file, tmp_path):
+    path = load_mission(sample_file)
+    write_binary(path, tmp_path / "mission.bin")
+    read = read_binary(tmp_path / "mission.bin")
+    assert list(read.commands()) == list(path.commands())
+    # Plotted positions are not stored, they are worked out as on import
+    np.testing.assert_array_equal(positions(read), positions(path))
+    _, flags = decode_path(encode_path(path))
+    assert flags == HAS_INITIAL_BLOCK | HAS_FINAL_BLOCK
+
+
+def test_csv_round_trip(sample_file, tmp_path):
+    path = load_mission(sample_file)
+    write_table(path, tmp_path / "mission.csv")
+    read = read_table(tmp_path / "mission.csv")
+    assert list(read.commands()) == list(path.commands())
+    np.testing.assert_array_equal(positions(read), positions(path))
+    export_mission(read, tmp_path / "mission.json")
+    with open(sample_file, "rb") as f:
+        assert (tmp_path / "mission.json").read_bytes() == f.read()
+
+
+def test_csv_with_renamed_columns(tmp_path):
+    file = tmp_path / "survey.csv"
+    file.write_text("Easting,Northing\n1,2\n3,4\n")
+    path = read_table(file, columns={"Easting": "x", "Northing": "y"}, command="SCHEDULE_FLY_TO_XY")
+    assert list(path.commands()) == [
+        {"type": "SCHEDULE_FLY_TO_XY", "arguments": {"x": 1.0, "y": 2.0}},
+        {"type": "SCHEDULE_FLY_TO_XY", "arguments": {"x": 3.0, "y": 4.0}},
+    ]
+    assert path.position(1) == (3.0, 4.0)
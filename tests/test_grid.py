@@ -0,0 +1,84 @@
+import pytest
+
+from mission_core import EditHistory, PathModel, check_path, parse_grid, read_arguments
+from mission_core.grid import default_columns
+
+
+def test_default_columns_put_coordinates_first():
+    assert default_columns("SCHEDULE_MOVE_XYZ") == ["x", "y", "z", "yaw", "delay", "velocity"]
+    assert default_columns("SCHEDULE_FLY_TO_XY") == ["x", "y"]
+
+
+def test_read_arguments_fills_defaults():
+    arguments, problems = read_arguments(
+        "SCHEDULE_MOVE_XYZ", {"x": "1", "y": "2", "z": "3", "yaw": "90"}
+    )
+    assert problems == []
+    assert arguments == {
+        "action": "NO_ACTION",
+        "delay": 0.0,
+        "velocity": 1.0,
+        "x": 1.0,
+        "y": 2.0,
+        "yaw": 90.0,
+        "z": 3.0,
+    }
+
+
+@pytest.mark.parametrize("text", ["inf", "-inf", "nan", "1e999"])
+def test_read_arguments_rejects_values_that_are_not_finite(text):
+    arguments, problems = read_arguments("SCHEDULE_FLY_TO_XY", {"x": text, "y": "0"})
+    assert "x" not in arguments
+    assert [name for name, _ in problems] == ["x"]
+
+
+def test_read_arguments_reports_range_and_missing_values():
+    _, problems = read_arguments("SCHEDULE_MOVE_XYZ", {"x": "1", "y": "2", "z": "30"})
+    assert dict(problems) == {"z": "z 30 is outside 0..20 m.", "yaw": "yaw is missing."}
+
+
+def test_parse_grid_settings_columns():
+    text = "x\ty\tz\tspeed\n0\t0\t5\t1,5\n\n10\t0\t6\t1.5\n"
+    commands, diagnostics = parse_grid(text, "SCHEDULE_FLY_TO_XY", starts_path=True)
+    assert diagnostics == []
+    assert [command["type"] for command in commands] == [
+        "SCHEDULE_FLY_TO_Z",
+        "SCHEDULE_SET_XY_SPEED",
+        "SCHEDULE_FLY_TO_XY",
+        "SCHEDULE_FLY_TO_Z",
+        "SCHEDULE_FLY_TO_XY",
+    ]
+
+
+def test_parse_grid_reports_every_problem_by_line():
+    text = "x y z yaw\n0 0 5 90\n1 inf 5 90\n10 10 30 abc\n"
+    _, diagnostics = parse_grid(text)
+    assert [(d.index, d.argument, d.rule) for d in diagnostics] == [
+        (2, "y", "grid_value"),
+        (3, "yaw", "grid_value"),
+        (3, "z", "altitude_range"),
+    ]
+
+
+def test_parse_grid_sorts_diagnostics_by_line():
+    text = "type,x,y\nSCHEDULE_FLY_TO_XY,1,2\nNOPE,1,2\n"
+    _, diagnostics = parse_grid(text, starts_path=True)
+    assert [d.index for d in diagnostics] == [1, 2]
+
+
+def test_parse_grid_unknown_column():
+    commands, diagnostics = parse_grid("x,y,foo\n1,2,3\n")
+    assert commands == []
+    assert [d.rule for d in diagnostics] == ["grid_column"]
+
+
+def test_pasted_rows_are_one_undo_step():
+    commands, _ = parse_grid("0 0 5 90\n10 0 5 90\n", starts_path=True)
+    path = PathModel()
+    history = EditHistory(path)
+    history.extend(commands)
+    assert len(path) == 2 and check_path(path) == []
+    history.undo()
+    assert len(path) == 0
+    history.redo()
+    assert list(path.commands()) == commands
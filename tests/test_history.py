@@ -0,0 +1,117 @@
+import random
+
+import numpy as np
+
+from mission_core import EditHistory, PathModel
+
+COMMANDS = [
+    ("SCHEDULE_FLY_TO_Z", lambda: {"z": random.choice([1.0, 2.0, 5.0])}),
+    ("SCHEDULE_FLY_TO_XY", lambda: {"x": random.uniform(-50, 50), "y": random.uniform(-50, 50)}),
+    ("SCHEDULE_TAKE_PICTURE", lambda: {}),
+]
+
+
+def random_command():
+    command, arguments = random.choice(COMMANDS)
+    return command, arguments()
+
+
+def snapshot(path):
+    return [(point["type"], point["arguments"], point["position"]) for point in path]
+
+
+def check_indexes(path):
+    """The altitude and spatial indexes agree with the commands of the path."""
+    z, altitudes = 0.0, []
+    for point in path:
+        z = point["arguments"].get("z", z)
+        altitudes.append(z)
+    np.testing.assert_array_equal(path.altitudes.altitudes(), altitudes)
+
+    store = path.store
+    assert path.spatial.points == {
+        int(store.ids[index]): path.position(index) for index in range(len(path))
+    }
+    cell_ids = sorted(point_id for ids in path.spatial.cells.values() for point_id in ids)
+    assert cell_ids == sorted(path.spatial.points)
+    for index in range(len(path)):
+        found = path.find_point(*path.position(index), 0.001)
+        assert path.position(found) == path.position(index)
+
+
+def edit(history):
+    path = history.path
+    choice = random.random()
+    if choice < 0.4 or len(path) < 3:
+        command, arguments = random_command()
+        position = (random.uniform(-50, 50), random.uniform(-50, 50))
+        history.insert(random.randint(0, len(path)), command, arguments, position)
+    elif choice < 0.7:
+        history.delete(random.randrange(len(path)))
+    elif choice < 0.85:
+        history.extend([dict(zip(("type", "arguments"), random_command())) for _ in range(5)])
+    else:
+        with history.group():
+            history.delete(random.randrange(len(path)))
+            history.append(*random_command())
+
+
+def test_undo_redo_keep_indexes_consistent():
+    random.seed(3)
+    history = EditHistory(PathModel())
+    states = [snapshot(history.path)]
+    current = 0
+    for _ in range(400):
+        if random.random() < 0.6 or current == 0:
+            edit(history)
+            states[current + 1 :] = [snapshot(history.path)]
+            current += 1
+        else:
+            assert history.undo()
+            current -= 1
+            assert snapshot(history.path) == states[current]
+            if random.random() < 0.5:
+                assert history.redo()
+                current += 1
+        assert snapshot(history.path) == states[current]
+        check_indexes(history.path)
+
+    while history.undo():
+        current -= 1
+        check_indexes(history.path)
+    assert current == 0 and len(history.path) == 0
+    while history.redo():
+        current += 1
+    assert snapshot(history.path) == states[current]
+    check_indexes(history.path)
+
+
+def test_extend_is_one_step():
+    history = EditHistory(PathModel())
+    history.append("SCHEDULE_FLY_TO_Z", {"z": 2.0})
+    history.extend([{"type": "SCHEDULE_FLY_TO_XY", "arguments": {"x": 1.0, "y": 1.0}}] * 3)
+    assert history.undo_size() == 3
+    history.undo()
+    assert len(history.path) == 1
+    history.redo()
+    assert len(history.path) == 4
+    assert history.path.position(-1) == (1.0, 1.0)
+
+
+def test_new_edit_clears_redo():
+    history = EditHistory(PathModel())
+    history.append("SCHEDULE_FLY_TO_Z", {"z": 2.0})
+    history.undo()
+    assert history.can_redo()
+    history.append("SCHEDULE_FLY_TO_Z", {"z": 3.0})
+    assert not history.can_redo()
+    assert not history.redo()
+
+
+def test_limit_drops_oldest_steps():
+    history = EditHistory(PathModel(), limit=2)
+    for z in (1.0, 2.0, 3.0):
+        history.append("SCHEDULE_FLY_TO_Z", {"z": z})
+    assert history.undo() and history.undo()
+    assert not history.undo()
+    assert [point["arguments"]["z"] for point in history.path] == [1.0]
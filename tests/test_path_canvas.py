@@ -0,0 +1,273 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from mission_core import PathModel
+from mission_core.geometry import decimate_polyline, segment_distances, simplify_polyline
+from path_canvas import ROUTE_LINE_TAG, ItemPool, RouteLayer, Viewport
+
+
+class FakeCanvas:
+    """The parts of tk.Canvas the layers use, items kept in a dict."""
+
+    def __init__(self):
+        self.items = {}
+        self.next_id = 1
+
+    def _create(self, kind, *coords, tags=(), **options):
+        item = self.next_id
+        self.next_id += 1
+        tags = (tags,) if isinstance(tags, str) else tuple(tags)
+        self.items[item] = {"kind": kind, "coords": list(coords), "tags": tags, "state": "normal"}
+        self.items[item].update(options)
+        return item
+
+    def __getattr__(self, name):
+        if name.startswith("create_"):
+            return lambda *args, **kwargs: self._create(name[7:], *args, **kwargs)
+        raise AttributeError(name)
+
+    # Unlike Tk, using an item that was deleted fails, so stale items show up
+    def coords(self, item, *coords):
+        if coords:
+            self.items[item]["coords"] = list(coords)
+        return self.items[item]["coords"]
+
+    def itemconfig(self, item, **options):
+        self.items[item].update(options)
+
+    def delete(self, tag):
+        """Deletes an item by id, or every item with a tag."""
+        if isinstance(tag, int):
+            self.items.pop(tag, None)
+            return
+        for item in [item for item, data in self.items.items() if tag in data["tags"]]:
+            del self.items[item]
+
+    def move(self, tag, dx, dy):
+        pass
+
+    def tagged(self, tag, state=None):
+        return [
+            item
+            for item, data in self.items.items()
+            if tag in data["tags"] and (state is None or data["state"] == state)
+        ]
+
+
+def random_position():
+    return (random.uniform(-100, 100), random.uniform(-100, 100))
+
+
+def check_route_lines(canvas, layer, path):
+    """The live line items are the pieces of the layer and join every point in order."""
+    assert sorted(canvas.tagged(ROUTE_LINE_TAG)) == sorted(layer.piece_items)
+    if len(path) < 2:
+        assert layer.piece_items == []
+        return
+    assert layer.piece_first[0] == 0 and layer.piece_last[-1] == len(path) - 1
+    assert (layer.piece_first[1:] == layer.piece_last[:-1]).all()
+    for first, last, item in zip(layer.piece_first, layer.piece_last, layer.piece_items):
+        coords = canvas.coords(item)
+        assert coords[:2] == list(layer.viewport.to_pixels(*path.position(first)))
+        assert coords[-2:] == list(layer.viewport.to_pixels(*path.position(last)))
+
+
+def test_route_lines_follow_edits():
+    random.seed(2)
+    canvas = FakeCanvas()
+    path = PathModel()
+    layer = RouteLayer(canvas, Viewport(width=500, height=500, scale=2))
+    layer.CHUNK = 8  # several pieces with a short path
+    for _ in range(30):
+        position = random_position()
+        path.append("SCHEDULE_FLY_TO_XY", dict(zip("xy", position)), position)
+        layer.append("SCHEDULE_FLY_TO_XY", *position)
+        check_route_lines(canvas, layer, path)
+    for step in range(300):
+        if step % 3 == 0:
+            index = random.randrange(len(path))
+            path.delete(index)
+            layer.remove_point(index, path)
+        elif step % 3 == 1:
+            position = random_position()
+            index = random.randint(0, len(path))
+            index = path.insert(index, "SCHEDULE_FLY_TO_XY", dict(zip("xy", position)), position)
+            layer.insert_point(index, "SCHEDULE_FLY_TO_XY", path)
+        else:
+            position = random_position()
+            path.append("SCHEDULE_FLY_TO_XY", dict(zip("xy", position)), position)
+            layer.append("SCHEDULE_FLY_TO_XY", *position)
+        check_route_lines(canvas, layer, path)
+    layer.redraw(path)
+    check_route_lines(canvas, layer, path)
+    while len(path):
+        path.delete(0)
+        layer.remove_point(0, path)
+    check_route_lines(canvas, layer, path)
+
+
+def test_released_items_are_taken_again():
+    canvas = FakeCanvas()
+    pool = ItemPool(canvas, ("pool",))
+    first = pool.take("oval", (0, 0, 1, 1))
+    second = pool.take("oval", (0, 0, 1, 1))
+    pool.release(first)
+    pool.release(first)  # a second release does nothing
+    assert canvas.items[first]["state"] == "hidden"
+    assert pool.used["oval"] == 1
+    assert pool.take("oval", (2, 2, 3, 3)) == first
+    assert canvas.items[first]["state"] == "normal"
+    assert pool.items["oval"] == [second, first]
+
+
+def test_route_edits_reuse_pooled_items():
+    random.seed(1)
+    canvas = FakeCanvas()
+    path = PathModel()
+    layer = RouteLayer(canvas, Viewport(width=500, height=500, scale=2))
+    peak = 0
+    for _ in range(2000):
+        if len(path) > 5 and random.random() < 0.45:
+            index = random.randrange(len(path))
+            path.delete(index)
+            layer.remove_point(index, path)
+        else:
+            index = random.randint(0, len(path))
+            position = (random.uniform(-100, 100), random.uniform(-100, 100))
+            index = path.insert(index, "SCHEDULE_FLY_TO_XY", dict(zip("xy", position)), position)
+            layer.insert_point(index, "SCHEDULE_FLY_TO_XY", path)
+        peak = max(peak, len(layer.marker_owners))
+
+    markers = canvas.tagged("route_marker")
+    shown = canvas.tagged("route_marker", "normal")
+    assert len(shown) == len(layer.marker_owners) == layer.markers.used["oval"]
+    assert len(markers) <= peak
+    for owner, item in layer.label_owners:
+        assert canvas.items[item]["text"] == str(owner + 1)
+        assert canvas.items[item]["state"] == "normal"
+    # Nothing on the canvas besides the route pieces and the pooled items
+    pools = (layer.markers, layer.labels)
+    pooled = sum(len(items) for pool in pools for items in pool.items.values())
+    assert len(canvas.items) == len(layer.piece_items) + pooled
+    check_route_lines(canvas, layer, path)
+
+
+def test_removed_point_returns_its_items_to_the_pool():
+    canvas = FakeCanvas()
+    path = PathModel()
+    layer = RouteLayer(canvas, Viewport(width=500, height=500, scale=2))
+    for i in range(10):
+        path.append("SCHEDULE_FLY_TO_XY", {"x": i * 5.0, "y": 0.0}, (i * 5.0, 0.0))
+        layer.append("SCHEDULE_FLY_TO_XY", i * 5.0, 0.0)
+    marker = dict(layer.marker_owners)[4][0]
+    label = dict(layer.label_owners)[4]
+    created = canvas.next_id
+
+    path.delete(4)
+    layer.remove_point(4, path)
+    assert layer.markers.used["oval"] == 9 and layer.labels.used["text"] == 9
+    assert layer.markers.items["oval"][9] == marker and layer.labels.items["text"][9] == label
+    assert canvas.items[marker]["state"] == "hidden" and canvas.items[label]["state"] == "hidden"
+    assert [owner for owner, _ in layer.label_owners] == list(range(9))
+
+    # The next point takes the freed items instead of creating new ones
+    index = path.insert(2, "SCHEDULE_FLY_TO_XY", {"x": 7.0, "y": 3.0}, (7.0, 3.0))
+    layer.insert_point(index, "SCHEDULE_FLY_TO_XY", path)
+    assert dict(layer.marker_owners)[2] == [marker] and dict(layer.label_owners)[2] == label
+    assert canvas.items[marker]["state"] == "normal"
+    assert canvas.items[label]["text"] == "3"
+    pooled = canvas.tagged("route_marker") + canvas.tagged("route_label")
+    assert max(pooled) < created
+    assert len(canvas.tagged("route_marker")) == len(canvas.tagged("route_label")) == 10
+
+
+@pytest.mark.parametrize("factor", [1.25, 0.8, 10.0, 1e6, 1e-6])
+def test_zoom_keeps_the_point_under_the_cursor(factor):
+    viewport = Viewport(width=640, height=480, scale=2, center=(12.0, -7.0))
+    before = viewport.to_meters(100, 400)
+    viewport.zoom(factor, 100, 400)
+    assert viewport.MIN_SCALE <= viewport.scale <= viewport.MAX_SCALE
+    assert viewport.to_meters(100, 400) == pytest.approx(before)
+
+
+def test_zoom_without_cursor_keeps_the_center():
+    viewport = Viewport(scale=2, center=(3.0, 4.0))
+    viewport.zoom(2)
+    assert viewport.scale == 4
+    assert viewport.center == pytest.approx((3.0, 4.0))
+
+
+def test_pan_moves_the_content_by_pixels():
+    viewport = Viewport(scale=4)
+    x, y = viewport.to_pixels(10.0, 20.0)
+    viewport.pan(30, -12)
+    assert viewport.to_pixels(10.0, 20.0) == pytest.approx((x + 30, y - 12))
+    assert viewport.to_pixels(*viewport.to_meters(55, 66)) == pytest.approx((55, 66))
+
+
+def test_fit_shows_every_point_inside_the_margin():
+    viewport = Viewport(width=600, height=400)
+    xs, ys = np.array([-50.0, 250.0, 30.0]), np.array([10.0, 40.0, -20.0])
+    viewport.fit(xs, ys, margin=20)
+    x_pixels, y_pixels = viewport.to_pixels(xs, ys)
+    assert x_pixels.min() >= 20 - 1e-9 and x_pixels.max() <= 580 + 1e-9
+    assert y_pixels.min() >= 20 - 1e-9 and y_pixels.max() <= 380 + 1e-9
+    # The wider extent fills the view between the margins
+    assert (x_pixels.min(), x_pixels.max()) == pytest.approx((20, 580))
+    x_min, y_min, x_max, y_max = viewport.bounds()
+    assert x_min < -50 and x_max > 250 and y_min < -20 and y_max > 40
+
+
+def test_fit_of_a_single_point_only_centres_it():
+    viewport = Viewport(scale=3)
+    viewport.fit([5.0], [6.0])
+    assert viewport.center == (5.0, 6.0) and viewport.scale == 3
+    viewport.fit([], [])
+    assert viewport.center == (5.0, 6.0)
+
+
+def distance_to_line(xs, ys, kept):
+    """Largest distance of the points to the polyline through the kept indices."""
+    largest = 0.0
+    for start, end in zip(kept[:-1], kept[1:]):
+        if end - start > 1:
+            distances = segment_distances(
+                xs[start + 1 : end], ys[start + 1 : end], xs[start], ys[start], xs[end], ys[end]
+            )
+            largest = max(largest, float(distances.max()))
+    return largest
+
+
+def random_walk(count):
+    rng = np.random.default_rng(4)
+    return np.cumsum(rng.normal(size=count)), np.cumsum(rng.normal(size=count))
+
+
+@pytest.mark.parametrize("tolerance", [0.1, 0.5, 3.0])
+def test_simplify_keeps_the_ends_within_tolerance(tolerance):
+    xs, ys = random_walk(2000)
+    kept = simplify_polyline(xs, ys, tolerance)
+    assert kept[0] == 0 and kept[-1] == len(xs) - 1
+    assert (np.diff(kept) > 0).all()
+    assert len(kept) < len(xs)
+    assert distance_to_line(xs, ys, kept) <= tolerance
+
+
+def test_simplify_drops_straight_runs_and_keeps_corners():
+    xs = np.array([0.0, 1.0, 2.0, 3.0, 3.0, 3.0])
+    ys = np.array([0.0, 0.0, 0.0, 0.0, 1.0, 2.0])
+    assert simplify_polyline(xs, ys, 0.01).tolist() == [0, 3, 5]
+    assert simplify_polyline(xs[:2], ys[:2], 0.01).tolist() == [0, 1]
+
+
+@pytest.mark.parametrize("tolerance", [0.1, 0.5, 3.0])
+def test_decimate_keeps_the_ends_near_the_line(tolerance):
+    xs, ys = random_walk(5000)  # several blocks
+    kept = decimate_polyline(xs, ys, tolerance, block=256)
+    assert kept[0] == 0 and kept[-1] == len(xs) - 1
+    assert (np.diff(kept) > 0).all()
+    # Merging the points of a cell moves the line by at most its diagonal
+    assert distance_to_line(xs, ys, kept) <= tolerance * (1 + math.sqrt(2))
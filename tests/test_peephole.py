@@ -0,0 +1,61 @@
+import json
+
+from conftest import make_path
+from mission_core import INITIAL_BLOCK, export_mission, load_mission, optimize_mission
+from mission_core.binary_format import binary_to_json, json_to_binary
+from mission_core.validation import check_files
+
+
+def optimized_file(tmp_path):
+    path = make_path(
+        ("SCHEDULE_FLY_TO_Z", {"z": 2.0}),
+        ("SCHEDULE_SET_XY_SPEED", {"speed": 0.5}),
+        ("SCHEDULE_FLY_TO_XY", {"x": 10.0, "y": 0.0}),
+    )
+    optimized, initial, _ = optimize_mission(path)
+    file = tmp_path / "optimized.json"
+    export_mission(optimized, file, initial)
+    return optimized, initial, file
+
+
+def test_optimized_export_leaves_out_initial_speed(tmp_path):
+    _, initial, file = optimized_file(tmp_path)
+    assert len(initial) < len(INITIAL_BLOCK)
+    assert json.loads(file.read_text())[: len(initial)] == initial
+
+
+def test_optimized_export_reads_back(tmp_path):
+    optimized, _, file = optimized_file(tmp_path)
+    assert list(load_mission(file).commands()) == list(optimized.commands())
+    assert check_files([str(file)]) == 0
+
+
+def test_optimized_export_binary_round_trip(tmp_path):
+    _, _, file = optimized_file(tmp_path)
+    json_to_binary(file, tmp_path / "mission.bin")
+    binary_to_json(tmp_path / "mission.bin", tmp_path / "back.json")
+    assert (tmp_path / "back.json").read_bytes() == file.read_bytes()
+
+
+def initial_types(*commands):
+    _, initial, _ = optimize_mission(make_path(*commands))
+    return [command["type"] for command in initial]
+
+
+def test_initial_yaw_kept_for_moves_before_first_yaw():
+    types = initial_types(
+        ("SCHEDULE_FLY_TO_Z", {"z": 2.0}),
+        ("SCHEDULE_FLY_TO_XY", {"x": 50.0, "y": 0.0}),
+        ("SCHEDULE_FLY_TO_YAW", {"yaw": 0.0}),
+        ("SCHEDULE_TAKE_PICTURE", {}),
+    )
+    assert "SCHEDULE_FLY_TO_YAW" in types
+
+
+def test_initial_yaw_dropped_when_path_opens_with_yaw():
+    move = {"action": "NO_ACTION", "delay": 0.0, "velocity": 1.0, "x": 5.0, "y": 0.0}
+    types = initial_types(
+        ("SCHEDULE_MOVE_XYZ", dict(move, yaw=0.0, z=2.0)),
+        ("SCHEDULE_TAKE_PICTURE", {}),
+    )
+    assert "SCHEDULE_FLY_TO_YAW" not in types
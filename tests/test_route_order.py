@@ -0,0 +1,56 @@
+import random
+
+from conftest import make_path
+from mission_core import EditHistory, optimize_path, optimized_order
+
+
+def shuffled_path(count=40):
+    random.seed(7)
+    commands = [("SCHEDULE_FLY_TO_Z", {"z": 2.0}), ("SCHEDULE_FLY_TO_XY", {"x": 0.0, "y": 0.0})]
+    for _ in range(count):
+        commands.append(
+            ("SCHEDULE_FLY_TO_XY", {"x": random.uniform(0, 100), "y": random.uniform(0, 100)})
+        )
+        if random.random() < 0.3:
+            commands.append(("SCHEDULE_TAKE_PICTURE", {}))
+    return make_path(*commands)
+
+
+def snapshot(path):
+    return [(point["type"], point["arguments"], point["position"]) for point in path]
+
+
+def test_order_keeps_every_command_and_the_start():
+    path = shuffled_path()
+    order = optimized_order(path, time_limit=2.0)
+    assert sorted(order.tolist()) == list(range(len(path)))
+    assert order[:2].tolist() == [0, 1]
+    # Pictures stay right after their waypoint
+    for position, index in enumerate(order.tolist()):
+        if path[index]["type"] == "SCHEDULE_TAKE_PICTURE":
+            assert order[position - 1] == index - 1
+
+
+def test_optimize_saves_time_and_undoes_in_one_step():
+    path = shuffled_path()
+    before = snapshot(path)
+    history = EditHistory(path)
+    assert optimize_path(path, history, time_limit=2.0) > 0
+    assert sorted(map(repr, snapshot(path))) == sorted(map(repr, before))
+    assert history.undo()
+    assert snapshot(path) == before
+    assert not history.can_undo()
+
+
+def test_fixed_commands_stay_in_place():
+    path = make_path(
+        ("SCHEDULE_FLY_TO_Z", {"z": 2.0}),
+        ("SCHEDULE_FLY_TO_XY", {"x": 0.0, "y": 0.0}),
+        ("SCHEDULE_FLY_TO_XY", {"x": 10.0, "y": 0.0}),
+        ("SCHEDULE_FLY_TO_XY", {"x": 1.0, "y": 0.0}),
+        ("SCHEDULE_FLY_TO_Z", {"z": 5.0}),
+        ("SCHEDULE_FLY_TO_XY", {"x": 20.0, "y": 0.0}),
+        ("SCHEDULE_FLY_TO_XY", {"x": 2.0, "y": 0.0}),
+    )
+    # The last run ends back at the take off position, so 20 comes before 2
+    assert optimized_order(path).tolist() == [0, 1, 3, 2, 4, 5, 6]
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from conftest import make_path
+from mission_core import load_mission, simulate
+
+
+def test_simulation_returns_to_take_off(sample_file):
+    timeline = simulate(load_mission(sample_file), rate=10)
+    assert timeline.time[0] == 0.0
+    assert np.all(np.diff(timeline.time) > 0)
+    assert (timeline.x[-1], timeline.y[-1]) == (0.0, 0.0)
+    assert timeline.y.min() == pytest.approx(-5.0)
+    assert np.all((0.0 <= timeline.yaw) & (timeline.yaw < 360.0))
+
+
+def test_simulated_leg_takes_at_least_the_cruise_time():
+    path = make_path(
+        ("SCHEDULE_SET_XY_SPEED", {"speed": 1.0}),
+        ("SCHEDULE_FLY_TO_XY", {"x": 20.0, "y": 0.0}),
+    )
+    timeline = simulate(path, rate=20)
+    reached = timeline.time[np.argmax(timeline.x >= 20.0)]
+    # 1 m/s² to and from 1 m/s adds a second to the 20 s at cruise speed
+    assert reached == pytest.approx(21.0, abs=0.1)
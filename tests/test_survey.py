@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from mission_core import PathModel, add_survey
+from mission_core.survey import survey_legs, survey_waypoints
+
+RECTANGLE = [(0, 0), (40, 0), (40, 30), (0, 30)]
+# A U open at the top: the two arms are 10 m wide and 20 m high
+U_SHAPE = [(0, 0), (30, 0), (30, 30), (20, 30), (20, 10), (10, 10), (10, 30), (0, 30)]
+
+
+def test_rectangle_lines_sit_half_a_spacing_inside():
+    starts, ends = survey_legs(RECTANGLE, 5)
+    assert np.allclose(starts[:, 1], [2.5, 7.5, 12.5, 17.5, 22.5, 27.5])
+    assert np.allclose(ends[:, 1], starts[:, 1])
+    # Back and forth across the full width
+    assert np.allclose(starts[:, 0], [0, 40, 0, 40, 0, 40])
+    assert np.allclose(ends[:, 0], [40, 0, 40, 0, 40, 0])
+
+
+def test_lines_cover_a_width_that_is_not_a_multiple():
+    starts, _ = survey_legs([(0, 0), (40, 0), (40, 31), (0, 31)], 5)
+    assert len(starts) == 7
+    assert np.allclose(starts[:, 1], 0.5 + 5 * np.arange(7))
+
+
+def test_rotated_rectangle():
+    starts, ends = survey_legs(RECTANGLE, 5, heading=90)
+    assert len(starts) == 8
+    assert np.allclose(np.sort(starts[:, 0]), 2.5 + 5 * np.arange(8))
+    assert np.allclose(np.abs(ends[:, 1] - starts[:, 1]), 30)
+
+
+def test_concave_polygon_splits_lines_into_legs():
+    starts, ends = survey_legs(U_SHAPE, 5)
+    legs = sorted(
+        (round(y, 6), min(a, b), max(a, b)) for (a, y), (b, _) in zip(starts, ends)
+    )
+    assert legs == [
+        (2.5, 0, 30),
+        (7.5, 0, 30),
+        (12.5, 0, 10),
+        (12.5, 20, 30),
+        (17.5, 0, 10),
+        (17.5, 20, 30),
+        (22.5, 0, 10),
+        (22.5, 20, 30),
+        (27.5, 0, 10),
+        (27.5, 20, 30),
+    ]
+
+
+def test_picture_spacing_spreads_waypoints():
+    starts, ends = survey_legs(RECTANGLE, 5)
+    waypoints = survey_waypoints(starts, ends, picture_spacing=10)
+    assert len(waypoints) == 6 * 5
+    assert np.allclose(waypoints[:5, 0], [0, 10, 20, 30, 40])
+
+
+def test_add_survey_commands():
+    path = PathModel()
+    added = add_survey(path, RECTANGLE, altitude=10, spacing=5)
+    commands = list(path.commands())
+    assert added == len(commands) == 1 + 2 * 12
+    assert commands[0] == {"type": "SCHEDULE_FLY_TO_Z", "arguments": {"z": 10.0}}
+    assert commands[1] == {"type": "SCHEDULE_FLY_TO_XY", "arguments": {"x": 0.0, "y": 2.5}}
+    assert commands[2]["type"] == "SCHEDULE_TAKE_PICTURE"
+
+
+@pytest.mark.parametrize(
+    "polygon, spacing",
+    [([(0, 0), (1, 1)], 5), (RECTANGLE, 0), ([1, 2, 3, 4, 5, 6], 5)],
+)
+def test_bad_input(polygon, spacing):
+    with pytest.raises(ValueError):
+        survey_legs(polygon, spacing)
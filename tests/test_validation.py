@@ -0,0 +1,65 @@
+import math
+
+import pytest
+
+from conftest import make_path
+from mission_core import check_path, load_mission, validate_path
+from mission_core.validation import check_files
+
+MOVE = {"action": "NO_ACTION", "delay": 0.0, "velocity": 1.0, "x": 1.0, "y": 1.0, "yaw": 0.0}
+
+
+def rules(path):
+    return [(d.rule, d.index, d.argument) for d in check_path(path)]
+
+
+def test_sample_mission_passes(sample_file):
+    assert check_path(load_mission(sample_file)) == []
+    assert check_files([sample_file]) == 0
+
+
+def test_empty_path():
+    assert rules(make_path()) == [("empty_path", None, None)]
+
+
+def test_path_without_move_and_with_wrong_start():
+    path = make_path(("SCHEDULE_FLY_TO_YAW", {"yaw": 0.0}))
+    assert rules(path) == [("no_move_command", None, None), ("first_command", 0, None)]
+
+
+def test_ranges_missing_and_empty_values():
+    path = make_path(
+        ("SCHEDULE_FLY_TO_Z", {"z": 30.0}),
+        ("SCHEDULE_SET_XY_SPEED", {"speed": 2.0}),
+        ("SCHEDULE_WAIT_FOR_PERIOD", {"period": -1.0}),
+        ("SCHEDULE_MOVE_XYZ", dict(MOVE, velocity=0.0)),
+        ("SCHEDULE_FLY_TO_XY", {"x": None, "y": 0.0}),
+    )
+    assert rules(path) == [
+        ("altitude_range", 0, "z"),
+        ("speed_range", 1, "speed"),
+        ("period_range", 2, "period"),
+        ("missing_argument", 3, "z"),
+        ("velocity_range", 3, "velocity"),
+        ("empty_value", 4, "x"),
+    ]
+
+
+@pytest.mark.parametrize("value", [math.inf, -math.inf])
+@pytest.mark.parametrize("name", ["x", "z", "velocity"])
+def test_infinite_values_are_errors(name, value):
+    path = make_path(
+        ("SCHEDULE_FLY_TO_Z", {"z": 1.0}),
+        ("SCHEDULE_MOVE_XYZ", {**MOVE, "z": 2.0, name: value}),
+    )
+    assert rules(path) == [("infinite_value", 1, name)]
+    assert validate_path(path)
+
+
+def test_check_files_reports_malformed_file_and_goes_on(sample_file, tmp_path, capsys):
+    malformed = tmp_path / "malformed.json"
+    malformed.write_text("[[1, 2]]")
+    assert check_files([str(malformed), sample_file]) == 1
+    out = capsys.readouterr().out
+    assert f"{malformed}: error: Entry 1 of the mission file is not a command" in out
+    assert "1 of 2 missions passed." in out